@@ -1,45 +1,191 @@
+import time
+_INICIO_PROCESSO = time.perf_counter() # Marca o começo da inicialização, antes dos imports
+
+import asyncio
 import logging
+import math
+import multiprocessing
 import os
-import uuid
+import signal
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
 import numpy as np
-import tensorflow as tf
 import configparser  # <--- Importa a biblioteca para ler o .ini
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
-from processador_audio import extrair_e_normalizar_pitch
+import processador_audio
+from processador_audio import extrair_com_tempos
+from limites import LimitadorChats, CacheResultados
+from registro_modelos import RegistroModelos, ler_config_modelos
+from metricas import RegistroMetricas, ServidorMetricas
+from servidor_webhook import ServidorWebhook
+from reconhecimento_continuo import listar_silabas
+
+# Tempos de cada fase da inicialização, em segundos (mostrados no log e no /status)
+tempos_inicializacao = {'imports': time.perf_counter() - _INICIO_PROCESSO}
 
 # --- 1. LEITURA DAS CONFIGURAÇÕES ---
+CONFIG_PATH = 'config.ini'
 config = configparser.ConfigParser()
-config.read('config.ini')
+config.read(CONFIG_PATH)
 
 # Carrega as configurações da seção [Telegram]
 TOKEN = config['Telegram']['Token']
 allowed_ids_str = config['Telegram']['AllowedChatIds']
 # Converte a string de IDs em uma lista de números inteiros
 ALLOWED_CHAT_IDS = [int(id.strip()) for id in allowed_ids_str.split(',') if id.strip()]
+# Limite de áudios por chat (balde de fichas, veja limites.py). 0 desliga.
+RATE_LIMIT_PER_MINUTE = config.getfloat('Telegram', 'RateLimitPerMinute', fallback=0)
+RATE_LIMIT_BURST = config.getint('Telegram', 'RateLimitBurst', fallback=3)
 
 # Carrega as configurações da seção [Model]
 MODEL_PATH = config['Model']['ModelPath']
+# Modelo candidato (teste A/B) e troca de modelos sem reiniciar (veja registro_modelos.py)
+config_modelos = ler_config_modelos(config)
+CANDIDATE_PATH = config_modelos['candidato']
+CANDIDATE_FRACTION = config_modelos['fracao_candidato']
+RELOAD_INTERVAL = config.getfloat('Model', 'ReloadIntervalSeconds', fallback=30)
+MODEL_BACKEND = config.get('Model', 'Backend', fallback='auto')
+TFLITE_THREADS = config.getint('Model', 'TFLiteThreads', fallback=None)
 class_names_str = config['Model']['ClassNames']
 CLASS_NAMES = [name.strip() for name in class_names_str.split(',')]
 
+# Carrega as configurações da seção [Inference] (opcional)
+MAX_BATCH_SIZE = config.getint('Inference', 'MaxBatchSize', fallback=32)
+MAX_WAIT_MS = config.getfloat('Inference', 'MaxWaitMs', fallback=5)
+
+# Carrega as configurações da seção [Processing] (opcional)
+# Processos que rodam a extração de pitch, fora do event loop do bot
+EXTRACTION_WORKERS = config.getint('Processing', 'Workers', fallback=max(1, (os.cpu_count() or 2) - 1))
+# Máximo de áudios sendo analisados ao mesmo tempo; acima disso o bot pede para tentar mais tarde
+MAX_IN_FLIGHT = config.getint('Processing', 'MaxInFlight', fallback=2 * EXTRACTION_WORKERS)
+
 # Carrega as configurações da seção [Paths]
 TEMP_DIR = config['Paths']['TempDir']
 
+# Carrega as configurações da seção [Audio] (opcional)
+PITCH_BACKEND = config.get('Audio', 'PitchBackend', fallback='pyin')
+
+# Carrega as configurações da seção [Cache] (opcional)
+CACHE_DIR = config.get('Cache', 'Dir', fallback='')
+CACHE_MAX_MB = config.getfloat('Cache', 'MaxSizeMB', fallback=200)
+# Respostas já dadas, pelo file_unique_id do Telegram (áudios repetidos/encaminhados)
+RESULTS_MAX_ITEMS = config.getint('Cache', 'ResultsMaxItems', fallback=1000)
+RESULTS_TTL = config.getfloat('Cache', 'ResultsTTLSeconds', fallback=3600)
+
+# Carrega as configurações da seção [Startup] (opcional)
+# Com BackgroundWarmUp o bot começa a receber mensagens na hora e carrega/aquece
+# o modelo e os processos de extração em segundo plano.
+BACKGROUND_WARMUP = config.getboolean('Startup', 'BackgroundWarmUp', fallback=True)
+# Quanto tempo um áudio recebido durante o aquecimento espera o bot ficar pronto
+WARMUP_TIMEOUT = config.getfloat('Startup', 'WarmUpTimeout', fallback=120)
+
+# Carrega as configurações da seção [Streaming] (opcional)
+# Áudios longos são analisados sílaba por sílaba (veja reconhecimento_continuo.py)
+STREAMING_ENABLED = config.getboolean('Streaming', 'Enabled', fallback=False)
+STREAMING_MIN_DURATION = config.getfloat('Streaming', 'MinDurationSeconds', fallback=4.0)
+STREAMING_MAX_SYLLABLES = config.getint('Streaming', 'MaxSyllables', fallback=40)
+
+# Carrega as configurações da seção [Metrics] (opcional)
+METRICS_ENABLED = config.getboolean('Metrics', 'Enabled', fallback=False)
+METRICS_HOST = config.get('Metrics', 'Host', fallback='127.0.0.1')
+METRICS_PORT = config.getint('Metrics', 'Port', fallback=9464)
+
+# Carrega as configurações da seção [Deployment] (opcional)
+# 'polling' (padrão) ou 'webhook' (o Telegram manda os updates para um servidor HTTP local)
+DEPLOYMENT_MODE = config.get('Deployment', 'Mode', fallback='polling').strip().lower()
+WEBHOOK_URL = config.get('Deployment', 'WebhookUrl', fallback='').strip()
+WEBHOOK_PATH = urlparse(WEBHOOK_URL).path or '/'
+WEBHOOK_HOST = config.get('Deployment', 'ListenHost', fallback='127.0.0.1')
+WEBHOOK_PORT = config.getint('Deployment', 'ListenPort', fallback=8443)
+WEBHOOK_SECRET = config.get('Deployment', 'SecretToken', fallback='').strip()
+WEBHOOK_WORKERS = config.getint('Deployment', 'WebhookWorkers', fallback=1)
+# Outro servidor da API do Telegram (ex.: o telegram_falso.py). Vazio = api.telegram.org
+API_BASE_URL = config.get('Deployment', 'ApiBaseUrl', fallback='').strip().rstrip('/')
+
 # Configura o logging
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+processador_audio.configurar_backend(PITCH_BACKEND)
+logger.info(f"Backend de pitch: '{PITCH_BACKEND}'.")
+
+# Liga o cache de contornos: um áudio repetido não passa pelo pYIN de novo
+if CACHE_DIR:
+    processador_audio.configurar_cache(CACHE_DIR, CACHE_MAX_MB)
+    logger.info(f"Cache de contornos ativado em '{CACHE_DIR}' (limite de {CACHE_MAX_MB:.0f} MB).")
+
+# --- MÉTRICAS ---
+# Expostas em http://<Host>:<Port>/metrics (formato Prometheus) quando [Metrics] Enabled = true.
+# Desligadas, as chamadas abaixo não fazem nada.
+metricas = RegistroMetricas(ativo=METRICS_ENABLED, prefixo='bot_tons_')
+
 # --- 2. CARREGAMENTO DO MODELO ---
-logger.info("Carregando modelo de classificação de tons...")
-try:
-    model = tf.keras.models.load_model(MODEL_PATH)
-    model.summary()
-    logger.info("Modelo carregado com sucesso!")
-except Exception as e:
-    logger.error(f"Erro ao carregar o modelo '{MODEL_PATH}': {e}")
-    model = None
+# O modelo é carregado em aquecer() (ou em main(), sem BackgroundWarmUp), e não
+# na importação: assim os processos de extração (que importam este arquivo no
+# Windows) não carregam o modelo à toa. Com Backend = tflite, o TensorFlow nem
+# chega a ser importado.
+#
+# O registro guarda o modelo principal e o candidato, cada um com a sua fila
+# (que junta as previsões de várias mensagens simultâneas em um único lote), e
+# troca um modelo por outro quando o arquivo ou o config.ini mudam.
+registro_modelos = RegistroModelos(
+    MODEL_PATH, CANDIDATE_PATH, CANDIDATE_FRACTION, MODEL_BACKEND,
+    tamanho_max_lote=MAX_BATCH_SIZE, num_threads=TFLITE_THREADS, espera_max_ms=MAX_WAIT_MS,
+    arquivo_config=CONFIG_PATH, intervalo_recarga=RELOAD_INTERVAL, metricas=metricas,
+)
+# Fica pronto quando o modelo foi carregado e aquecido (com ou sem sucesso)
+bot_pronto = asyncio.Event()
+
+def carregar_modelo():
+    logger.info("Carregando modelo de classificação de tons...")
+    inicio = time.perf_counter()
+    try:
+        registro_modelos.carregar()
+        logger.info("Modelo carregado com sucesso!")
+    except Exception as e:
+        logger.error(f"Erro ao carregar o modelo '{MODEL_PATH}': {e}")
+    tempos_inicializacao['modelo'] = time.perf_counter() - inicio
+
+def aquecer_modelo():
+    """
+    Roda uma previsão de 1 amostra e uma do lote máximo com zeros em cada
+    modelo: o primeiro uso de cada formato monta o grafo/aloca os tensores, e
+    esse custo não deve cair no primeiro usuário.
+    """
+    inicio = time.perf_counter()
+    registro_modelos.aquecer()
+    tempos_inicializacao['aquecimento_modelo'] = time.perf_counter() - inicio
+
+# Limite de áudios por chat e respostas de áudios repetidos (veja limites.py)
+limitador_chats = LimitadorChats(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+cache_resultados = CacheResultados(RESULTS_MAX_ITEMS, RESULTS_TTL)
+
+# Pool de processos da extração de pitch (criado em iniciar_servicos)
+pool_extracao = None
+# Quantos áudios estão sendo analisados agora (só é alterado dentro do event loop)
+jobs_em_andamento = 0
+jobs_recusados = 0
+audios_duplicados = 0
+
+# Métricas do bot (as de cada modelo ficam no registro_modelos)
+metrica_etapas = metricas.histograma(
+    'etapa_segundos', "Tempo de cada etapa da análise de um áudio", rotulos=('etapa',))
+metrica_audios = metricas.contador('audios_total', "Áudios recebidos de chats autorizados")
+metrica_erros = metricas.contador('erros_total', "Análises que falharam, pela etapa da falha", rotulos=('etapa',))
+metrica_cache = metricas.contador(
+    'cache_contornos_total', "Buscas no cache de contornos", rotulos=('resultado',))
+metrica_chats_negados = metricas.contador('chats_negados_total', "Mensagens de chats sem permissão")
+metrica_ocupado = metricas.contador('recusas_ocupado_total', "Áudios recusados por excesso de carga")
+metrica_limitados = metricas.contador('recusas_limite_chat_total', "Áudios recusados pelo limite por chat")
+metrica_duplicados = metricas.contador(
+    'duplicados_total', "Áudios repetidos respondidos sem análise", rotulos=('origem',))
+metricas.medidor('analises_em_andamento', "Áudios sendo analisados agora", lambda: jobs_em_andamento)
+metricas.medidor('fila_inferencia_profundidade', "Pedidos esperando o modelo",
+                 lambda: sum(fila.metricas()['profundidade_fila'] for fila in registro_modelos.filas.values()))
+servidor_metricas = ServidorMetricas(metricas, METRICS_HOST, METRICS_PORT)
 
 # --- 3. FUNÇÕES DO BOT ---
 
@@ -59,59 +205,378 @@ async def handle_audio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # ---> NOVIDADE: Verifica se o usuário tem permissão <---
     if ALLOWED_CHAT_IDS and chat_id not in ALLOWED_CHAT_IDS:
         logger.warning(f"Acesso negado para o Chat ID: {chat_id}")
+        metrica_chats_negados.inc()
         await update.message.reply_text("Desculpe, você não tem permissão para usar este bot.")
         return
+    metrica_audios.inc()
+
+    message = update.message
+    audio_file_obj = message.audio or message.voice
+
+    # Mesmo áudio de antes (ex.: encaminhado de outro chat): responde sem baixar nem analisar.
+    # A chave muda quando um modelo é trocado, para não repetir respostas do modelo antigo.
+    chave_resultado = (audio_file_obj.file_unique_id, registro_modelos.trocas)
+    resposta, origem = cache_resultados.obter(chave_resultado), 'cache'
+    if resposta is None and (futuro := cache_resultados.em_andamento(chave_resultado)) is not None:
+        resposta, origem = await futuro, 'em_andamento' # None se aquela análise falhou: analisa de novo
+    global jobs_em_andamento, jobs_recusados, audios_duplicados
+    if resposta is not None:
+        audios_duplicados += 1
+        metrica_duplicados.inc(origem=origem)
+        logger.info(f"Áudio repetido de {chat_id} respondido sem análise ({origem}).")
+        await update.message.reply_text(resposta)
+        return
+
+    # Limite por chat: um chat mandando áudios sem parar não ocupa todos os processos de extração.
+    # Vem depois do cache: um áudio repetido não custa nada e não gasta a ficha do chat.
+    espera, primeira_recusa = limitador_chats.verificar(chat_id)
+    if espera:
+        metrica_limitados.inc()
+        logger.warning(f"Chat {chat_id} passou do limite de áudios. Recusando.")
+        if primeira_recusa: # Avisa uma vez; as próximas recusas seguidas ficam sem resposta
+            await update.message.reply_text(
+                f"Você está mandando áudios rápido demais. ⏳ Tente novamente em {math.ceil(espera)} segundos.")
+        return
 
-    if not model:
+    if not bot_pronto.is_set():
+        # Recém-ligado: o áudio espera o aquecimento em vez de ser recusado
+        await update.message.reply_text("Acabei de ligar e estou me preparando... ⏳ Já analiso seu áudio.")
+        try:
+            await asyncio.wait_for(bot_pronto.wait(), timeout=WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            await update.message.reply_text("Ainda estou me preparando. Por favor, tente novamente em instantes.")
+            return
+
+    if not registro_modelos.pronto:
         await update.message.reply_text("Desculpe, o modelo de IA não está carregado. Contate o administrador.")
         return
 
-    # O resto da função continua exatamente igual...
-    message = update.message
-    audio_file_obj = message.audio or message.voice
-    temp_audio_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}.ogg")
+    # Controle de carga: se já há áudios demais em análise, recusa na hora
+    # em vez de deixar a fila crescer sem limite.
+    if jobs_em_andamento >= MAX_IN_FLIGHT:
+        jobs_recusados += 1
+        metrica_ocupado.inc()
+        logger.warning(f"Bot ocupado ({jobs_em_andamento} áudios em análise). Recusando áudio de {chat_id}.")
+        await update.message.reply_text("Estou ocupado analisando outros áudios agora. ⏳ Tente novamente em alguns segundos.")
+        return
 
+    jobs_em_andamento += 1
+    cache_resultados.iniciar(chave_resultado) # Pedidos com o mesmo áudio esperam esta análise
+    etapa = 'download'
+    inicio_total = time.perf_counter()
     try:
         await update.message.reply_text("Analisando seu áudio... 🧠")
-        file_info = await context.bot.get_file(audio_file_obj.file_id)
-        await file_info.download_to_drive(temp_audio_path)
-        logger.info(f"Áudio de {chat_id} salvo em: {temp_audio_path}")
+        with metrica_etapas.cronometrar(etapa='download'):
+            file_info = await context.bot.get_file(audio_file_obj.file_id)
+            # O áudio fica só em memória: é decodificado direto dos bytes, sem arquivo temporário
+            audio_bytes = bytes(await file_info.download_as_bytearray())
+        logger.info(f"Áudio de {chat_id} recebido ({len(audio_bytes) / 1024:.1f} KB).")
+
+        # Áudio longo (uma frase): um tom por sílaba
+        duracao = getattr(audio_file_obj, 'duration', None) or 0
+        papel = registro_modelos.sortear() # Modelo principal ou candidato (teste A/B)
+        if STREAMING_ENABLED and duracao >= STREAMING_MIN_DURATION:
+            etapa = 'silabas'
+            resposta = await responder_silabas(update, chat_id, audio_bytes, papel)
+            metrica_etapas.observar(time.perf_counter() - inicio_total, etapa='total')
+            return
 
-        feature_vector = extrair_e_normalizar_pitch(temp_audio_path)
-        feature_vector = np.expand_dims(np.expand_dims(feature_vector, axis=0), axis=-1)
+        # O pYIN roda em outro processo: o event loop continua livre para os outros usuários.
+        # O processo devolve também quanto tempo cada etapa levou lá dentro.
+        etapa = 'extracao'
+        loop = asyncio.get_running_loop()
+        feature_vector, tempos = await loop.run_in_executor(pool_extracao, extrair_com_tempos, audio_bytes)
+        registrar_tempos_extracao(tempos)
 
-        prediction_probs = model.predict(feature_vector)
-        predicted_class_index = np.argmax(prediction_probs, axis=1)[0]
+        etapa = 'inferencia'
+        with metrica_etapas.cronometrar(etapa='inferencia'): # Inclui a espera pelo lote
+            prediction_probs = await registro_modelos.prever(feature_vector, papel)
+        predicted_class_index = int(np.argmax(prediction_probs))
         predicted_class_name = CLASS_NAMES[predicted_class_index]
         confidence = np.max(prediction_probs) * 100
 
-        logger.info(f"Previsão para {chat_id}: {predicted_class_name} ({confidence:.2f}%)")
-        await update.message.reply_text(
+        logger.info(f"Previsão para {chat_id}: {predicted_class_name} ({confidence:.2f}%, modelo {papel})")
+        etapa = 'resposta'
+        texto = (
             f"Análise concluída! 🎼\n\n"
             f"Eu acredito que este áudio seja do: **{predicted_class_name}**\n"
             f"_(Confiança: {confidence:.2f}%)_"
         )
+        with metrica_etapas.cronometrar(etapa='resposta'):
+            await update.message.reply_text(texto)
+        if not tempos.get('erro'): # Um áudio que não decodificou não fica guardado
+            resposta = texto
+        metrica_etapas.observar(time.perf_counter() - inicio_total, etapa='total')
     except Exception as e:
+        metrica_erros.inc(etapa=etapa)
         logger.error(f"Erro no processamento do áudio para {chat_id}: {e}")
         await update.message.reply_text("Ocorreu um erro ao analisar seu áudio. Por favor, tente novamente.")
     finally:
-        if os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
+        jobs_em_andamento -= 1
+        cache_resultados.concluir(chave_resultado, resposta)
+
+async def responder_silabas(update: Update, chat_id: int, audio_bytes: bytes, papel: str = 'principal') -> str:
+    """
+    Separa as sílabas do áudio (em um processo do pool), classifica todas com
+    o modelo `papel` e responde a sequência. Devolve o texto da resposta.
+    """
+    loop = asyncio.get_running_loop()
+    with metrica_etapas.cronometrar(etapa='silabas'):
+        silabas = await loop.run_in_executor(pool_extracao, listar_silabas, audio_bytes, STREAMING_MAX_SYLLABLES)
+    if not silabas:
+        texto = "Não encontrei nenhuma sílaba com tom nesse áudio. 🤔 Tente falar mais perto do microfone."
+        await update.message.reply_text(texto)
+        return texto
+
+    # Cada sílaba entra na fila de inferência; chegando juntas, viram um lote só
+    with metrica_etapas.cronometrar(etapa='inferencia'):
+        probabilidades = await asyncio.gather(*(registro_modelos.prever(s['vetor'], papel) for s in silabas))
+    linhas = []
+    for silaba, prob in zip(silabas, probabilidades):
+        linhas.append(f"{silaba['inicio_s']:.1f}s: {CLASS_NAMES[int(np.argmax(prob))]} ({np.max(prob) * 100:.0f}%)")
+    sequencia = ' '.join(str(int(np.argmax(prob)) + 1) for prob in probabilidades)
+    logger.info(f"Sequência de tons para {chat_id}: {sequencia} ({len(silabas)} sílabas, modelo {papel})")
+
+    aviso = (f"\n\n_(Mostrando só as primeiras {STREAMING_MAX_SYLLABLES} sílabas.)_"
+             if len(silabas) >= STREAMING_MAX_SYLLABLES else '')
+    texto = (
+        f"Análise concluída! 🎼\n\n"
+        f"Encontrei {len(silabas)} sílabas. Sequência de tons: **{sequencia}**\n\n"
+        + '\n'.join(linhas) + aviso
+    )
+    with metrica_etapas.cronometrar(etapa='resposta'):
+        await update.message.reply_text(texto)
+    return texto
+
+def registrar_tempos_extracao(tempos: dict) -> None:
+    """Passa para as métricas os tempos medidos dentro do processo de extração."""
+    for etapa in ('cache', 'decodificacao', 'pitch', 'interpolacao'):
+        if etapa in tempos:
+            metrica_etapas.observar(tempos[etapa], etapa=etapa)
+    if tempos.get('resultado_cache', 'desligado') != 'desligado':
+        metrica_cache.inc(resultado=tempos['resultado_cache'])
+    if tempos.get('erro'):
+        # A extração não derruba o pedido (o vetor vira zeros), mas o erro é contado
+        metrica_erros.inc(etapa='extracao')
+
+async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Mostra as métricas da fila de inferência e dos modelos."""
+    chat_id = update.effective_chat.id
+    if ALLOWED_CHAT_IDS and chat_id not in ALLOWED_CHAT_IDS:
+        await update.message.reply_text("Desculpe, você não tem permissão para usar este bot.")
+        return
+
+    resumo = registro_modelos.resumo()
+    m = resumo['principal']['fila']
+    histograma = ', '.join(f"{tamanho}: {vezes}" for tamanho, vezes in m['histograma_lotes'].items()) or '-'
+    await update.message.reply_text(
+        "📊 Fila de inferência\n"
+        f"Profundidade atual: {m['profundidade_fila']} (máxima: {m['maior_profundidade']})\n"
+        f"Lotes processados: {m['lotes_processados']} ({m['amostras_processadas']} áudios)\n"
+        f"Tamanho médio do lote: {m['tamanho_medio_lote']:.2f}\n"
+        f"Tempo médio por lote: {m['ms_medio_por_lote']:.1f} ms\n"
+        f"Tamanhos de lote (tamanho: vezes): {histograma}\n\n"
+        f"🤖 Modelos (trocas sem reiniciar: {registro_modelos.trocas})\n"
+        f"{formatar_modelos(resumo)}\n\n"
+        f"⚙️ Análises em andamento: {jobs_em_andamento}/{MAX_IN_FLIGHT} (recusadas: {jobs_recusados})\n"
+        f"🚦 Recusados pelo limite por chat: {limitador_chats.recusas}\n"
+        f"♻️ Áudios repetidos respondidos sem análise: {audios_duplicados} "
+        f"({len(cache_resultados)} respostas guardadas)\n\n"
+        f"🚀 Inicialização: {formatar_tempos_inicializacao() if bot_pronto.is_set() else 'aquecendo...'}"
+    )
+
+def formatar_modelos(resumo: dict) -> str:
+    linhas = []
+    for papel, r in resumo.items():
+        if r['modelo'] is None:
+            continue
+        linhas.append(f"{papel}: {r['modelo']} ({r['trafego']:.0%} do tráfego) - {r['previsoes']} previsões, "
+                      f"{r['ms_medio_por_lote']:.1f} ms/lote, confiança média {r['confianca_media'] * 100:.1f}%")
+    return '\n'.join(linhas) or 'nenhum modelo carregado'
+
+def formatar_tempos_inicializacao() -> str:
+    return ', '.join(f"{fase} {segundos:.2f}s" for fase, segundos in tempos_inicializacao.items())
+
+def iniciar_servicos() -> None:
+    """Cria o pool de extração e inicia a fila de inferência (com o event loop já rodando)."""
+    global pool_extracao
+    pool_extracao = ProcessPoolExecutor(
+        max_workers=EXTRACTION_WORKERS,
+        initializer=processador_audio.inicializar_processo,
+        # Cada processo já importa o librosa e roda uma extração de teste ao subir
+        initargs=(PITCH_BACKEND, CACHE_DIR, CACHE_MAX_MB, TEMP_DIR, True),
+    )
+    registro_modelos.iniciar()
+
+async def aquecer() -> None:
+    """
+    Carrega o modelo (se ainda não foi carregado), roda as previsões de
+    aquecimento e sobe todos os processos de extração, fora do event loop.
+    No fim marca o bot como pronto e mostra quanto tempo cada fase levou.
+    """
+    loop = asyncio.get_running_loop()
+    inicio = time.perf_counter()
+    try:
+        # Os processos de extração sobem e aquecem enquanto o modelo carrega
+        processos = [loop.run_in_executor(pool_extracao, processador_audio.processo_pronto)
+                     for _ in range(EXTRACTION_WORKERS)]
+        if not registro_modelos.pronto:
+            await asyncio.to_thread(carregar_modelo)
+        if registro_modelos.pronto:
+            await asyncio.to_thread(aquecer_modelo)
+        # Só agora começa a vigiar os arquivos: a carga inicial já terminou
+        registro_modelos.iniciar_vigia()
+        inicio_extracao = time.perf_counter()
+        await asyncio.gather(*processos)
+        tempos_inicializacao['espera_extracao'] = time.perf_counter() - inicio_extracao
+    except Exception as e:
+        logger.error(f"Erro durante o aquecimento: {e}")
+    finally:
+        tempos_inicializacao['aquecimento_total'] = time.perf_counter() - inicio
+        tempos_inicializacao['ate_pronto'] = time.perf_counter() - _INICIO_PROCESSO
+        bot_pronto.set()
+    logger.info(f"Bot pronto. Tempos de inicialização: {formatar_tempos_inicializacao()}")
+
+async def parar_servicos() -> None:
+    await registro_modelos.parar()
+    if pool_extracao is not None:
+        pool_extracao.shutdown(wait=False, cancel_futures=True)
+
+async def post_init(application: Application) -> None:
+    """Inicia os serviços quando o event loop do bot já está rodando."""
+    iniciar_servicos()
+    if METRICS_ENABLED:
+        try:
+            await servidor_metricas.iniciar()
+        except OSError as e:
+            logger.error(f"Não foi possível abrir o servidor de métricas na porta {METRICS_PORT}: {e}")
+    tempos_inicializacao['ate_polling'] = time.perf_counter() - _INICIO_PROCESSO
+    # Em segundo plano: o polling começa já e o /start responde durante o aquecimento
+    application.create_task(aquecer())
+
+async def post_shutdown(application: Application) -> None:
+    await servidor_metricas.parar()
+    await parar_servicos()
+
+def criar_aplicacao(webhook: bool = False) -> Application:
+    """Monta a Application com os handlers do bot."""
+    construtor = (
+        Application.builder()
+        .token(TOKEN)
+        .concurrent_updates(True) # Várias mensagens ao mesmo tempo, para a fila conseguir montar lotes
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if API_BASE_URL:
+        construtor = construtor.base_url(f"{API_BASE_URL}/bot").base_file_url(f"{API_BASE_URL}/file/bot")
+    if webhook:
+        construtor = construtor.updater(None) # Os updates chegam pelo ServidorWebhook, não pelo polling
+    application = construtor.build()
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("status", status))
+    application.add_handler(MessageHandler(filters.AUDIO | filters.VOICE, handle_audio))
+    return application
+
+# --- 4. MODO WEBHOOK ---
+# O processo principal registra a URL no Telegram (setWebhook) e sobe
+# WebhookWorkers processos. Cada um tem o seu modelo, a sua fila de inferência
+# e o seu pool de extração, e abre a mesma porta com SO_REUSEPORT: o sistema
+# operacional divide as conexões do Telegram entre eles.
+
+async def registrar_webhook() -> None:
+    """Informa ao Telegram a URL para onde mandar os updates (uma vez, no processo principal)."""
+    bot_api = criar_aplicacao(webhook=True).bot
+    async with bot_api:
+        await bot_api.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET or None)
+    logger.info(f"Webhook registrado no Telegram: {WEBHOOK_URL}")
+
+async def servir_webhook(indice: int = 0, reuse_port: bool = False) -> None:
+    """
+    Roda um processo do modo webhook até receber Ctrl+C ou SIGTERM.
+
+    A porta só é aberta depois que o modelo e os processos de extração estão
+    aquecidos, então o sistema operacional nunca entrega um update a um
+    processo que ainda está ligando (o Telegram reenvia o que não foi aceito).
+    """
+    servidor_metricas.porta = METRICS_PORT + indice # Cada processo expõe as suas métricas
+    parar = asyncio.Event()
+    if os.name != 'nt':
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, parar.set)
+    application = criar_aplicacao(webhook=True)
+    servidor = ServidorWebhook(application, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, reuse_port)
+    async with application:
+        await application.start()
+        await post_init(application)
+        try:
+            await bot_pronto.wait()
+            await servidor.iniciar()
+            logger.info(f"Processo {indice} do webhook pronto.")
+            await parar.wait()
+        finally:
+            await servidor.parar()
+            await application.stop()
+            await post_shutdown(application)
+
+def _processo_webhook(indice: int) -> None:
+    """Ponto de entrada dos processos do webhook (uma função do módulo, para funcionar com spawn)."""
+    try:
+        asyncio.run(servir_webhook(indice, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+def rodar_webhook() -> None:
+    if WEBHOOK_URL:
+        asyncio.run(registrar_webhook())
+    else:
+        logger.warning("WebhookUrl está vazio: o setWebhook não foi chamado; os updates só chegam se "
+                       "o webhook já estiver registrado no Telegram.")
+    trabalhadores = max(1, WEBHOOK_WORKERS)
+    if trabalhadores > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        logger.warning("Este sistema não tem SO_REUSEPORT (ex.: Windows): o webhook roda em um processo só.")
+        trabalhadores = 1
+    if trabalhadores == 1:
+        _processo_webhook(0)
+        return
+
+    contexto = multiprocessing.get_context('spawn') # Cada processo importa e carrega tudo do zero
+    processos = [contexto.Process(target=_processo_webhook, args=(i,), name=f"webhook-{i}")
+                 for i in range(trabalhadores)]
+    for processo in processos:
+        processo.start()
+    logger.info(f"{trabalhadores} processos atendendo o webhook em {WEBHOOK_HOST}:{WEBHOOK_PORT}.")
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        # Os processos também recebem o Ctrl+C e encerram sozinhos
+        for processo in processos:
+            processo.join(timeout=30)
 
 def main() -> None:
     """Inicia o bot."""
     os.makedirs(TEMP_DIR, exist_ok=True)
-    application = Application.builder().token(TOKEN).build()
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(MessageHandler(filters.AUDIO | filters.VOICE, handle_audio))
-    
+    if DEPLOYMENT_MODE not in ('polling', 'webhook'):
+        logger.error(f"[Deployment] Mode desconhecido: '{DEPLOYMENT_MODE}'. Use 'polling' ou 'webhook'.")
+        return
+
     logger.info("Bot iniciado. Pressione Ctrl+C para parar.")
+    if limitador_chats.ativo:
+        logger.info(f"Limite por chat: {RATE_LIMIT_PER_MINUTE:g} áudios por minuto (rajada de até {RATE_LIMIT_BURST}).")
+    if RELOAD_INTERVAL > 0:
+        logger.info(f"Os modelos e o {CONFIG_PATH} são verificados a cada {RELOAD_INTERVAL:g}s e trocados sem reiniciar.")
+    logger.info(f"Inferência em lotes de até {MAX_BATCH_SIZE} áudios (espera máxima de {MAX_WAIT_MS:g} ms).")
+    logger.info(f"Extração de pitch em {EXTRACTION_WORKERS} processos, até {MAX_IN_FLIGHT} áudios em análise ao mesmo tempo.")
     if ALLOWED_CHAT_IDS:
         logger.info(f"Bot configurado para aceitar requisições apenas dos seguintes Chat IDs: {ALLOWED_CHAT_IDS}")
     else:
         logger.warning("Nenhum Chat ID foi configurado. O bot está aberto para qualquer pessoa.")
-        
-    application.run_polling()
+
+    if DEPLOYMENT_MODE == 'webhook':
+        rodar_webhook()
+        return
+    if not BACKGROUND_WARMUP:
+        carregar_modelo() # Modo antigo: só começa a receber mensagens com o modelo carregado
+    criar_aplicacao().run_polling()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+import numpy as np
+
+# Mude este número sempre que a forma de calcular o contorno mudar,
+# assim as entradas antigas do cache deixam de ser usadas.
+VERSAO_CACHE = 1
+
+class CacheContornos:
+    """
+    Cache em disco para os vetores de pitch, endereçado pelo conteúdo do áudio.
+
+    A chave é o hash do conteúdo do arquivo (não o nome nem a data) mais os
+    parâmetros de extração (sr, fmin, fmax, tamanho_fixo). Cada entrada é um
+    pequeno .npy dentro de `diretorio`. Quando o cache passa de `tamanho_max_mb`,
+    as entradas usadas há mais tempo são apagadas (LRU pela data de modificação,
+    que é atualizada a cada acerto).
+
+    O mesmo diretório pode ser usado por vários processos ao mesmo tempo
+    (as escritas são atômicas); os contadores de acertos/falhas são por processo.
+    Cada processo só conhece as próprias escritas, então o tamanho total é
+    recontado no disco sempre que ele grava mais 5% do limite: com N processos,
+    o cache passa do limite em no máximo N x 5% antes de alguém evictar.
+    """
+
+    def __init__(self, diretorio, tamanho_max_mb=500):
+        self.diretorio = diretorio
+        self.tamanho_max_bytes = int(tamanho_max_mb * 1024 * 1024)
+        self.acertos = 0
+        self.falhas = 0
+        self._tamanho_total = None # Calculado na primeira escrita
+        self._gravado_desde_contagem = 0
+        self._intervalo_contagem = max(1, self.tamanho_max_bytes // 20)
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    @staticmethod
+    def hash_conteudo(dados):
+        """Hash SHA-256 de um bloco de bytes (o conteúdo do arquivo de áudio)."""
+        return hashlib.sha256(dados).hexdigest()
+
+    @staticmethod
+    def hash_arquivo(caminho_arquivo):
+        """Hash SHA-256 do conteúdo de um arquivo, lido em blocos."""
+        h = hashlib.sha256()
+        with open(caminho_arquivo, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloco)
+        return h.hexdigest()
+
+    @staticmethod
+    def chave(hash_audio, **parametros):
+        """Combina o hash do áudio com os parâmetros de extração em uma única chave."""
+        texto_parametros = '|'.join(f"{nome}={parametros[nome]}" for nome in sorted(parametros))
+        texto = f"v{VERSAO_CACHE}|{hash_audio}|{texto_parametros}"
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave[:2], f"{chave}.npy")
+
+    def obter(self, chave):
+        """Retorna o vetor guardado para `chave`, ou None se não estiver no cache."""
+        caminho = self._caminho(chave)
+        try:
+            vetor = np.load(caminho)
+        except (OSError, ValueError):
+            with self._lock:
+                self.falhas += 1
+            return None
+        try:
+            os.utime(caminho) # Marca como usado recentemente (LRU)
+        except OSError:
+            pass
+        with self._lock:
+            self.acertos += 1
+        return vetor
+
+    def guardar(self, chave, vetor):
+        """Guarda `vetor` no cache e apaga as entradas mais antigas se passar do limite."""
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        caminho_tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(caminho_tmp, 'wb') as f:
+            np.save(f, vetor)
+        tamanho_novo = os.path.getsize(caminho_tmp)
+        try:
+            tamanho_antigo = os.path.getsize(caminho) # A chave já existia: só a diferença conta
+        except OSError:
+            tamanho_antigo = 0
+        os.replace(caminho_tmp, caminho)
+
+        with self._lock:
+            self._gravado_desde_contagem += tamanho_novo
+            if self._tamanho_total is None or self._gravado_desde_contagem >= self._intervalo_contagem:
+                self._contar()
+            else:
+                self._tamanho_total += tamanho_novo - tamanho_antigo
+            if self._tamanho_total > self.tamanho_max_bytes:
+                self._evictar()
+
+    def _contar(self):
+        """Reconta o tamanho do cache no disco (inclui o que outros processos gravaram)."""
+        self._tamanho_total = sum(tamanho for _, tamanho, _ in self._listar_entradas())
+        self._gravado_desde_contagem = 0
+
+    def _listar_entradas(self):
+        """Lista (data_uso, tamanho, caminho) de todas as entradas do cache."""
+        entradas = []
+        for raiz, _, arquivos in os.walk(self.diretorio):
+            for nome in arquivos:
+                if not nome.endswith('.npy'):
+                    continue
+                caminho = os.path.join(raiz, nome)
+                try:
+                    info = os.stat(caminho)
+                except OSError:
+                    continue # Apagado por outro processo
+                entradas.append((info.st_mtime, info.st_size, caminho))
+        return entradas
+
+    def _evictar(self):
+        """Apaga as entradas usadas há mais tempo até o cache ficar em 90% do limite."""
+        entradas = sorted(self._listar_entradas())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        alvo = int(self.tamanho_max_bytes * 0.9)
+        for _, tamanho, caminho in entradas:
+            if total <= alvo:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+        self._tamanho_total = total
+        self._gravado_desde_contagem = 0
+
+    def estatisticas(self):
+        """Contadores de acertos/falhas deste processo."""
+        total = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / total if total else 0.0,
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class FilaInferencia:
+    """
+    Junta pedidos de previsão que chegam quase ao mesmo tempo em um único lote.
+
+    Cada handler chama `await fila.prever(vetor)`. O laço da fila espera no máximo
+    `espera_max_ms` (ou até juntar `tamanho_max_lote` pedidos), roda o modelo uma
+    vez para o lote inteiro em uma thread separada (o event loop continua livre) e
+    devolve a linha certa do resultado para cada handler.
+
+    Enquanto um lote está no modelo, os próximos pedidos vão se acumulando na fila,
+    então sob carga os lotes crescem sozinhos.
+    """
+
+    def __init__(self, funcao_predicao, tamanho_max_lote=32, espera_max_ms=5.0, tamanho_vetor=100):
+        # funcao_predicao recebe um array (N, tamanho_vetor, 1) e devolve as probabilidades (N, num_classes)
+        self.funcao_predicao = funcao_predicao
+        self.tamanho_vetor = tamanho_vetor
+        self.tamanho_max_lote = max(1, int(tamanho_max_lote))
+        self.espera_max = max(0.0, espera_max_ms) / 1000
+        self._fila = asyncio.Queue()
+        self._tarefa = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inferencia')
+
+        # Métricas
+        self.lotes_processados = 0
+        self.amostras_processadas = 0
+        self.maior_profundidade = 0
+        self.tempo_total_modelo = 0.0
+        self.histograma_lotes = Counter()
+
+    def iniciar(self):
+        """Inicia o laço da fila (precisa ser chamado com o event loop rodando)."""
+        if self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(self._laco())
+
+    async def parar(self):
+        """Para o laço da fila e libera a thread do modelo."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        self._executor.shutdown(wait=False)
+
+    async def prever(self, vetor):
+        """Enfileira um vetor de feature (tamanho_vetor,) e espera as probabilidades de cada classe."""
+        vetor = np.asarray(vetor, dtype=np.float32)
+        if vetor.shape != (self.tamanho_vetor,):
+            # Recusado aqui, antes da fila: um vetor fora do formato derrubaria o lote inteiro
+            raise ValueError(f"Vetor de feature com formato {vetor.shape}; esperado ({self.tamanho_vetor},).")
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((vetor, futuro))
+        self.maior_profundidade = max(self.maior_profundidade, self._fila.qsize())
+        return await futuro
+
+    async def _juntar_lote(self):
+        """Espera o primeiro pedido e junta os que chegarem até o prazo ou até encher o lote."""
+        lote = [await self._fila.get()]
+        loop = asyncio.get_running_loop()
+        prazo = loop.time() + self.espera_max
+        while len(lote) < self.tamanho_max_lote:
+            if not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+                continue
+            restante = prazo - loop.time()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._fila.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _laco(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = await self._juntar_lote()
+            # Pedidos cujo handler já desistiu (ex.: cancelado) não vão para o modelo
+            lote = [(vetor, futuro) for vetor, futuro in lote if not futuro.done()]
+            if not lote:
+                continue
+
+            inicio = time.perf_counter()
+            try:
+                entradas = np.stack([vetor for vetor, _ in lote])[..., np.newaxis]
+                probabilidades = await loop.run_in_executor(self._executor, self.funcao_predicao, entradas)
+            except Exception as e:
+                logger.error(f"Erro ao rodar o modelo em um lote de {len(lote)}: {e}")
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            self.tempo_total_modelo += time.perf_counter() - inicio
+
+            self.lotes_processados += 1
+            self.amostras_processadas += len(lote)
+            self.histograma_lotes[len(lote)] += 1
+            for (_, futuro), linha in zip(lote, np.asarray(probabilidades)):
+                if not futuro.done():
+                    futuro.set_result(linha)
+
+    def metricas(self):
+        """Retorna um retrato das métricas da fila."""
+        return {
+            'profundidade_fila': self._fila.qsize(),
+            'maior_profundidade': self.maior_profundidade,
+            'lotes_processados': self.lotes_processados,
+            'amostras_processadas': self.amostras_processadas,
+            'tamanho_medio_lote': (self.amostras_processadas / self.lotes_processados
+                                   if self.lotes_processados else 0.0),
+            'ms_medio_por_lote': (self.tempo_total_modelo * 1000 / self.lotes_processados
+                                  if self.lotes_processados else 0.0),
+            'histograma_lotes': dict(sorted(self.histograma_lotes.items())),
+        }
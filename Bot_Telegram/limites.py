@@ -0,0 +1,133 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+# Proteções do handle_audio contra excesso de pedidos, tudo em memória.
+#
+# - LimitadorChats: balde de fichas por chat. Cada áudio gasta uma ficha; as
+#   fichas voltam a `por_minuto` por minuto, até `rajada`. Um chat mandando
+#   áudios sem parar não toma conta dos processos de extração.
+# - CacheResultados: resposta já dada para um áudio, pelo file_unique_id do
+#   Telegram (o mesmo para um áudio encaminhado para qualquer chat). Um
+#   áudio repetido é respondido sem download nem análise, e um que chega
+#   enquanto o igual ainda está em análise espera aquela resposta.
+#
+# Os dois só são usados dentro do event loop, então não precisam de trava.
+
+class LimitadorChats:
+    """
+    Balde de fichas por chat. `por_minuto <= 0` desliga o limite.
+
+    Guarda no máximo `max_chats` baldes; os de chats parados há mais tempo
+    são descartados primeiro (voltariam cheios de qualquer forma).
+    """
+
+    def __init__(self, por_minuto, rajada=1, max_chats=10000):
+        self.por_segundo = max(0.0, por_minuto) / 60
+        self.rajada = max(1.0, float(rajada))
+        self.max_chats = max_chats
+        self.recusas = 0
+        self._baldes = OrderedDict() # chat -> [fichas, último acesso, já avisado da recusa]
+
+    @property
+    def ativo(self):
+        return self.por_segundo > 0
+
+    def verificar(self, chat_id):
+        """
+        Gasta uma ficha do chat, se houver.
+
+        Returns:
+            tuple: (segundos até a próxima ficha, 0.0 se o pedido pode seguir;
+                    True se é a primeira recusa desde o último pedido aceito).
+        """
+        if not self.ativo:
+            return 0.0, False
+        agora = time.monotonic()
+        balde = self._baldes.pop(chat_id, None)
+        if balde is None:
+            balde = [self.rajada, agora, False]
+        else:
+            balde[0] = min(self.rajada, balde[0] + (agora - balde[1]) * self.por_segundo)
+            balde[1] = agora
+        self._baldes[chat_id] = balde # Vai para o fim: usado agora
+        while len(self._baldes) > self.max_chats:
+            self._baldes.popitem(last=False)
+
+        if balde[0] >= 1:
+            balde[0] -= 1
+            balde[2] = False
+            return 0.0, False
+        self.recusas += 1
+        primeira = not balde[2]
+        balde[2] = True
+        return (1 - balde[0]) / self.por_segundo, primeira
+
+class CacheResultados:
+    """
+    Cache LRU com prazo de validade para as respostas do bot. `max_itens <= 0` desliga o cache.
+
+    Uso no handler:
+        resposta = cache.obter(chave)
+        if resposta is None and (futuro := cache.em_andamento(chave)):
+            resposta = await futuro # None se a análise original falhou
+        ...
+        cache.iniciar(chave)
+        try:
+            resposta = analisar()
+        finally:
+            cache.concluir(chave, resposta)
+    """
+
+    def __init__(self, max_itens=1000, ttl_s=3600):
+        self.max_itens = max_itens
+        self.ttl_s = ttl_s
+        self.acertos = 0
+        self._itens = OrderedDict() # chave -> (validade, resposta)
+        self._andamento = {} # chave -> Future com a resposta
+
+    @property
+    def ativo(self):
+        return self.max_itens > 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave):
+        """Resposta guardada para `chave`, ou None se não há (ou já venceu)."""
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        validade, resposta = item
+        if time.monotonic() >= validade:
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        self.acertos += 1
+        return resposta
+
+    def guardar(self, chave, resposta):
+        if not self.ativo:
+            return
+        self._itens[chave] = (time.monotonic() + self.ttl_s, resposta)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def em_andamento(self, chave):
+        """Future que recebe a resposta de uma análise da mesma chave ainda em andamento, ou None."""
+        futuro = self._andamento.get(chave)
+        return asyncio.shield(futuro) if futuro is not None else None # Quem espera não cancela a original
+
+    def iniciar(self, chave):
+        """Marca que a análise de `chave` começou: pedidos iguais passam a esperar por ela."""
+        if self.ativo and chave not in self._andamento:
+            self._andamento[chave] = asyncio.get_running_loop().create_future()
+
+    def concluir(self, chave, resposta=None):
+        """Entrega a resposta (None = falhou) a quem está esperando e a guarda no cache."""
+        futuro = self._andamento.pop(chave, None)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(resposta)
+        if resposta is not None:
+            self.guardar(chave, resposta)
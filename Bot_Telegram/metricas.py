@@ -0,0 +1,199 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Métricas no formato de texto do Prometheus, sem dependências externas.
+#
+# Contadores e histogramas são só somas em dicts (alguns microssegundos por
+# observação), então podem ficar ligados em produção. Com o registro
+# desligado (ativo=False), toda chamada retorna na hora e o servidor não sobe.
+
+# Limites dos histogramas de tempo, em segundos (de 1 ms a 30 s)
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, registro, nome, ajuda, rotulos=()):
+        self.registro = registro
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock() # A thread da inferência também registra métricas
+
+    def _chave(self, rotulos):
+        return tuple(rotulos.get(nome, '') for nome in self.rotulos)
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._trava:
+            linhas += self._linhas()
+        return linhas
+
+class Contador(_Metrica):
+    """Valor que só cresce (ex.: total de erros). Um valor por combinação de rótulos."""
+    tipo = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores = {}
+
+    def inc(self, valor=1, **rotulos):
+        if not self.registro.ativo:
+            return
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def _linhas(self):
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}"
+                for chave, valor in sorted(self._valores.items())]
+
+class Medidor(_Metrica):
+    """Valor do momento (ex.: profundidade da fila), lido de uma função na hora da coleta."""
+    tipo = 'gauge'
+
+    def __init__(self, registro, nome, ajuda, funcao):
+        super().__init__(registro, nome, ajuda)
+        self.funcao = funcao
+
+    def _linhas(self):
+        try:
+            return [f"{self.nome} {_formatar_numero(self.funcao())}"]
+        except Exception as e:
+            logger.warning(f"Falha ao ler o medidor '{self.nome}': {e}")
+            return []
+
+class Histograma(_Metrica):
+    """Distribuição de valores (ex.: tempo por etapa) em faixas acumuladas, mais soma e contagem."""
+    tipo = 'histogram'
+
+    def __init__(self, registro, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(registro, nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # chave -> [contagens por faixa (não acumuladas) + 1 para +Inf, soma]
+
+    def observar(self, valor, **rotulos):
+        if not self.registro.ativo:
+            return
+        chave = self._chave(rotulos)
+        posicao = bisect.bisect_left(self.buckets, valor)
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][posicao] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        """`with histograma.cronometrar(etapa='x'):` observa a duração do bloco em segundos."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def _linhas(self):
+        linhas = []
+        for chave, (contagens, soma) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float('inf'),), contagens):
+                acumulado += contagem
+                rotulo_le = ('le', _formatar_numero(limite) if limite != float('inf') else '+Inf')
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, rotulo_le)} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(soma)}")
+            linhas.append(f"{self.nome}_count{rotulos} {acumulado}")
+        return linhas
+
+class RegistroMetricas:
+    """Cria e guarda as métricas, e gera o texto do /metrics."""
+
+    def __init__(self, ativo=True, prefixo=''):
+        self.ativo = ativo
+        self.prefixo = prefixo
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(self, self.prefixo + nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        return self._registrar(Histograma(self, self.prefixo + nome, ajuda, rotulos, buckets))
+
+    def medidor(self, nome, ajuda, funcao):
+        return self._registrar(Medidor(self, self.prefixo + nome, ajuda, funcao))
+
+    def exportar(self):
+        linhas = []
+        for metrica in self._metricas:
+            linhas += metrica.exportar()
+        return '\n'.join(linhas) + '\n'
+
+class ServidorMetricas:
+    """
+    Servidor HTTP mínimo (asyncio puro) que responde `GET /metrics` com o texto
+    do registro. Roda no mesmo event loop do bot; cada coleta leva poucos milissegundos.
+    """
+
+    def __init__(self, registro, host='127.0.0.1', porta=9464):
+        self.registro = registro
+        self.host = host
+        self.porta = porta
+        self._servidor = None
+
+    async def iniciar(self):
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        logger.info(f"Métricas disponíveis em http://{self.host}:{self.porta}/metrics")
+
+    async def parar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def _atender(self, leitor, escritor):
+        try:
+            linha = await asyncio.wait_for(leitor.readline(), timeout=5)
+            while (await asyncio.wait_for(leitor.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+                pass # Ignora os cabeçalhos
+            partes = linha.decode('latin-1').split()
+            if len(partes) >= 2 and partes[0] == 'GET' and partes[1].split('?')[0] == '/metrics':
+                status, corpo = '200 OK', self.registro.exportar().encode('utf-8')
+            else:
+                status, corpo = '404 Not Found', b'Use GET /metrics\n'
+            cabecalho = (f"HTTP/1.1 {status}\r\n"
+                         "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(corpo)}\r\n"
+                         "Connection: close\r\n\r\n")
+            escritor.write(cabecalho.encode('latin-1') + corpo)
+            await escritor.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
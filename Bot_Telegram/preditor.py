@@ -0,0 +1,161 @@
+import os
+import numpy as np
+
+# Nenhum import do TensorFlow aqui em cima: com o backend TFLite (e o pacote
+# tflite-runtime ou ai-edge-litert instalado) o TensorFlow nunca é carregado.
+
+def _importar_interpreter():
+    """Procura um interpretador TFLite, do mais leve para o mais pesado."""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf # Último recurso: o interpretador que vem com o TensorFlow
+    return tf.lite.Interpreter
+
+# Tamanhos de lote com interpretador próprio no TFLite (além do máximo). Os
+# micro-lotes do bot costumam ter 2 a 4 áudios: completar cada um até o lote
+# máximo faria o modelo rodar 32 linhas para prever 2.
+TAMANHOS_LOTE_TFLITE = (1, 2, 4, 8, 16)
+
+def _formatar_entrada(lote):
+    """Aceita (N, 100) ou (N, 100, 1) e devolve sempre (N, 100, 1) em float32."""
+    lote = np.asarray(lote, dtype=np.float32)
+    if lote.ndim == 2:
+        lote = lote[..., np.newaxis]
+    return lote
+
+class Preditor:
+    """
+    Interface comum para rodar o classificador de tons, seja em Keras ou TFLite.
+
+    `prever(lote)` recebe um lote (N, 100) ou (N, 100, 1) de vetores de pitch e
+    devolve as probabilidades (N, num_classes) como um array NumPy.
+    """
+    backend = None
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def prever(self, lote):
+        raise NotImplementedError
+
+    def descrever(self):
+        """Texto curto sobre o modelo carregado, para o log."""
+        return f"{self.backend}: {self.caminho}"
+
+class PreditorKeras(Preditor):
+    """Roda o modelo .keras com o TensorFlow completo."""
+    backend = 'keras'
+
+    def __init__(self, caminho):
+        super().__init__(caminho)
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(caminho)
+
+    def prever(self, lote):
+        return np.asarray(self.model.predict_on_batch(_formatar_entrada(lote)))
+
+    def descrever(self):
+        linhas = []
+        self.model.summary(print_fn=lambda linha, **kwargs: linhas.append(linha))
+        return f"{super().descrever()}\n" + '\n'.join(linhas)
+
+class PreditorTFLite(Preditor):
+    """
+    Roda um modelo .tflite com o interpretador do TensorFlow Lite.
+
+    Os tensores de entrada/saída são alocados uma única vez, em um
+    interpretador para cada tamanho de TAMANHOS_LOTE_TFLITE (até
+    `tamanho_max_lote`) e outro para o próprio `tamanho_max_lote`. Cada lote
+    usa o menor interpretador em que cabe, completado com zeros no buffer
+    pré-alocado (no máximo o dobro das linhas); lotes maiores que o máximo são divididos.
+
+    Modelos quantizados (entrada/saída int8 ou uint8) são tratados aqui:
+    a entrada é quantizada e a saída volta para float.
+    """
+    backend = 'tflite'
+
+    def __init__(self, caminho=None, conteudo=None, tamanho_max_lote=32, num_threads=None):
+        super().__init__(caminho or '<em memória>')
+        self._Interpreter = _importar_interpreter()
+        self._fonte = {'model_content': conteudo} if conteudo is not None else {'model_path': caminho}
+        self._num_threads = num_threads
+        self.tamanho_max_lote = max(1, int(tamanho_max_lote))
+        self._tamanhos = sorted({t for t in TAMANHOS_LOTE_TFLITE if t < self.tamanho_max_lote}
+                                | {self.tamanho_max_lote})
+        self._interpretadores = {tamanho: self._preparar(tamanho) for tamanho in self._tamanhos}
+
+    def _preparar(self, tamanho_lote):
+        interpretador = self._Interpreter(num_threads=self._num_threads, **self._fonte)
+        entrada = interpretador.get_input_details()[0]
+        formato = list(entrada['shape'])
+        formato[0] = tamanho_lote
+        interpretador.resize_tensor_input(entrada['index'], formato)
+        interpretador.allocate_tensors()
+        entrada = interpretador.get_input_details()[0]
+        saida = interpretador.get_output_details()[0]
+        buffer = np.zeros(entrada['shape'], dtype=entrada['dtype'])
+        return interpretador, entrada, saida, buffer
+
+    @staticmethod
+    def _quantizar(lote, detalhes):
+        escala, ponto_zero = detalhes['quantization']
+        if detalhes['dtype'] == np.float32 or not escala:
+            return lote
+        info = np.iinfo(detalhes['dtype'])
+        return np.clip(np.round(lote / escala + ponto_zero), info.min, info.max)
+
+    @staticmethod
+    def _desquantizar(saida, detalhes):
+        escala, ponto_zero = detalhes['quantization']
+        if detalhes['dtype'] == np.float32 or not escala:
+            return saida.astype(np.float32)
+        return (saida.astype(np.float32) - ponto_zero) * escala
+
+    def _invocar(self, lote):
+        n = len(lote)
+        tamanho = next(t for t in self._tamanhos if t >= n) # O menor interpretador em que o lote cabe
+        interpretador, entrada, saida, buffer = self._interpretadores[tamanho]
+        buffer[:n] = self._quantizar(lote, entrada)
+        buffer[n:] = 0
+        interpretador.set_tensor(entrada['index'], buffer)
+        interpretador.invoke()
+        return self._desquantizar(interpretador.get_tensor(saida['index'])[:n], saida)
+
+    def prever(self, lote):
+        lote = _formatar_entrada(lote)
+        if len(lote) <= self.tamanho_max_lote:
+            return self._invocar(lote)
+        partes = [self._invocar(lote[i:i + self.tamanho_max_lote])
+                  for i in range(0, len(lote), self.tamanho_max_lote)]
+        return np.concatenate(partes)
+
+    def descrever(self):
+        interpretador, entrada, saida, _ = self._interpretadores[self.tamanho_max_lote]
+        return (f"{super().descrever()} (entrada {entrada['dtype'].__name__}, "
+                f"saída {saida['dtype'].__name__}, lote máximo {self.tamanho_max_lote})")
+
+def carregar_preditor(caminho, backend='auto', tamanho_max_lote=32, num_threads=None):
+    """
+    Cria o preditor certo para `caminho`.
+
+    Args:
+        backend (str): 'keras', 'tflite' ou 'auto' (decide pela extensão do arquivo).
+        tamanho_max_lote (int): Maior lote esperado (usado para pré-alocar os tensores do TFLite).
+        num_threads (int | None): Threads do interpretador TFLite (None = padrão).
+    """
+    backend = (backend or 'auto').strip().lower()
+    if backend == 'auto':
+        backend = 'tflite' if os.path.splitext(caminho)[1].lower() == '.tflite' else 'keras'
+    if backend == 'keras':
+        return PreditorKeras(caminho)
+    if backend == 'tflite':
+        return PreditorTFLite(caminho, tamanho_max_lote=tamanho_max_lote, num_threads=num_threads)
+    raise ValueError(f"Backend de modelo desconhecido: '{backend}'. Use 'keras', 'tflite' ou 'auto'.")
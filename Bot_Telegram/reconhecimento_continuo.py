@@ -0,0 +1,223 @@
+import io
+import sys
+import numpy as np
+import soundfile as sf
+from numpy.lib.stride_tricks import sliding_window_view
+
+from processador_audio import TAXA_AMOSTRAGEM, carregar_audio, normalizar_contornos_lote, yin_quadros
+
+# Reconhecimento de tons em gravações longas (uma frase, um áudio de 30 s...).
+#
+# O áudio é lido em blocos, o F0 é calculado bloco a bloco com o YIN vetorizado
+# (o pYIN não serve aqui: o Viterbi dele precisa do áudio inteiro), os trechos
+# vozeados viram sílabas e cada sílaba vira um vetor de 100 pontos, igual aos
+# do treino. A memória usada não depende do tamanho da gravação: só o bloco
+# atual, o resto do frame anterior e a sílaba em andamento ficam guardados.
+
+TAMANHO_QUADRO = 1024
+SALTO = 512 # Mesma grade de frames do extrair_e_normalizar_pitch
+
+def ler_blocos(fonte, sr=TAXA_AMOSTRAGEM, duracao_bloco_s=0.5):
+    """
+    Gera o áudio de `fonte` em blocos float32 mono já na taxa `sr`.
+
+    Arquivos que o soundfile lê (wav, flac, ogg/opus...) são lidos e
+    reamostrados aos poucos. Outros formatos (ex.: m4a) são decodificados
+    inteiros por carregar_audio e só depois divididos em blocos.
+    """
+    if isinstance(fonte, np.ndarray):
+        tamanho = max(1, int(duracao_bloco_s * sr))
+        for inicio in range(0, len(fonte), tamanho):
+            yield fonte[inicio:inicio + tamanho].astype(np.float32, copy=False)
+        return
+
+    arquivo = io.BytesIO(bytes(fonte)) if isinstance(fonte, (bytes, bytearray, memoryview)) else fonte
+    try:
+        leitor = sf.SoundFile(arquivo)
+    except RuntimeError: # sf.LibsndfileError: formato desconhecido
+        y, _ = carregar_audio(fonte, sr)
+        yield from ler_blocos(y, sr, duracao_bloco_s)
+        return
+
+    with leitor:
+        reamostrador = None
+        if leitor.samplerate != sr:
+            import soxr # Vem junto com o librosa; reamostra em fluxo, sem emendas entre blocos
+            reamostrador = soxr.ResampleStream(leitor.samplerate, sr, 1, dtype='float32')
+        tamanho = max(1, int(duracao_bloco_s * leitor.samplerate))
+        while True:
+            bloco = leitor.read(tamanho, dtype='float32', always_2d=True)
+            ultimo = len(bloco) < tamanho
+            bloco = bloco.mean(axis=1) if bloco.shape[1] > 1 else bloco[:, 0]
+            if reamostrador is not None:
+                bloco = reamostrador.resample_chunk(bloco, last=ultimo)
+            if len(bloco):
+                yield bloco
+            if ultimo:
+                break
+
+class RastreadorPitch:
+    """
+    YIN incremental: recebe blocos de áudio e devolve o F0 dos frames que já
+    podem ser calculados (NaN nos não-vozeados). Junto com `finalizar()`, gera
+    os mesmos frames que o pitch_yin_vetorizado geraria com o áudio inteiro.
+
+    Como o maior RMS do áudio não é conhecido de antemão, o limiar de silêncio
+    é relativo ao maior RMS visto até agora (com um piso absoluto).
+    """
+
+    def __init__(self, sr=TAXA_AMOSTRAGEM, fmin=80, fmax=450, limiar=0.15,
+                 limiar_rms_relativo=0.05, rms_minimo=1e-3):
+        self.sr = sr
+        self.fmin = fmin
+        self.fmax = fmax
+        self.limiar = limiar
+        self.limiar_rms_relativo = limiar_rms_relativo
+        self.rms_minimo = rms_minimo
+        self._rms_max = 0.0
+        # Mesmo padding do início que o pYIN usa (frames centralizados)
+        self._resto = np.zeros(TAMANHO_QUADRO // 2)
+
+    def processar(self, bloco):
+        """F0 dos frames completos disponíveis depois de acrescentar `bloco`."""
+        amostras = np.concatenate([self._resto, np.asarray(bloco, dtype=np.float64)])
+        num_quadros = 1 + (len(amostras) - TAMANHO_QUADRO) // SALTO if len(amostras) >= TAMANHO_QUADRO else 0
+        if num_quadros == 0:
+            self._resto = amostras
+            return np.zeros(0)
+
+        quadros = sliding_window_view(amostras, TAMANHO_QUADRO)[::SALTO][:num_quadros]
+        f0, rms = yin_quadros(quadros, self.sr, self.fmin, self.fmax, self.limiar)
+        self._resto = amostras[num_quadros * SALTO:].copy() # Só o que falta para o próximo frame
+
+        self._rms_max = max(self._rms_max, float(rms.max()))
+        vozeado = rms >= max(self.rms_minimo, self.limiar_rms_relativo * self._rms_max)
+        return np.where(vozeado, f0, np.nan)
+
+    def finalizar(self):
+        """Frames finais (com o padding do fim, como no pYIN)."""
+        return self.processar(np.zeros(TAMANHO_QUADRO // 2))
+
+class SegmentadorSilabas:
+    """
+    Junta frames vozeados consecutivos em sílabas.
+
+    Uma sílaba termina depois de `max_lacuna` frames mudos seguidos, ou ao
+    chegar a `max_quadros` (para a memória continuar limitada mesmo se alguém
+    cantar sem parar). Trechos com menos de `min_quadros` frames vozeados são
+    descartados (estalos, respiração).
+    """
+
+    def __init__(self, min_quadros=5, max_lacuna=3, max_quadros=60):
+        self.min_quadros = min_quadros
+        self.max_lacuna = max_lacuna
+        self.max_quadros = max_quadros
+        self._quadro_atual = 0
+        self._inicio = None
+        self._valores = []
+        self._lacuna = 0
+
+    def adicionar(self, f0):
+        """Recebe o F0 de novos frames e devolve as sílabas que terminaram: [(frame_inicial, f0), ...]."""
+        prontas = []
+        for valor in f0:
+            if not np.isnan(valor):
+                if self._inicio is None:
+                    self._inicio = self._quadro_atual
+                self._valores.extend([np.nan] * self._lacuna) # Pequenas falhas ficam dentro da sílaba
+                self._valores.append(valor)
+                self._lacuna = 0
+                if len(self._valores) >= self.max_quadros:
+                    prontas += self._fechar()
+            elif self._inicio is not None:
+                self._lacuna += 1
+                if self._lacuna > self.max_lacuna:
+                    prontas += self._fechar()
+            self._quadro_atual += 1
+        return prontas
+
+    def finalizar(self):
+        return self._fechar()
+
+    def _fechar(self):
+        inicio, valores = self._inicio, np.array(self._valores)
+        self._inicio, self._valores, self._lacuna = None, [], 0
+        if inicio is None or np.count_nonzero(~np.isnan(valores)) < self.min_quadros:
+            return []
+        return [(inicio, valores)]
+
+def extrair_silabas(fonte, sr=TAXA_AMOSTRAGEM, fmin=80, fmax=450, tamanho_fixo=100,
+                    duracao_bloco_s=0.5, **parametros_segmentacao):
+    """
+    Gera cada sílaba assim que ela termina, como um dict com 'inicio_s',
+    'fim_s' e 'vetor' (o contorno de F0 com `tamanho_fixo` pontos, pronto para o modelo).
+    """
+    rastreador = RastreadorPitch(sr, fmin, fmax)
+    segmentador = SegmentadorSilabas(**parametros_segmentacao)
+    segundos_por_quadro = SALTO / sr
+
+    def montar(silabas):
+        # As sílabas que terminaram no mesmo bloco são normalizadas juntas
+        vetores = normalizar_contornos_lote([f0 for _, f0 in silabas], tamanho_fixo)
+        for (inicio, f0), vetor in zip(silabas, vetores):
+            yield {
+                'inicio_s': inicio * segundos_por_quadro,
+                'fim_s': (inicio + len(f0)) * segundos_por_quadro,
+                'vetor': vetor,
+            }
+
+    for bloco in ler_blocos(fonte, sr, duracao_bloco_s):
+        yield from montar(segmentador.adicionar(rastreador.processar(bloco)))
+    yield from montar(segmentador.adicionar(rastreador.finalizar()))
+    yield from montar(segmentador.finalizar())
+
+def listar_silabas(fonte, max_silabas=None, **parametros):
+    """
+    Versão em lista de extrair_silabas, para rodar em um pool de processos
+    (o gerador não pode voltar de outro processo). Para em `max_silabas`.
+    """
+    silabas = []
+    for silaba in extrair_silabas(fonte, **parametros):
+        silabas.append(silaba)
+        if max_silabas is not None and len(silabas) >= max_silabas:
+            break
+    return silabas
+
+def reconhecer(fonte, funcao_predicao, tamanho_lote=8, **parametros):
+    """
+    Classifica as sílabas de `fonte` conforme vão aparecendo, em lotes de até
+    `tamanho_lote` (o lote que estiver incompleto no fim também é classificado).
+
+    Args:
+        funcao_predicao: Recebe (N, 100, 1) e devolve as probabilidades (N, num_classes),
+            ex.: `preditor.prever`.
+
+    Yields:
+        dict: 'inicio_s', 'fim_s', 'classe' (índice) e 'confianca' de cada sílaba.
+    """
+    pendentes = []
+
+    def classificar():
+        lote = np.stack([s['vetor'] for s in pendentes])[..., np.newaxis]
+        probabilidades = np.asarray(funcao_predicao(lote))
+        for silaba, prob in zip(pendentes, probabilidades):
+            yield {'inicio_s': silaba['inicio_s'], 'fim_s': silaba['fim_s'],
+                   'classe': int(np.argmax(prob)), 'confianca': float(np.max(prob))}
+        pendentes.clear()
+
+    for silaba in extrair_silabas(fonte, **parametros):
+        pendentes.append(silaba)
+        if len(pendentes) >= tamanho_lote:
+            yield from classificar()
+    if pendentes:
+        yield from classificar()
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Uso: python reconhecimento_continuo.py <audio> <modelo .keras/.tflite>")
+        sys.exit(1)
+    from preditor import carregar_preditor
+    preditor = carregar_preditor(sys.argv[2])
+    for silaba in reconhecer(sys.argv[1], preditor.prever):
+        print(f"{silaba['inicio_s']:6.2f}s - {silaba['fim_s']:6.2f}s: Tom {silaba['classe'] + 1} "
+              f"({silaba['confianca'] * 100:.1f}%)")
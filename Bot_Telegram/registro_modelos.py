@@ -0,0 +1,313 @@
+import asyncio
+import configparser
+import functools
+import logging
+import os
+import random
+import time
+
+import numpy as np
+
+from fila_inferencia import FilaInferencia
+from metricas import RegistroMetricas
+from preditor import carregar_preditor
+
+logger = logging.getLogger(__name__)
+
+# Registro dos modelos servidos pelo bot.
+#
+# Há sempre um modelo 'principal' e, opcionalmente, um 'candidato' que recebe
+# uma fração do tráfego (teste A/B antes de promover um modelo novo). Cada
+# papel tem a sua fila de inferência, então um lote nunca mistura modelos.
+#
+# Troca a quente: uma tarefa confere de tempos em tempos o tamanho e a data de
+# modificação dos arquivos dos modelos e do config.ini. Um modelo novo é
+# carregado e aquecido em uma thread, fora do event loop, e só depois entra no
+# lugar do antigo, com uma simples troca de referência: o lote que já está no
+# modelo antigo termina nele, e os pedidos ainda na fila vão para o novo.
+# Se o modelo novo não carregar, o antigo continua servindo.
+
+PAPEIS = ('principal', 'candidato')
+
+# Faixas do histograma de confiança (probabilidade da classe escolhida)
+BUCKETS_CONFIANCA = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+def ler_config_modelos(config):
+    """Lê da seção [Model] o que pode ser trocado com o bot rodando."""
+    fracao = config.getfloat('Model', 'CandidateTrafficFraction', fallback=0.0)
+    return {
+        'principal': config.get('Model', 'ModelPath', fallback='').strip(),
+        'candidato': config.get('Model', 'CandidatePath', fallback='').strip(),
+        'fracao_candidato': min(1.0, max(0.0, fracao)),
+    }
+
+def _assinatura(caminho):
+    """(tamanho, data de modificação) do arquivo, ou None se ele não existe."""
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return estado.st_size, estado.st_mtime_ns
+
+class ModeloCarregado:
+    """Um preditor pronto para uso e as estatísticas das previsões feitas com ele."""
+
+    def __init__(self, caminho, preditor, assinatura):
+        self.caminho = caminho
+        self.nome = os.path.basename(caminho)
+        self.preditor = preditor
+        self.assinatura = assinatura
+        self.carregado_em = time.time()
+        # Só são alterados na thread da fila do papel que usa o modelo
+        self.previsoes = 0
+        self.lotes = 0
+        self.tempo_total = 0.0
+        self.soma_confianca = 0.0
+
+    def resumo(self):
+        return {
+            'modelo': self.nome,
+            'previsoes': self.previsoes,
+            'ms_medio_por_lote': self.tempo_total * 1000 / self.lotes if self.lotes else 0.0,
+            'confianca_media': self.soma_confianca / self.previsoes if self.previsoes else 0.0,
+            'carregado_ha_s': time.time() - self.carregado_em,
+        }
+
+class RegistroModelos:
+    """
+    Guarda os modelos 'principal' e 'candidato', sorteia qual atende cada
+    pedido e troca um modelo por outro sem reiniciar o bot.
+
+    Uso no handler:
+        papel = registro.sortear()
+        probabilidades = await registro.prever(vetor, papel)
+
+    Args:
+        arquivo_config (str | None): config.ini relido quando muda (ModelPath,
+            CandidatePath e CandidateTrafficFraction). None = não relê.
+        intervalo_recarga (float): Segundos entre as verificações. 0 desliga a troca a quente.
+        metricas (RegistroMetricas | None): Onde registrar latência e confiança de cada modelo.
+    """
+
+    def __init__(self, caminho_principal, caminho_candidato='', fracao_candidato=0.0, backend='auto',
+                 tamanho_max_lote=32, num_threads=None, espera_max_ms=5.0,
+                 arquivo_config=None, intervalo_recarga=0, metricas=None):
+        self.caminhos = {'principal': caminho_principal, 'candidato': caminho_candidato}
+        self.fracao_candidato = fracao_candidato
+        self.backend = backend
+        self.tamanho_max_lote = tamanho_max_lote
+        self.num_threads = num_threads
+        self.arquivo_config = arquivo_config
+        self.intervalo_recarga = intervalo_recarga
+        self.modelos = dict.fromkeys(PAPEIS)
+        self.filas = {papel: FilaInferencia(functools.partial(self._prever_lote, papel),
+                                            tamanho_max_lote=tamanho_max_lote, espera_max_ms=espera_max_ms)
+                      for papel in PAPEIS}
+        self.trocas = 0
+        self._assinatura_config = _assinatura(arquivo_config) if arquivo_config else None
+        # Arquivo visto mudado na verificação anterior: só é carregado quando parar
+        # de mudar, para não pegar um modelo no meio da cópia
+        self._vistos = {}
+        self._falhas = {} # Arquivos que já falharam ao carregar (não tenta de novo até mudarem)
+        self._tarefa = None
+
+        metricas = metricas or RegistroMetricas(ativo=False)
+        self._metrica_lote = metricas.histograma(
+            'modelo_lote_segundos', "Tempo do modelo por lote, por modelo", rotulos=('papel', 'modelo'))
+        self._metrica_confianca = metricas.histograma(
+            'modelo_confianca', "Probabilidade da classe escolhida, por modelo",
+            rotulos=('papel', 'modelo'), buckets=BUCKETS_CONFIANCA)
+        self._metrica_trocas = metricas.contador(
+            'modelo_trocas_total', "Tentativas de trocar um modelo com o bot rodando", rotulos=('papel', 'resultado'))
+
+    @property
+    def pronto(self):
+        return self.modelos['principal'] is not None
+
+    # --- CARREGAMENTO ---
+
+    def _carregar(self, caminho, aquecer):
+        assinatura = _assinatura(caminho) # Antes de ler: se o arquivo mudar no meio, a próxima verificação percebe
+        preditor = carregar_preditor(caminho, self.backend, self.tamanho_max_lote, self.num_threads)
+        if aquecer:
+            self._aquecer(preditor)
+        return ModeloCarregado(caminho, preditor, assinatura)
+
+    def _aquecer(self, preditor):
+        """O primeiro uso de cada tamanho de lote monta o grafo/aloca os tensores."""
+        for tamanho in sorted({1, self.tamanho_max_lote}):
+            preditor.prever(np.zeros((tamanho, 100, 1), dtype=np.float32))
+
+    def carregar(self):
+        """
+        Carrega os modelos configurados (sem aquecer). Um candidato que não
+        carrega só é desligado; o erro do principal é propagado.
+        """
+        for papel in PAPEIS:
+            caminho = self.caminhos[papel]
+            if not caminho:
+                continue
+            try:
+                self.modelos[papel] = self._carregar(caminho, aquecer=False)
+            except Exception as e:
+                self._falhas[papel] = (caminho, _assinatura(caminho))
+                if papel == 'principal':
+                    raise
+                logger.error(f"Erro ao carregar o modelo candidato '{caminho}': {e}. Seguindo só com o principal.")
+                continue
+            logger.info(f"Modelo {papel}: {self.modelos[papel].preditor.descrever()}")
+        if self.modelos['candidato'] is not None:
+            logger.info(f"O candidato recebe {self.fracao_candidato:.0%} dos áudios.")
+
+    def aquecer(self):
+        for modelo in self.modelos.values():
+            if modelo is not None:
+                self._aquecer(modelo.preditor)
+
+    # --- PREVISÃO ---
+
+    def sortear(self):
+        """Escolhe o papel que atende um pedido: o candidato com probabilidade `fracao_candidato`."""
+        if self.modelos['candidato'] is not None and random.random() < self.fracao_candidato:
+            return 'candidato'
+        return 'principal'
+
+    async def prever(self, vetor, papel='principal'):
+        """Enfileira o vetor na fila do papel e espera as probabilidades de cada classe."""
+        return await self.filas[papel].prever(vetor)
+
+    def _prever_lote(self, papel, lote):
+        """Roda na thread da fila. O modelo é lido na hora, então um lote nunca fica sem modelo."""
+        modelo = self.modelos[papel]
+        if modelo is None:
+            # Candidato desligado com pedidos ainda na fila: o principal atende
+            papel, modelo = 'principal', self.modelos['principal']
+        if modelo is None:
+            raise RuntimeError("Nenhum modelo carregado.")
+        inicio = time.perf_counter()
+        probabilidades = np.asarray(modelo.preditor.prever(lote))
+        duracao = time.perf_counter() - inicio
+        confiancas = probabilidades.max(axis=1)
+        modelo.lotes += 1
+        modelo.previsoes += len(confiancas)
+        modelo.tempo_total += duracao
+        modelo.soma_confianca += float(confiancas.sum())
+        self._metrica_lote.observar(duracao, papel=papel, modelo=modelo.nome)
+        for confianca in confiancas:
+            self._metrica_confianca.observar(float(confianca), papel=papel, modelo=modelo.nome)
+        return probabilidades
+
+    # --- TROCA A QUENTE ---
+
+    def iniciar(self):
+        """Inicia as filas de inferência (com o event loop rodando)."""
+        for fila in self.filas.values():
+            fila.iniciar()
+
+    def iniciar_vigia(self):
+        """Inicia a verificação periódica. Chame depois da carga inicial, para as duas não se cruzarem."""
+        if self.intervalo_recarga > 0 and self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(self._vigiar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        for fila in self.filas.values():
+            await fila.parar()
+
+    async def _vigiar(self):
+        while True:
+            await asyncio.sleep(self.intervalo_recarga)
+            try:
+                await self.verificar()
+            except Exception as e:
+                logger.error(f"Erro ao verificar os modelos: {e}")
+
+    async def verificar(self):
+        """
+        Relê o config.ini (se mudou) e troca os modelos cujos arquivos mudaram.
+
+        Returns:
+            list: Papéis cujo modelo foi trocado nesta verificação.
+        """
+        if self.arquivo_config:
+            assinatura = _assinatura(self.arquivo_config)
+            if assinatura != self._assinatura_config:
+                self._assinatura_config = assinatura
+                self._reler_config()
+        trocados = []
+        for papel in PAPEIS:
+            if await self._verificar_papel(papel):
+                trocados.append(papel)
+        return trocados
+
+    def _reler_config(self):
+        config = configparser.ConfigParser()
+        try:
+            config.read(self.arquivo_config)
+            novo = ler_config_modelos(config)
+        except (configparser.Error, ValueError) as e:
+            logger.error(f"'{self.arquivo_config}' mudou mas não pôde ser lido ({e}). Mantendo os modelos atuais.")
+            return
+        if not novo['principal']:
+            logger.warning("ModelPath ficou vazio no config.ini. Mantendo o modelo principal atual.")
+            novo['principal'] = self.caminhos['principal']
+        if novo['fracao_candidato'] != self.fracao_candidato:
+            logger.info(f"Fração do tráfego para o candidato: {self.fracao_candidato:.0%} -> "
+                        f"{novo['fracao_candidato']:.0%}")
+            self.fracao_candidato = novo['fracao_candidato']
+        self.caminhos = {papel: novo[papel] for papel in PAPEIS}
+
+    async def _verificar_papel(self, papel):
+        caminho = self.caminhos[papel]
+        atual = self.modelos[papel]
+        if not caminho:
+            if atual is not None:
+                self.modelos[papel] = None
+                logger.info(f"Modelo {papel} '{atual.nome}' desligado.")
+            return False
+        assinatura = _assinatura(caminho)
+        if assinatura is None or (atual is not None and (atual.caminho, atual.assinatura) == (caminho, assinatura)):
+            # Arquivo sumiu (o modelo atual continua servindo) ou nada mudou
+            self._vistos.pop(papel, None)
+            return False
+        if self._falhas.get(papel) == (caminho, assinatura):
+            return False
+        if self._vistos.get(papel) != (caminho, assinatura):
+            self._vistos[papel] = (caminho, assinatura) # Carrega na próxima verificação, se não mudar mais
+            return False
+
+        logger.info(f"Carregando o novo modelo {papel} '{caminho}'...")
+        inicio = time.perf_counter()
+        try:
+            novo = await asyncio.to_thread(self._carregar, caminho, True)
+        except Exception as e:
+            self._falhas[papel] = (caminho, assinatura)
+            self._metrica_trocas.inc(papel=papel, resultado='erro')
+            logger.error(f"Erro ao carregar o modelo '{caminho}': {e}. "
+                         f"{'O modelo anterior continua servindo.' if atual is not None else ''}")
+            return False
+        self.modelos[papel] = novo # A troca: os próximos lotes já usam o modelo novo
+        self._vistos.pop(papel, None)
+        self.trocas += 1
+        self._metrica_trocas.inc(papel=papel, resultado='ok')
+        logger.info(f"Modelo {papel}: '{atual.nome if atual else '-'}' -> '{novo.nome}' "
+                    f"(carregado e aquecido em {time.perf_counter() - inicio:.2f}s). {novo.preditor.descrever()}")
+        return True
+
+    # --- ESTADO ---
+
+    def resumo(self):
+        """Modelo de cada papel, a fração do tráfego, as estatísticas das previsões e as métricas da fila."""
+        fracao = self.fracao_candidato if self.modelos['candidato'] is not None else 0.0
+        trafego = {'principal': 1 - fracao, 'candidato': fracao}
+        return {
+            papel: {**(self.modelos[papel].resumo() if self.modelos[papel] is not None else {'modelo': None}),
+                    'trafego': trafego[papel], 'fila': self.filas[papel].metricas()}
+            for papel in PAPEIS
+        }
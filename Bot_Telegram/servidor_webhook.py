@@ -0,0 +1,146 @@
+import asyncio
+import hmac
+import json
+import logging
+
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+# Servidor HTTP mínimo (asyncio puro, como o de metricas.py) que recebe os
+# updates do Telegram no modo webhook e os entrega à Application do bot.
+#
+# O Telegram só chama URLs HTTPS: na frente deste servidor fica um proxy
+# reverso (nginx, Caddy, um túnel...) que cuida do certificado e repassa
+# para ListenHost:ListenPort. Com reuse_port=True vários processos abrem a
+# mesma porta e o sistema operacional divide as conexões entre eles.
+
+TAMANHO_MAX_CORPO = 1 << 20 # Um update é um JSON pequeno; o áudio vem depois, pelo getFile
+TEMPO_LIMITE_S = 30
+MOTIVOS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+class CorpoGrandeDemais(ValueError):
+    pass
+
+async def ler_requisicao(leitor, tamanho_max=TAMANHO_MAX_CORPO):
+    """
+    Lê uma requisição HTTP/1.1 da conexão.
+
+    Returns:
+        tuple | None: (método, caminho, cabeçalhos em minúsculas, corpo), ou None
+            se a conexão foi fechada antes de uma nova requisição.
+    """
+    linha = await asyncio.wait_for(leitor.readline(), timeout=TEMPO_LIMITE_S)
+    if not linha:
+        return None
+    partes = linha.decode('latin-1').split()
+    if len(partes) < 2:
+        raise ValueError(f"Linha de requisição inválida: {linha!r}")
+    cabecalhos = {}
+    while True:
+        cabecalho = await asyncio.wait_for(leitor.readline(), timeout=TEMPO_LIMITE_S)
+        if cabecalho in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valor = cabecalho.decode('latin-1').partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    tamanho = int(cabecalhos.get('content-length', 0))
+    if tamanho > tamanho_max:
+        raise CorpoGrandeDemais(f"Corpo grande demais ({tamanho} bytes)")
+    corpo = await asyncio.wait_for(leitor.readexactly(tamanho), timeout=TEMPO_LIMITE_S) if tamanho else b''
+    return partes[0].upper(), partes[1], cabecalhos, corpo
+
+async def responder(escritor, status, corpo=b'', tipo='text/plain; charset=utf-8', manter_conexao=True):
+    cabecalho = (f"HTTP/1.1 {status} {MOTIVOS.get(status, '')}\r\n"
+                 f"Content-Type: {tipo}\r\n"
+                 f"Content-Length: {len(corpo)}\r\n"
+                 f"Connection: {'keep-alive' if manter_conexao else 'close'}\r\n\r\n")
+    escritor.write(cabecalho.encode('latin-1') + corpo)
+    await escritor.drain()
+
+class ServidorHTTP:
+    """
+    Base dos servidores: aceita conexões, lê requisições (mantendo a conexão
+    aberta entre elas, como o Telegram e o httpx fazem) e chama `atender`.
+    """
+
+    def __init__(self, host, porta, reuse_port=False):
+        self.host = host
+        self.porta = porta
+        self.reuse_port = reuse_port
+        self._servidor = None
+
+    async def iniciar(self):
+        self._servidor = await asyncio.start_server(self._conexao, self.host, self.porta,
+                                                    reuse_port=self.reuse_port or None)
+
+    async def parar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def atender(self, metodo, caminho, cabecalhos, corpo):
+        """Devolve (status, corpo, tipo do conteúdo)."""
+        raise NotImplementedError
+
+    async def _conexao(self, leitor, escritor):
+        try:
+            while True:
+                try:
+                    requisicao = await ler_requisicao(leitor)
+                except ValueError as e:
+                    await responder(escritor, 413 if isinstance(e, CorpoGrandeDemais) else 400, manter_conexao=False)
+                    break
+                if requisicao is None:
+                    break
+                status, corpo, tipo = await self.atender(*requisicao)
+                manter = requisicao[2].get('connection', '').lower() != 'close'
+                await responder(escritor, status, corpo, tipo, manter)
+                if not manter:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass # Servidor parando com a conexão ainda aberta (keep-alive)
+        finally:
+            escritor.close()
+
+class ServidorWebhook(ServidorHTTP):
+    """
+    Recebe `POST <caminho>` com um update em JSON e o coloca na fila da
+    Application (que o processa como no polling, com concurrent_updates).
+    Responde na hora: a análise do áudio continua depois da resposta.
+
+    Com `segredo`, só aceita requisições com o cabeçalho
+    X-Telegram-Bot-Api-Secret-Token igual (o Telegram manda o secret_token do setWebhook).
+    """
+
+    def __init__(self, application, host='127.0.0.1', porta=8443, caminho='/', segredo='', reuse_port=False):
+        super().__init__(host, porta, reuse_port)
+        self.application = application
+        self.caminho = caminho or '/'
+        self.segredo = segredo
+        self.recebidos = 0
+
+    async def iniciar(self):
+        await super().iniciar()
+        logger.info(f"Webhook ouvindo em http://{self.host}:{self.porta}{self.caminho}")
+
+    async def atender(self, metodo, caminho, cabecalhos, corpo):
+        if caminho.split('?')[0] != self.caminho:
+            return 404, b'', 'text/plain'
+        if metodo != 'POST':
+            return 405, b'', 'text/plain'
+        recebido = cabecalhos.get('x-telegram-bot-api-secret-token', '')
+        if self.segredo and not hmac.compare_digest(recebido.encode(), self.segredo.encode()):
+            logger.warning("Update recebido com o secret token errado. Ignorando.")
+            return 403, b'', 'text/plain'
+        try:
+            update = Update.de_json(json.loads(corpo), self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Update inválido recebido no webhook: {e}")
+            return 400, b'', 'text/plain'
+        self.recebidos += 1
+        await self.application.update_queue.put(update)
+        return 200, b'', 'text/plain'
@@ -0,0 +1,250 @@
+"""
+Telegram falso, para testar o modo webhook sem internet.
+
+Faz o papel da API do Telegram (getMe, setWebhook, getFile, download do
+arquivo, sendMessage...) e dos usuários: manda updates com mensagens de voz
+para o webhook do bot e mede quanto tempo cada uma leva até a resposta final,
+para cada nível de concorrência. Use para comparar WebhookWorkers, [Processing]
+e [Inference] no config.ini com o bot rodando do jeito que roda em produção.
+
+Cada usuário simulado é um chat diferente, e cada mensagem tem um
+file_unique_id novo (o cache de respostas do bot não entra na medida).
+
+Uso:
+    1. No config.ini do bot (uma cópia só para o teste):
+         [Telegram]   AllowedChatIds =  (vazio) e RateLimitPerMinute = 0
+         [Deployment] Mode = webhook
+                      ApiBaseUrl = http://127.0.0.1:8081
+                      WebhookUrl = http://127.0.0.1:8443/webhook
+    2. python telegram_falso.py
+    3. Em outro terminal, na mesma pasta: python bot_classificador_v2.py
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import time
+from collections import Counter
+from urllib.parse import parse_qsl
+
+import httpx
+import numpy as np
+import soundfile as sf
+
+from servidor_webhook import ServidorHTTP
+
+# --- CONFIGURAÇÃO ---
+HOST = '127.0.0.1'
+PORTA = 8081
+NIVEIS_CONCORRENCIA = [1, 2, 4, 8, 16, 32]
+MENSAGENS_POR_NIVEL = 32
+DURACAO_AUDIO_S = 1.0
+NUM_AUDIOS_DISTINTOS = 16
+PRIMEIRO_CHAT_ID = 1000
+TEMPO_LIMITE_RESPOSTA_S = 120
+
+# Respostas que não encerram a análise (o bot ainda vai mandar outra)
+RESPOSTAS_INTERMEDIARIAS = ("Analisando", "Acabei de ligar")
+# Trecho da resposta -> motivo de o áudio não ter sido analisado
+RECUSAS = {'ocupado': 'ocupado', 'rápido demais': 'limite_chat', 'permissão': 'chat_negado',
+           'erro ao analisar': 'erro', 'não está carregado': 'sem_modelo'}
+
+def gerar_audios(quantidade, duracao_s, sr=16000, semente=0):
+    """WAVs sintéticos em memória (as mesmas sílabas do teste_carga.py: F0 subindo, descendo, reto...)."""
+    rng = np.random.default_rng(semente)
+    audios = []
+    t = np.arange(int(duracao_s * sr)) / sr
+    for _ in range(quantidade):
+        f_inicio, f_fim = rng.uniform(100, 300, size=2)
+        fase = 2 * np.pi * np.cumsum(np.linspace(f_inicio, f_fim, len(t))) / sr
+        y = 0.5 * np.sin(fase) + 0.2 * np.sin(2 * fase) + 0.01 * rng.standard_normal(len(t))
+        buffer = io.BytesIO()
+        sf.write(buffer, y.astype(np.float32), sr, format='WAV', subtype='PCM_16')
+        audios.append(buffer.getvalue())
+    return audios
+
+def classificar_resposta(texto):
+    if texto is None:
+        return 'sem_resposta'
+    for trecho, motivo in RECUSAS.items():
+        if trecho in texto:
+            return motivo
+    return 'respondida'
+
+class TelegramFalso(ServidorHTTP):
+    """
+    API do Telegram em http://<host>:<porta>: `/bot<token>/<método>` e
+    `/file/bot<token>/audios/<n>` (o áudio número n). Aceita qualquer token.
+    """
+
+    def __init__(self, audios, host=HOST, porta=PORTA, duracao_s=DURACAO_AUDIO_S):
+        super().__init__(host, porta)
+        self.audios = audios
+        self.duracao_s = duracao_s
+        self.webhook = None # (url, secret token) do último setWebhook
+        self.webhook_registrado = asyncio.Event()
+        self.chamadas = Counter()
+        self._esperando = {} # chat_id -> Future com a resposta final
+        self._ids = itertools.count(1)
+
+    # --- API ---
+
+    async def atender(self, metodo, caminho, cabecalhos, corpo):
+        partes = caminho.split('?')[0].strip('/').split('/')
+        if len(partes) == 4 and partes[0] == 'file' and partes[2] == 'audios':
+            try:
+                return 200, self.audios[int(partes[3])], 'audio/wav'
+            except (ValueError, IndexError):
+                return 404, b'', 'text/plain'
+        if len(partes) == 2 and partes[0].startswith('bot'):
+            parametros = self._ler_parametros(cabecalhos, corpo)
+            resultado = self._chamar(partes[1].lower(), parametros)
+            return 200, json.dumps({'ok': True, 'result': resultado}).encode('utf-8'), 'application/json'
+        return 404, b'', 'text/plain'
+
+    @staticmethod
+    def _ler_parametros(cabecalhos, corpo):
+        if not corpo:
+            return {}
+        if cabecalhos.get('content-type', '').startswith('application/json'):
+            return json.loads(corpo)
+        # O python-telegram-bot manda um formulário com cada valor em JSON (menos os textos)
+        parametros = {}
+        for nome, valor in parse_qsl(corpo.decode('utf-8'), keep_blank_values=True):
+            try:
+                parametros[nome] = json.loads(valor)
+            except ValueError:
+                parametros[nome] = valor
+        return parametros
+
+    def _chamar(self, metodo, p):
+        self.chamadas[metodo] += 1
+        if metodo == 'getme':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Bot de teste', 'username': 'bot_de_teste',
+                    'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+        if metodo == 'setwebhook':
+            self.webhook = (p['url'], p.get('secret_token', ''))
+            self.webhook_registrado.set()
+            print(f"setWebhook recebido: {p['url']}")
+            return True
+        if metodo == 'getfile':
+            file_id = str(p['file_id'])
+            return {'file_id': file_id, 'file_unique_id': file_id, 'file_size': len(self.audios[int(file_id)]),
+                    'file_path': f"audios/{file_id}"}
+        if metodo == 'sendmessage':
+            chat_id, texto = int(p['chat_id']), str(p['text'])
+            if not texto.startswith(RESPOSTAS_INTERMEDIARIAS):
+                futuro = self._esperando.pop(chat_id, None)
+                if futuro is not None and not futuro.done():
+                    futuro.set_result(texto)
+            return {'message_id': next(self._ids), 'date': int(time.time()), 'text': texto,
+                    'chat': {'id': chat_id, 'type': 'private'}}
+        return True # deleteWebhook, sendChatAction...
+
+    # --- USUÁRIOS ---
+
+    async def esperar_bot(self, cliente):
+        """Espera o setWebhook e depois o webhook aceitar conexões (os processos abrem a porta depois de aquecer)."""
+        await self.webhook_registrado.wait()
+        while True:
+            try:
+                await cliente.get(self.webhook[0])
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.5)
+
+    async def enviar_audio(self, cliente, chat_id, indice_audio):
+        """
+        Manda um update com uma mensagem de voz e espera a resposta final do bot.
+
+        Returns:
+            tuple: (segundos até a resposta, texto da resposta ou None se não veio).
+        """
+        n = next(self._ids)
+        update = {'update_id': n, 'message': {
+            'message_id': n, 'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': f"Usuário {chat_id}"},
+            'voice': {'file_id': str(indice_audio), 'file_unique_id': f"{indice_audio}_{n}",
+                      'duration': max(1, round(self.duracao_s)), 'mime_type': 'audio/wav'},
+        }}
+        url, segredo = self.webhook
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperando[chat_id] = futuro
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.post(url, json=update,
+                                          headers={'X-Telegram-Bot-Api-Secret-Token': segredo} if segredo else None)
+            if resposta.status_code != 200:
+                return time.perf_counter() - inicio, f"HTTP {resposta.status_code}"
+            texto = await asyncio.wait_for(futuro, TEMPO_LIMITE_RESPOSTA_S)
+        except (asyncio.TimeoutError, httpx.TransportError):
+            texto = None
+        finally:
+            self._esperando.pop(chat_id, None)
+        return time.perf_counter() - inicio, texto
+
+    async def rodar_nivel(self, cliente, concorrencia, num_mensagens):
+        """
+        `concorrencia` usuários (chats) mandando áudios, cada um esperando a
+        resposta antes do próximo, até completar `num_mensagens`.
+
+        Returns:
+            tuple: (latências das mensagens respondidas, Counter com o resto por motivo, duração total).
+        """
+        chats = asyncio.Queue()
+        for i in range(concorrencia):
+            chats.put_nowait(PRIMEIRO_CHAT_ID + i)
+
+        async def uma(i):
+            chat_id = await chats.get()
+            try:
+                return await self.enviar_audio(cliente, chat_id, i % len(self.audios))
+            finally:
+                chats.put_nowait(chat_id)
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(uma(i) for i in range(num_mensagens)))
+        duracao = time.perf_counter() - inicio
+        motivos = Counter(classificar_resposta(texto) for _, texto in resultados)
+        latencias = np.array([lat for lat, texto in resultados if classificar_resposta(texto) == 'respondida'])
+        del motivos['respondida']
+        return latencias, motivos, duracao
+
+async def main():
+    parser = argparse.ArgumentParser(description="API do Telegram falsa e teste de carga do modo webhook.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--niveis', type=int, nargs='+', default=NIVEIS_CONCORRENCIA)
+    parser.add_argument('--mensagens', type=int, default=MENSAGENS_POR_NIVEL, help="Mensagens por nível")
+    parser.add_argument('--duracao', type=float, default=DURACAO_AUDIO_S, help="Duração de cada áudio (s)")
+    args = parser.parse_args()
+
+    telegram = TelegramFalso(gerar_audios(NUM_AUDIOS_DISTINTOS, args.duracao), args.host, args.porta, args.duracao)
+    await telegram.iniciar()
+    print(f"API falsa do Telegram em http://{args.host}:{args.porta}. Inicie o bot com "
+          f"ApiBaseUrl = http://{args.host}:{args.porta} e Mode = webhook no config.ini.")
+    try:
+        limites = httpx.Limits(max_connections=max(args.niveis), max_keepalive_connections=max(args.niveis))
+        async with httpx.AsyncClient(timeout=30, limits=limites) as cliente:
+            print("Esperando o bot...")
+            await telegram.esperar_bot(cliente)
+            # Aquecimento: os primeiros áudios de cada processo pagam a compilação do pYIN/modelo
+            await telegram.rodar_nivel(cliente, max(args.niveis), max(args.niveis))
+
+            print(f"\n{'concorrência':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'msg/s':>8}  não analisadas")
+            for concorrencia in args.niveis:
+                latencias, motivos, duracao = await telegram.rodar_nivel(cliente, concorrencia, args.mensagens)
+                if len(latencias):
+                    p50, p99 = np.percentile(latencias * 1000, [50, 99])
+                else:
+                    p50 = p99 = float('nan')
+                vazao = len(latencias) / duracao if duracao else 0.0
+                print(f"{concorrencia:>12} {p50:>10.1f} {p99:>10.1f} {vazao:>8.2f}  {dict(motivos) or '-'}")
+        print(f"\nChamadas à API: {dict(telegram.chamadas)}")
+    finally:
+        await telegram.parar()
+
+if __name__ == '__main__':
+    asyncio.run(main())
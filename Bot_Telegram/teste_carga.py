@@ -0,0 +1,156 @@
+"""
+Teste de carga do handle_audio, sem Telegram de verdade.
+
+Simula N usuários mandando mensagens de voz ao mesmo tempo e mede a latência
+de ponta a ponta (da chegada da mensagem até a resposta final) para cada nível
+de concorrência. Use para ver o efeito de [Processing] e [Inference] no config.ini.
+
+Uso (dentro da pasta Bot_Telegram):
+    python teste_carga.py
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import soundfile as sf
+
+import bot_classificador_v2 as bot
+
+# --- CONFIGURAÇÃO ---
+NIVEIS_CONCORRENCIA = [1, 2, 4, 8, 16, 32]
+MENSAGENS_POR_NIVEL = 32
+DURACAO_AUDIO_S = 1.0
+NUM_AUDIOS_DISTINTOS = 64
+
+def gerar_audios_sinteticos(pasta, quantidade, duracao_s, sr=16000, semente=0):
+    """Gera sílabas sintéticas (F0 subindo, descendo, reto...) com harmônicos e um pouco de ruído."""
+    rng = np.random.default_rng(semente)
+    caminhos = []
+    t = np.arange(int(duracao_s * sr)) / sr
+    for i in range(quantidade):
+        f_inicio, f_fim = rng.uniform(100, 300, size=2)
+        f0 = np.linspace(f_inicio, f_fim, len(t))
+        fase = 2 * np.pi * np.cumsum(f0) / sr
+        y = 0.5 * np.sin(fase) + 0.2 * np.sin(2 * fase) + 0.01 * rng.standard_normal(len(t))
+        caminho = os.path.join(pasta, f"sintetico_{i:03d}.wav")
+        sf.write(caminho, y.astype(np.float32), sr)
+        caminhos.append(caminho)
+    return caminhos
+
+class _MensagemFalsa:
+    """Imita o suficiente de telegram.Message para o handle_audio."""
+
+    def __init__(self, file_id):
+        self.audio = None
+        self.voice = SimpleNamespace(file_id=file_id, file_unique_id=file_id)
+        self.respostas = []
+        self.fim = None
+
+    async def reply_text(self, texto, **kwargs):
+        self.respostas.append(texto)
+        # A resposta final é a que encerra a análise (a primeira é só o "Analisando...")
+        if not texto.startswith("Analisando"):
+            self.fim = time.perf_counter()
+
+class _ArquivoFalso:
+    def __init__(self, origem):
+        self.origem = origem
+
+    async def download_as_bytearray(self, buf=None):
+        with open(self.origem, 'rb') as f:
+            return bytearray(f.read())
+
+class _BotFalso:
+    def __init__(self, audios):
+        self.audios = audios
+
+    async def get_file(self, file_id):
+        return _ArquivoFalso(self.audios[int(file_id)])
+
+async def _uma_mensagem(indice, audios, chat_id):
+    mensagem = _MensagemFalsa(str(indice % len(audios)))
+    update = SimpleNamespace(
+        message=mensagem,
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_user=SimpleNamespace(id=chat_id),
+    )
+    contexto = SimpleNamespace(bot=_BotFalso(audios))
+    inicio = time.perf_counter()
+    await bot.handle_audio(update, contexto)
+    ocupado = any("ocupado" in r for r in mensagem.respostas)
+    return (mensagem.fim or time.perf_counter()) - inicio, ocupado
+
+async def rodar_nivel(concorrencia, audios, chat_id, num_mensagens=MENSAGENS_POR_NIVEL):
+    """
+    Mantém `concorrencia` mensagens em andamento até completar `num_mensagens`.
+
+    Returns:
+        tuple: (latências em segundos das mensagens respondidas, quantas foram recusadas, duração total).
+    """
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def limitado(i):
+        async with semaforo:
+            return await _uma_mensagem(i, audios, chat_id)
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(limitado(i) for i in range(num_mensagens)))
+    duracao = time.perf_counter() - inicio
+    latencias = np.array([lat for lat, ocupado in resultados if not ocupado])
+    recusadas = sum(1 for _, ocupado in resultados if ocupado)
+    return latencias, recusadas, duracao
+
+async def preparar_bot():
+    """
+    Carrega o modelo, sobe os serviços do bot e espera o aquecimento, com o
+    cache de contornos, o cache de respostas e o limite por chat desligados
+    (queremos medir o pYIN, não os caches; e todas as mensagens vêm do mesmo chat).
+
+    Returns:
+        bool: False se o modelo não carregou.
+    """
+    os.makedirs(bot.TEMP_DIR, exist_ok=True)
+    bot.CACHE_DIR = ''
+    bot.processador_audio.configurar_cache('')
+    bot.cache_resultados = bot.CacheResultados(max_itens=0)
+    bot.limitador_chats = bot.LimitadorChats(por_minuto=0)
+    bot.carregar_modelo()
+    if not bot.registro_modelos.pronto:
+        print("ERRO: o modelo não carregou; confira o ModelPath do config.ini.")
+        return False
+    bot.iniciar_servicos()
+    await bot.aquecer() # Modelo e processos de extração aquecidos antes de medir
+    return True
+
+async def main():
+    if not await preparar_bot():
+        return
+
+    pasta = tempfile.mkdtemp(prefix='teste_carga_')
+    try:
+        audios = gerar_audios_sinteticos(pasta, NUM_AUDIOS_DISTINTOS, DURACAO_AUDIO_S)
+        chat_id = bot.ALLOWED_CHAT_IDS[0] if bot.ALLOWED_CHAT_IDS else 1
+
+        # Aquecimento: sobe os processos de extração e compila o pYIN/modelo
+        await rodar_nivel(min(bot.EXTRACTION_WORKERS, MENSAGENS_POR_NIVEL), audios, chat_id)
+
+        print(f"\n{'concorrência':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'msg/s':>8} {'recusadas':>10}")
+        for concorrencia in NIVEIS_CONCORRENCIA:
+            latencias, recusadas, duracao = await rodar_nivel(concorrencia, audios, chat_id)
+            if len(latencias):
+                p50, p99 = np.percentile(latencias * 1000, [50, 99])
+            else:
+                p50 = p99 = float('nan')
+            vazao = len(latencias) / duracao if duracao else 0.0
+            print(f"{concorrencia:>12} {p50:>10.1f} {p99:>10.1f} {vazao:>8.2f} {recusadas:>10}")
+        print(f"\nFila de inferência: {bot.registro_modelos.filas['principal'].metricas()}")
+    finally:
+        await bot.parar_servicos()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import tensorflow as tf
+
+# Aumentação feita direto nos vetores de pitch (100 pontos), durante o treino.
+#
+# O tom está quase todo no formato do contorno de F0, então em vez de gerar
+# WAVs novos e rodar o pYIN neles (aumentar_dataset.py), aplicamos as mesmas
+# ideias no próprio contorno: a cada época cada amostra recebe uma variação
+# nova, sem custo de disco nem de extração.
+
+def deslocar_pitch(contornos, semitons_max=1.0):
+    """Multiplica cada contorno por 2^(s/12), com s sorteado em [-semitons_max, semitons_max]."""
+    tamanho_lote = tf.shape(contornos)[0]
+    semitons = tf.random.uniform([tamanho_lote, 1, 1], -semitons_max, semitons_max)
+    return contornos * tf.pow(2.0, semitons / 12.0)
+
+def distorcer_tempo(contornos, fator_max=0.1, deslocamento_max=0.05):
+    """
+    Reamostra cada contorno com uma escala de tempo e um deslocamento sorteados
+    (equivalente a falar um pouco mais rápido/devagar ou a cortar as pontas de
+    outro jeito). Usa interpolação linear entre os 100 pontos.
+    """
+    tamanho_lote = tf.shape(contornos)[0]
+    num_pontos = tf.shape(contornos)[1]
+    ultimo = tf.cast(num_pontos - 1, tf.float32)
+
+    escala = tf.random.uniform([tamanho_lote, 1], 1.0 - fator_max, 1.0 + fator_max)
+    deslocamento = tf.random.uniform([tamanho_lote, 1], -deslocamento_max, deslocamento_max)
+    grade = tf.linspace(0.0, 1.0, num_pontos)[tf.newaxis, :]
+    posicoes = tf.clip_by_value(0.5 + (grade - 0.5) * escala + deslocamento, 0.0, 1.0) * ultimo
+
+    indice_0 = tf.cast(tf.floor(posicoes), tf.int32)
+    indice_1 = tf.minimum(indice_0 + 1, num_pontos - 1)
+    fracao = (posicoes - tf.cast(indice_0, tf.float32))[..., tf.newaxis]
+
+    valores_0 = tf.gather(contornos, indice_0, axis=1, batch_dims=1)
+    valores_1 = tf.gather(contornos, indice_1, axis=1, batch_dims=1)
+    return valores_0 * (1.0 - fracao) + valores_1 * fracao
+
+def adicionar_jitter(contornos, ruido_relativo=0.01):
+    """Ruído multiplicativo ponto a ponto (um 'tremor' de ~1% no F0). Zeros continuam zeros."""
+    ruido = tf.random.normal(tf.shape(contornos), stddev=ruido_relativo)
+    return contornos * (1.0 + ruido)
+
+def criar_aumentacao(semitons_max=1.0, fator_warp_max=0.1, ruido_relativo=0.01):
+    """
+    Retorna uma função (contornos, rotulos) -> (contornos, rotulos) para usar em
+    `dataset.map(...)` depois do `.batch(...)`. Os contornos têm formato (B, 100, 1).
+    """
+    def aumentar_lote(contornos, rotulos):
+        contornos = tf.cast(contornos, tf.float32)
+        if fator_warp_max > 0:
+            contornos = distorcer_tempo(contornos, fator_warp_max)
+        if semitons_max > 0:
+            contornos = deslocar_pitch(contornos, semitons_max)
+        if ruido_relativo > 0:
+            contornos = adicionar_jitter(contornos, ruido_relativo)
+        return contornos, rotulos
+    return aumentar_lote
@@ -1,109 +1,225 @@
-import pandas as pd
-import librosa
-import soundfile as sf
-import numpy as np
-import os
-from tqdm import tqdm
-
-# --- 1. CONFIGURAÇÃO ---
-ARQUIVO_MAPA_ENTRADA = "mapa_dataset_combinado_v2.csv"
-PASTA_SAIDA_AUDIOS = "dataset_combinado_aumentado"
-ARQUIVO_MAPA_SAIDA = "mapa_dataset_aumentado_v1.csv"
-TAXA_AMOSTRAGEM = 16000 # Mantenha a mesma do seu projeto
-
-# --- 2. FUNÇÕES DE AUMENTAÇÃO (VERSÃO MAIS LEVE) ---
-
-def add_noise(y, noise_factor=0.001): # ANTES: 0.005. Agora é 5x mais fraco.
-    """Adiciona ruído branco gaussiano BEM SUTIL."""
-    noise = np.random.randn(len(y))
-    augmented_data = y + noise_factor * noise
-    augmented_data = np.clip(augmented_data, -1.0, 1.0)
-    return augmented_data
-
-def time_stretch(y, rate=0.95): # ANTES: 0.9. Agora é uma mudança de 5%, não 10%.
-    """Aplica um time stretching BEM SUTIL."""
-    # Vamos adicionar uma taxa aleatória para mais variedade
-    rate = np.random.uniform(low=0.95, high=1.05) # Entre 5% mais lento e 5% mais rápido
-    return librosa.effects.time_stretch(y, rate=rate)
-
-def pitch_shift(y, sr, n_steps=0.5): # ANTES: 1 semitom. Agora é meio semitom.
-    """Muda o pitch BEM SUTILMENTE."""
-    return librosa.effects.pitch_shift(y, sr=sr, n_steps=n_steps)
-
-# --- 3. LÓGICA PRINCIPAL ---
-
-print("--- Iniciando Data Augmentation ---")
-
-# Verifica se o mapa de entrada existe
-if not os.path.exists(ARQUIVO_MAPA_ENTRADA):
-    print(f"ERRO: Arquivo de mapa '{ARQUIVO_MAPA_ENTRADA}' não encontrado.")
-    exit()
-
-# Cria a pasta de saída para os novos áudios
-os.makedirs(PASTA_SAIDA_AUDIOS, exist_ok=True)
-print(f"Novos áudios serão salvos em: '{PASTA_SAIDA_AUDIOS}/'")
-
-# Carrega o mapa combinado
-df = pd.read_csv(ARQUIVO_MAPA_ENTRADA)
-print(f"Carregadas {len(df)} amostras do mapa original.")
-
-# Lista para guardar os dados do novo mapa (originais + aumentados)
-lista_novos_dados = []
-
-# Loop principal com barra de progresso
-for index, row in tqdm(df.iterrows(), total=df.shape[0], desc="Aumentando dataset"):
-    caminho_original = row['caminho_arquivo']
-    pinyin = row['pinyin']
-    tom = row['tom']
-    
-    # Pega o nome base do arquivo (ex: "ba1_JJ_g_1.wav" -> "ba1_JJ_g_1")
-    try:
-        nome_base = os.path.basename(caminho_original).rsplit('.', 1)[0]
-    except Exception as e:
-        print(f"Erro ao processar nome: {caminho_original}. Pulando. Erro: {e}")
-        continue
-        
-    # 1. Adiciona o arquivo ORIGINAL à lista
-    # (Mantemos o caminho original, não precisamos copiá-lo)
-    lista_novos_dados.append(row.to_dict())
-    
-    # Carrega o áudio original
-    try:
-        y, sr = librosa.load(caminho_original, sr=TAXA_AMOSTRAGEM)
-        if len(y) == 0:
-            print(f"AVISO: Arquivo vazio {caminho_original}. Pulando aumentações.")
-            continue
-            
-        # 2. AUMENTAÇÃO 1: Adicionar Ruído
-        y_noise = add_noise(y)
-        nome_noise = f"{nome_base}_noise.wav"
-        caminho_saida_noise = os.path.join(PASTA_SAIDA_AUDIOS, nome_noise)
-        sf.write(caminho_saida_noise, y_noise, sr)
-        lista_novos_dados.append({'caminho_arquivo': caminho_saida_noise, 'pinyin': pinyin, 'tom': tom})
-
-        # 3. AUMENTAÇÃO 2: Time Stretch (lento)
-        y_stretch = time_stretch(y, rate=0.9)
-        nome_stretch = f"{nome_base}_stretch.wav"
-        caminho_saida_stretch = os.path.join(PASTA_SAIDA_AUDIOS, nome_stretch)
-        sf.write(caminho_saida_stretch, y_stretch, sr)
-        lista_novos_dados.append({'caminho_arquivo': caminho_saida_stretch, 'pinyin': pinyin, 'tom': tom})
-
-        # 4. AUMENTAÇÃO 3: Pitch Shift (agudo)
-        y_pitch = pitch_shift(y, sr, n_steps=1)
-        nome_pitch = f"{nome_base}_pitch.wav"
-        caminho_saida_pitch = os.path.join(PASTA_SAIDA_AUDIOS, nome_pitch)
-        sf.write(caminho_saida_pitch, y_pitch, sr)
-        lista_novos_dados.append({'caminho_arquivo': caminho_saida_pitch, 'pinyin': pinyin, 'tom': tom})
-
-    except Exception as e:
-        print(f"AVISO: Falha ao carregar ou processar {caminho_original}. Pulando aumentações. Erro: {e}")
-
-# --- 4. SALVAR O NOVO MAPA ---
-print("\nProcesso de aumentação concluído.")
-df_aumentado = pd.DataFrame(lista_novos_dados)
-df_aumentado.to_csv(ARQUIVO_MAPA_SAIDA, index=False)
-
-print(f"\n--- ✅ Sucesso! ---")
-print(f"Dataset original tinha: {len(df)} amostras.")
-print(f"Novo dataset aumentado tem: {len(df_aumentado)} amostras.")
-print(f"Novo mapa salvo como: '{ARQUIVO_MAPA_SAIDA}'")
\ No newline at end of file
+import pandas as pd
+import librosa
+import soundfile as sf
+import numpy as np
+import os
+import sys
+import json
+import hashlib
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import processador_audio
+
+# --- 1. CONFIGURAÇÃO ---
+ARQUIVO_MAPA_ENTRADA = "mapa_dataset_combinado_v2.csv"
+PASTA_SAIDA_AUDIOS = "dataset_combinado_aumentado"
+ARQUIVO_MAPA_SAIDA = "mapa_dataset_aumentado_v1.csv"
+TAXA_AMOSTRAGEM = 16000 # Mantenha a mesma do seu projeto
+NUM_PROCESSOS = os.cpu_count() or 1
+
+# Corpus PCM (veja corpus_pcm.py): os originais que estão nele são lidos já em
+# 16 kHz, sem decodificar o MP3 nem reamostrar. Vazio ('') desliga.
+DIRETORIO_CORPUS = 'corpus_pcm_16k'
+
+# Guarda, para cada áudio gerado, o hash do original + a receita usada.
+# Se nada mudou, o áudio não é gerado de novo na próxima execução.
+ARQUIVO_MANIFESTO = os.path.join(PASTA_SAIDA_AUDIOS, "manifesto_aumentacao.json")
+
+# Receita de aumentação: cada item gera um arquivo "<nome_base>_<sufixo>.wav".
+# Para adicionar/remover uma aumentação, basta mexer nesta lista.
+RECEITA_AUMENTACAO = [
+    {'sufixo': 'noise', 'funcao': 'add_noise', 'parametros': {'noise_factor': 0.001}},
+    {'sufixo': 'stretch', 'funcao': 'time_stretch', 'parametros': {'rate_min': 0.95, 'rate_max': 1.05}},
+    {'sufixo': 'pitch', 'funcao': 'pitch_shift', 'parametros': {'n_steps': 1}},
+]
+
+# --- 2. FUNÇÕES DE AUMENTAÇÃO (VERSÃO MAIS LEVE) ---
+# Todas recebem (y, sr, rng, **parametros). O `rng` vem de uma semente fixa por
+# arquivo, então rodar de novo gera exatamente o mesmo áudio.
+
+def add_noise(y, sr, rng, noise_factor=0.001): # ANTES: 0.005. Agora é 5x mais fraco.
+    """Adiciona ruído branco gaussiano BEM SUTIL."""
+    noise = rng.standard_normal(len(y))
+    augmented_data = y + noise_factor * noise
+    augmented_data = np.clip(augmented_data, -1.0, 1.0)
+    return augmented_data
+
+def time_stretch(y, sr, rng, rate_min=0.95, rate_max=1.05): # ANTES: 0.9. Agora é uma mudança de 5%, não 10%.
+    """Aplica um time stretching BEM SUTIL."""
+    # Taxa aleatória para mais variedade: entre 5% mais lento e 5% mais rápido
+    rate = rng.uniform(low=rate_min, high=rate_max)
+    return librosa.effects.time_stretch(y, rate=rate)
+
+def pitch_shift(y, sr, rng, n_steps=0.5): # ANTES: 1 semitom. Agora é meio semitom.
+    """Muda o pitch BEM SUTILMENTE."""
+    return librosa.effects.pitch_shift(y, sr=sr, n_steps=n_steps)
+
+FUNCOES_AUMENTACAO = {
+    'add_noise': add_noise,
+    'time_stretch': time_stretch,
+    'pitch_shift': pitch_shift,
+}
+
+# --- 3. LÓGICA DE CADA ARQUIVO (roda nos processos do pool) ---
+
+def _iniciar_processo():
+    """
+    Os processos filhos ignoram o Ctrl+C (quem decide o que fazer é o processo
+    principal) e leem os originais do corpus PCM, se houver.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    processador_audio.configurar_corpus(DIRETORIO_CORPUS)
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _assinatura(hash_origem, item):
+    """Identifica um áudio gerado: original + função + parâmetros + taxa de amostragem."""
+    texto = json.dumps({'origem': hash_origem, 'funcao': item['funcao'],
+                        'parametros': item['parametros'], 'sr': TAXA_AMOSTRAGEM}, sort_keys=True)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+def aumentar_arquivo(tarefa):
+    """
+    Gera as aumentações de um áudio original, pulando as que já estão em dia.
+
+    Args:
+        tarefa (tuple): (caminho_original, assinaturas já registradas no manifesto
+            para as saídas deste arquivo).
+
+    Returns:
+        dict: 'saidas' (lista de (sufixo, caminho, assinatura) prontas),
+        'geradas' (quantas foram escritas agora) e 'erro' (mensagem ou None).
+    """
+    caminho_original, manifesto_arquivo = tarefa
+    resultado = {'saidas': [], 'geradas': 0, 'erro': None}
+    try:
+        nome_base = os.path.basename(caminho_original).rsplit('.', 1)[0]
+        hash_origem = _hash_arquivo(caminho_original)
+    except Exception as e:
+        resultado['erro'] = f"Erro ao processar nome/arquivo: {caminho_original}. Pulando. Erro: {e}"
+        return resultado
+
+    y = None
+    for item in RECEITA_AUMENTACAO:
+        caminho_saida = os.path.join(PASTA_SAIDA_AUDIOS, f"{nome_base}_{item['sufixo']}.wav")
+        assinatura = _assinatura(hash_origem, item)
+        if os.path.exists(caminho_saida) and manifesto_arquivo.get(caminho_saida) == assinatura:
+            resultado['saidas'].append((item['sufixo'], caminho_saida, assinatura))
+            continue
+
+        try:
+            # Carrega o áudio original só se alguma aumentação precisar ser gerada
+            if y is None:
+                y, sr = processador_audio.carregar_audio(caminho_original, TAXA_AMOSTRAGEM)
+                if len(y) == 0:
+                    resultado['erro'] = f"AVISO: Arquivo vazio {caminho_original}. Pulando aumentações."
+                    resultado['saidas'] = []
+                    return resultado
+
+            semente = int(assinatura[:16], 16)
+            rng = np.random.default_rng(semente)
+            y_aumentado = FUNCOES_AUMENTACAO[item['funcao']](y, sr, rng, **item['parametros'])
+            sf.write(caminho_saida, y_aumentado, sr)
+        except Exception as e:
+            resultado['erro'] = (f"AVISO: Falha ao carregar ou processar {caminho_original}. "
+                                 f"Pulando aumentações. Erro: {e}")
+            resultado['saidas'] = []
+            return resultado
+
+        resultado['saidas'].append((item['sufixo'], caminho_saida, assinatura))
+        resultado['geradas'] += 1
+    return resultado
+
+# --- 4. LÓGICA PRINCIPAL ---
+
+def _carregar_manifesto():
+    if os.path.exists(ARQUIVO_MANIFESTO):
+        with open(ARQUIVO_MANIFESTO, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def _salvar_manifesto(manifesto):
+    caminho_tmp = ARQUIVO_MANIFESTO + '.tmp'
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f)
+    os.replace(caminho_tmp, ARQUIVO_MANIFESTO)
+
+def main():
+    print("--- Iniciando Data Augmentation ---")
+
+    # Verifica se o mapa de entrada existe
+    if not os.path.exists(ARQUIVO_MAPA_ENTRADA):
+        print(f"ERRO: Arquivo de mapa '{ARQUIVO_MAPA_ENTRADA}' não encontrado.")
+        return
+
+    for item in RECEITA_AUMENTACAO:
+        if item['funcao'] not in FUNCOES_AUMENTACAO:
+            print(f"ERRO: Função de aumentação desconhecida na receita: '{item['funcao']}'.")
+            return
+
+    # Cria a pasta de saída para os novos áudios
+    os.makedirs(PASTA_SAIDA_AUDIOS, exist_ok=True)
+    print(f"Novos áudios serão salvos em: '{PASTA_SAIDA_AUDIOS}/'")
+
+    # Carrega o mapa combinado
+    df = pd.read_csv(ARQUIVO_MAPA_ENTRADA)
+    print(f"Carregadas {len(df)} amostras do mapa original.")
+    print(f"Receita: {', '.join(item['sufixo'] for item in RECEITA_AUMENTACAO)} "
+          f"({NUM_PROCESSOS} processos)")
+
+    manifesto = _carregar_manifesto()
+    tarefas = []
+    for caminho_original in df['caminho_arquivo']:
+        nome_base = os.path.basename(str(caminho_original)).rsplit('.', 1)[0]
+        saidas = [os.path.join(PASTA_SAIDA_AUDIOS, f"{nome_base}_{item['sufixo']}.wav")
+                  for item in RECEITA_AUMENTACAO]
+        tarefas.append((caminho_original, {s: manifesto[s] for s in saidas if s in manifesto}))
+
+    resultados = []
+    total_geradas = 0
+    executor = ProcessPoolExecutor(max_workers=NUM_PROCESSOS, initializer=_iniciar_processo)
+    try:
+        for resultado in tqdm(executor.map(aumentar_arquivo, tarefas, chunksize=8),
+                              total=len(tarefas), desc="Aumentando dataset"):
+            if resultado['erro']:
+                print(f"\n{resultado['erro']}")
+            for _, caminho_saida, assinatura in resultado['saidas']:
+                manifesto[caminho_saida] = assinatura
+            total_geradas += resultado['geradas']
+            resultados.append(resultado)
+    except KeyboardInterrupt:
+        print("\nInterrompido! O manifesto foi salvo; rode novamente para continuar de onde parou.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        _salvar_manifesto(manifesto)
+        return
+    executor.shutdown()
+    _salvar_manifesto(manifesto)
+
+    # --- 5. SALVAR O NOVO MAPA ---
+    # Mesmo formato de antes: cada original seguido das suas versões aumentadas
+    lista_novos_dados = []
+    for (_, row), resultado in zip(df.iterrows(), resultados):
+        lista_novos_dados.append(row.to_dict())
+        for _, caminho_saida, _ in resultado['saidas']:
+            lista_novos_dados.append({'caminho_arquivo': caminho_saida, 'pinyin': row['pinyin'], 'tom': row['tom']})
+
+    print("\nProcesso de aumentação concluído.")
+    print(f"{total_geradas} áudios gerados agora; os demais já estavam em dia.")
+    df_aumentado = pd.DataFrame(lista_novos_dados)
+    df_aumentado.to_csv(ARQUIVO_MAPA_SAIDA, index=False)
+
+    print(f"\n--- ✅ Sucesso! ---")
+    print(f"Dataset original tinha: {len(df)} amostras.")
+    print(f"Novo dataset aumentado tem: {len(df_aumentado)} amostras.")
+    print(f"Novo mapa salvo como: '{ARQUIVO_MAPA_SAIDA}'")
+
+if __name__ == '__main__':
+    main()
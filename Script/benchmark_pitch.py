@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import librosa
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processador_audio import BACKENDS_PITCH, TAXA_AMOSTRAGEM, estimar_f0, limpar_contorno, normalizar_contorno
+
+# --- 1. CONFIGURAÇÃO ---
+ARQUIVO_MAPA = 'C:/ID_tones/mapa_dataset_aumentado_v1.csv'
+NUM_AMOSTRAS = 200 # Quantos áudios do mapa usar no benchmark (sorteados)
+SEMENTE = 42
+BACKEND_REFERENCIA = 'pyin'
+ARQUIVO_RESULTADO = 'benchmark_pitch.json'
+
+# Um erro maior que 20% (~316 cents) em relação à referência conta como
+# "erro grosseiro de pitch" (GPE), a métrica usual para trackers de F0.
+LIMIAR_ERRO_GROSSEIRO = 0.2
+
+def _cents(f_a, f_b):
+    return 1200 * np.abs(np.log2(f_a / f_b))
+
+def comparar_com_referencia(f0_ref, f0_teste):
+    """Compara dois contornos F0 frame a frame. Retorna um dicionário de métricas."""
+    n = min(len(f0_ref), len(f0_teste))
+    f0_ref, f0_teste = f0_ref[:n], f0_teste[:n]
+    vozeado_ref, vozeado_teste = ~np.isnan(f0_ref), ~np.isnan(f0_teste)
+    ambos = vozeado_ref & vozeado_teste
+
+    metricas = {
+        'concordancia_vozeamento': float(np.mean(vozeado_ref == vozeado_teste)) if n else 1.0,
+        'frames_ambos_vozeados': int(ambos.sum()),
+    }
+    if ambos.any():
+        erro_relativo = np.abs(f0_teste[ambos] / f0_ref[ambos] - 1)
+        metricas['erro_medio_cents'] = float(np.mean(_cents(f0_teste[ambos], f0_ref[ambos])))
+        metricas['erro_grosseiro'] = float(np.mean(erro_relativo > LIMIAR_ERRO_GROSSEIRO))
+    return metricas
+
+def _vetor_feature(f0, tamanho_fixo=100):
+    """Mesmo pós-processamento do processador_audio: preenche NaNs e redimensiona."""
+    return normalizar_contorno(limpar_contorno(f0), tamanho_fixo)
+
+def main():
+    df = pd.read_csv(ARQUIVO_MAPA)
+    amostras = df.sample(n=min(NUM_AMOSTRAS, len(df)), random_state=SEMENTE)
+    print(f"Benchmark de pitch com {len(amostras)} áudios de '{ARQUIVO_MAPA}'.")
+    print(f"Backends: {sorted(BACKENDS_PITCH)} (referência: '{BACKEND_REFERENCIA}')")
+
+    # Aquece os backends (o pYIN compila funções com numba na primeira chamada)
+    silencio = np.zeros(TAXA_AMOSTRAGEM // 2)
+    for nome in BACKENDS_PITCH:
+        estimar_f0(silencio, TAXA_AMOSTRAGEM, backend=nome)
+
+    tempos = {nome: [] for nome in BACKENDS_PITCH}
+    duracoes = []
+    metricas = {nome: [] for nome in BACKENDS_PITCH if nome != BACKEND_REFERENCIA}
+
+    for caminho in tqdm(amostras['caminho_arquivo'], desc="Medindo"):
+        try:
+            # O carregamento fica fora da medição: queremos comparar só o tracker
+            y, sr = librosa.load(caminho, sr=TAXA_AMOSTRAGEM)
+        except Exception as e:
+            print(f"\nAVISO: Falha ao carregar {caminho}. Pulando. Erro: {e}")
+            continue
+        if len(y) == 0:
+            continue
+        duracoes.append(len(y) / sr)
+
+        contornos = {}
+        for nome in BACKENDS_PITCH:
+            inicio = time.perf_counter()
+            contornos[nome] = estimar_f0(y, sr, backend=nome)
+            tempos[nome].append(time.perf_counter() - inicio)
+
+        referencia = contornos[BACKEND_REFERENCIA]
+        vetor_referencia = _vetor_feature(referencia)
+        for nome in metricas:
+            resultado = comparar_com_referencia(referencia, contornos[nome])
+            # Diferença no vetor de 100 pontos que o modelo realmente vê
+            vetor_teste = _vetor_feature(contornos[nome])
+            validos = (vetor_referencia > 0) & (vetor_teste > 0)
+            if validos.any():
+                resultado['erro_medio_feature_cents'] = float(
+                    np.mean(_cents(vetor_teste[validos], vetor_referencia[validos])))
+            metricas[nome].append(resultado)
+
+    # --- Resumo ---
+    relatorio = {'num_audios': len(duracoes), 'duracao_media_s': float(np.mean(duracoes)) if duracoes else 0.0,
+                 'referencia': BACKEND_REFERENCIA, 'backends': {}}
+    tempo_referencia = np.mean(tempos[BACKEND_REFERENCIA]) if tempos[BACKEND_REFERENCIA] else 0.0
+    for nome, lista in tempos.items():
+        if not lista:
+            continue
+        resumo = {
+            'ms_por_audio_media': float(np.mean(lista) * 1000),
+            'ms_por_audio_mediana': float(np.median(lista) * 1000),
+            'ms_por_audio_p99': float(np.percentile(lista, 99) * 1000),
+            'aceleracao_vs_referencia': float(tempo_referencia / np.mean(lista)),
+        }
+        if nome in metricas:
+            for chave in ('concordancia_vozeamento', 'erro_medio_cents', 'erro_grosseiro', 'erro_medio_feature_cents'):
+                valores = [m[chave] for m in metricas[nome] if chave in m]
+                if valores:
+                    resumo[chave] = float(np.mean(valores))
+        relatorio['backends'][nome] = resumo
+
+    print("\n--- Resultado ---")
+    for nome, resumo in relatorio['backends'].items():
+        print(f"[{nome}] {resumo['ms_por_audio_media']:.1f} ms/áudio "
+              f"(mediana {resumo['ms_por_audio_mediana']:.1f}, p99 {resumo['ms_por_audio_p99']:.1f}) "
+              f"- {resumo['aceleracao_vs_referencia']:.1f}x vs {BACKEND_REFERENCIA}")
+        if 'erro_medio_cents' in resumo:
+            print(f"    vozeamento igual em {resumo['concordancia_vozeamento'] * 100:.1f}% dos frames, "
+                  f"erro médio {resumo['erro_medio_cents']:.1f} cents, "
+                  f"erro grosseiro em {resumo['erro_grosseiro'] * 100:.1f}% dos frames")
+
+    with open(ARQUIVO_RESULTADO, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\nResultado salvo em '{ARQUIVO_RESULTADO}'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+"""
+Suíte de benchmarks do caminho áudio -> previsão.
+
+Mede cada etapa separada (decodificação/reamostragem, pitch, normalização do
+contorno, modelo Keras, modelo TFLite) e o caminho completo, inclusive o
+handle_audio do bot, para várias durações de áudio e tamanhos de lote. Os
+áudios são varreduras de tom sintéticas geradas aqui mesmo (sem dataset nem
+rede), com semente fixa, então duas rodadas na mesma máquina medem a mesma coisa.
+
+Uso:
+    python benchmark_suite.py                          # roda tudo e salva benchmark_suite.json
+    python benchmark_suite.py --saida base.json        # guarda uma linha de base
+    python benchmark_suite.py --base base.json         # roda e aponta regressões em relação à base
+    python benchmark_suite.py --resultado novo.json --base base.json   # só compara dois arquivos
+
+Com --base, o script sai com código 1 se alguma medida ficou mais lenta que a
+tolerância (útil em CI).
+"""
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import shutil
+import platform
+import argparse
+import tempfile
+import numpy as np
+import soundfile as sf
+
+PASTA_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PASTA_RAIZ)
+from processador_audio import (BACKENDS_PITCH, TAXA_AMOSTRAGEM, carregar_audio, estimar_f0,
+                               extrair_e_normalizar_pitch, normalizar_contornos_lote)
+
+# --- 1. CONFIGURAÇÃO ---
+ETAPAS = ['carregamento', 'pitch', 'normalizacao', 'keras', 'tflite', 'ponta_a_ponta', 'bot']
+DURACOES_S = [0.5, 1.0, 2.0]
+TAMANHOS_LOTE = [1, 8, 32]
+NIVEIS_CONCORRENCIA_BOT = [1, 4]
+REPETICOES = 30 # Medições por caso (depois de AQUECIMENTO chamadas descartadas)
+AQUECIMENTO = 3
+NUM_VARREDURAS = 8 # Áudios distintos por duração; as repetições passam por eles em rodízio
+SEMENTE = 42
+
+# Formatos de entrada: WAV já em 16 kHz (só decodifica) e OGG/Opus a 48 kHz,
+# que é o que o Telegram manda nas mensagens de voz (decodifica e reamostra).
+FORMATOS = {
+    'wav_16k': ('WAV', 'PCM_16', TAXA_AMOSTRAGEM),
+    'opus_48k': ('OGG', 'OPUS', 48000),
+}
+
+MODELO_KERAS = os.path.join(PASTA_RAIZ, 'models', 'modelo_classificador_94_07_v3.keras')
+PASTA_BOT = os.path.join(PASTA_RAIZ, 'Bot_Telegram')
+ARQUIVO_RESULTADO = 'benchmark_suite.json'
+
+# Comparação com a linha de base: uma medida é regressão se a mediana nova
+# passar da base em mais de TOLERANCIA_REGRESSAO (fração) E em mais de
+# DIFERENCA_MINIMA_MS (evita alarmes em etapas de microssegundos, onde o ruído domina).
+TOLERANCIA_REGRESSAO = 0.10
+DIFERENCA_MINIMA_MS = 0.05
+
+# --- 2. ÁUDIOS SINTÉTICOS ---
+
+def gerar_varredura(duracao_s, sr, forma, rng):
+    """
+    Sílaba sintética com o F0 no formato de um dos quatro tons (reto, subindo,
+    descendo e subindo, descendo), com harmônicos, envelope e um pouco de ruído.
+    """
+    t = np.arange(int(duracao_s * sr)) / sr
+    x = t / max(duracao_s, 1e-9)
+    base = rng.uniform(120, 250)
+    formas = {
+        0: np.full_like(x, 1.0),
+        1: 0.8 + 0.4 * x,
+        2: 1.0 - 0.8 * x + 0.8 * x ** 2,
+        3: 1.3 - 0.6 * x,
+    }
+    f0 = base * formas[forma % 4]
+    fase = 2 * np.pi * np.cumsum(f0) / sr
+    envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.03) if len(t) else t
+    y = envelope * (0.5 * np.sin(fase) + 0.2 * np.sin(2 * fase) + 0.1 * np.sin(3 * fase))
+    return (y + 0.005 * rng.standard_normal(len(t))).astype(np.float32)
+
+def codificar(y, sr, formato, subtipo):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format=formato, subtype=subtipo)
+    return buffer.getvalue()
+
+def gerar_audios(duracoes=DURACOES_S, num_varreduras=NUM_VARREDURAS, semente=SEMENTE):
+    """
+    Returns:
+        dict: {(formato, duração): [bytes do arquivo codificado, ...]}.
+    """
+    audios = {}
+    for nome, (formato, subtipo, sr) in FORMATOS.items():
+        if subtipo not in sf.available_subtypes(formato):
+            print(f"AVISO: este libsndfile não grava {formato}/{subtipo}; formato '{nome}' ignorado.")
+            continue
+        for duracao in duracoes:
+            rng = np.random.default_rng(semente)
+            audios[(nome, duracao)] = [codificar(gerar_varredura(duracao, sr, i, rng), sr, formato, subtipo)
+                                       for i in range(num_varreduras)]
+    return audios
+
+# --- 3. MEDIÇÃO ---
+
+def resumir(tempos_s, itens_por_chamada=1, segundos_audio=None):
+    """Resumo de uma lista de tempos (em segundos) de chamadas iguais."""
+    tempos_ms = np.asarray(tempos_s) * 1000
+    mediana = float(np.median(tempos_ms))
+    resumo = {
+        'n': len(tempos_ms),
+        'mediana_ms': mediana,
+        'media_ms': float(np.mean(tempos_ms)),
+        'p99_ms': float(np.percentile(tempos_ms, 99)),
+        'min_ms': float(np.min(tempos_ms)),
+        'itens_por_s': itens_por_chamada * 1000 / mediana if mediana else float('inf'),
+    }
+    if segundos_audio:
+        # Quantos segundos de áudio são processados por segundo de CPU
+        resumo['vezes_tempo_real'] = segundos_audio * 1000 / mediana if mediana else float('inf')
+    return resumo
+
+def medir(funcao, entradas, repeticoes=REPETICOES, aquecimento=AQUECIMENTO):
+    """Chama `funcao` em rodízio sobre `entradas` e devolve o tempo de cada chamada (s)."""
+    for i in range(aquecimento):
+        funcao(entradas[i % len(entradas)])
+    tempos = []
+    for i in range(repeticoes):
+        entrada = entradas[i % len(entradas)]
+        inicio = time.perf_counter()
+        funcao(entrada)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+# --- 4. ETAPAS ---
+
+def etapa_carregamento(audios, repeticoes):
+    resultados = {}
+    for (formato, duracao), arquivos in audios.items():
+        tempos = medir(lambda dados: carregar_audio(dados, TAXA_AMOSTRAGEM), arquivos, repeticoes)
+        resultados[f"carregamento/{formato}/{duracao}s"] = resumir(tempos, segundos_audio=duracao)
+    return resultados
+
+def _pcm(audios):
+    """Os áudios já decodificados em 16 kHz, por duração (as etapas seguintes partem daqui)."""
+    pcm = {}
+    for (formato, duracao), arquivos in audios.items():
+        if duracao not in pcm:
+            pcm[duracao] = [carregar_audio(dados, TAXA_AMOSTRAGEM)[0] for dados in arquivos]
+    return pcm
+
+def etapa_pitch(pcm, repeticoes):
+    resultados = {}
+    for backend in sorted(BACKENDS_PITCH):
+        for duracao, sinais in pcm.items():
+            tempos = medir(lambda y: estimar_f0(y, TAXA_AMOSTRAGEM, backend=backend), sinais, repeticoes)
+            resultados[f"pitch/{backend}/{duracao}s"] = resumir(tempos, segundos_audio=duracao)
+    return resultados
+
+def etapa_normalizacao(pcm, repeticoes, tamanhos_lote=TAMANHOS_LOTE):
+    """Limpeza + redimensionamento do F0 (normalizar_contornos_lote), com 1 e com vários contornos por chamada."""
+    resultados = {}
+    for duracao, sinais in pcm.items():
+        contornos = [estimar_f0(y, TAXA_AMOSTRAGEM, backend='yin') for y in sinais]
+        for tamanho in tamanhos_lote:
+            lotes = [[contornos[(i + j) % len(contornos)] for j in range(tamanho)] for i in range(len(contornos))]
+            tempos = medir(normalizar_contornos_lote, lotes, repeticoes)
+            resultados[f"normalizacao/{duracao}s/lote_{tamanho}"] = resumir(tempos, itens_por_chamada=tamanho)
+    return resultados
+
+def _lotes(tamanho_lote, rng, quantidade=NUM_VARREDURAS):
+    return [rng.uniform(100, 300, size=(tamanho_lote, 100, 1)).astype(np.float32) for _ in range(quantidade)]
+
+def etapa_modelo(nome, preditor, repeticoes, tamanhos_lote=TAMANHOS_LOTE):
+    resultados = {}
+    rng = np.random.default_rng(SEMENTE)
+    for tamanho in tamanhos_lote:
+        tempos = medir(preditor.prever, _lotes(tamanho, rng), repeticoes)
+        resultados[f"{nome}/lote_{tamanho}"] = resumir(tempos, itens_por_chamada=tamanho)
+    return resultados
+
+def etapa_ponta_a_ponta(audios, preditor, repeticoes):
+    """Bytes da mensagem -> vetor de pitch -> previsão, no mesmo processo e sem cache."""
+    resultados = {}
+    for backend in sorted(BACKENDS_PITCH):
+        def uma_mensagem(dados):
+            vetor = extrair_e_normalizar_pitch(dados, backend=backend)
+            return preditor.prever(vetor[np.newaxis, :, np.newaxis])
+
+        for (formato, duracao), arquivos in audios.items():
+            tempos = medir(uma_mensagem, arquivos, repeticoes)
+            resultados[f"ponta_a_ponta/{backend}/{formato}/{duracao}s"] = resumir(tempos, segundos_audio=duracao)
+    return resultados
+
+def converter_tflite(caminho_keras):
+    """Converte o modelo Keras em memória, como o conversorTfLite.py (quantização dinâmica)."""
+    import tensorflow as tf
+    conversor = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(caminho_keras))
+    conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+    return conversor.convert()
+
+async def _etapa_bot(audios, repeticoes, pasta):
+    import teste_carga
+    bot = teste_carga.bot
+    if not await teste_carga.preparar_bot():
+        return {}
+    resultados = {}
+    try:
+        chat_id = bot.ALLOWED_CHAT_IDS[0] if bot.ALLOWED_CHAT_IDS else 1
+        for (formato, duracao), arquivos in audios.items():
+            caminhos = []
+            for i, dados in enumerate(arquivos):
+                caminho = os.path.join(pasta, f"{formato}_{duracao}s_{i:02d}")
+                with open(caminho, 'wb') as f:
+                    f.write(dados)
+                caminhos.append(caminho)
+            await teste_carga.rodar_nivel(1, caminhos, chat_id, AQUECIMENTO)
+            for concorrencia in NIVEIS_CONCORRENCIA_BOT:
+                latencias, recusadas, duracao_total = await teste_carga.rodar_nivel(
+                    concorrencia, caminhos, chat_id, max(repeticoes, concorrencia))
+                if not len(latencias):
+                    continue
+                resumo = resumir(latencias, segundos_audio=duracao)
+                # Com concorrência, a vazão é a do conjunto, não 1/mediana
+                resumo['itens_por_s'] = len(latencias) / duracao_total
+                resumo['recusadas'] = recusadas
+                resultados[f"bot/{formato}/{duracao}s/concorrencia_{concorrencia}"] = resumo
+    finally:
+        await bot.parar_servicos()
+    return resultados
+
+def etapa_bot(audios, repeticoes, pasta_bot=PASTA_BOT):
+    """handle_audio de ponta a ponta (pool de extração + fila de inferência), com o config.ini do bot."""
+    # O bot lê o config.ini da pasta atual e importa os módulos da própria pasta
+    pasta_anterior = os.getcwd()
+    pasta = tempfile.mkdtemp(prefix='benchmark_bot_')
+    os.chdir(pasta_bot)
+    sys.path.insert(0, os.path.abspath(pasta_bot))
+    try:
+        return asyncio.run(_etapa_bot(audios, repeticoes, pasta))
+    except ImportError as e:
+        print(f"AVISO: não foi possível importar o bot ({e}); etapa 'bot' ignorada.")
+        return {}
+    finally:
+        os.chdir(pasta_anterior)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+# --- 5. COMPARAÇÃO ---
+
+def comparar(base, novo, tolerancia=TOLERANCIA_REGRESSAO, diferenca_minima_ms=DIFERENCA_MINIMA_MS):
+    """
+    Compara as medianas de cada medida presente nos dois resultados.
+
+    Returns:
+        list[dict]: Uma linha por medida com 'medida', 'base_ms', 'novo_ms', 'variacao' e 'situacao'
+            ('regressao', 'melhora' ou 'igual').
+    """
+    linhas = []
+    for medida in sorted(set(base['resultados']) & set(novo['resultados'])):
+        base_ms = base['resultados'][medida]['mediana_ms']
+        novo_ms = novo['resultados'][medida]['mediana_ms']
+        variacao = novo_ms / base_ms - 1 if base_ms else 0.0
+        situacao = 'igual'
+        if abs(novo_ms - base_ms) > diferenca_minima_ms:
+            if variacao > tolerancia:
+                situacao = 'regressao'
+            elif variacao < -tolerancia:
+                situacao = 'melhora'
+        linhas.append({'medida': medida, 'base_ms': base_ms, 'novo_ms': novo_ms,
+                       'variacao': variacao, 'situacao': situacao})
+    return linhas
+
+def imprimir_comparacao(linhas, base, novo):
+    if base.get('ambiente') != novo.get('ambiente'):
+        print("AVISO: os resultados vêm de ambientes diferentes (máquina/versões); compare com cuidado.")
+    marcas = {'regressao': '  <-- REGRESSÃO', 'melhora': '  (melhora)', 'igual': ''}
+    print(f"\n{'medida':<48} {'base (ms)':>10} {'novo (ms)':>10} {'variação':>9}")
+    for linha in linhas:
+        print(f"{linha['medida']:<48} {linha['base_ms']:>10.3f} {linha['novo_ms']:>10.3f} "
+              f"{linha['variacao'] * 100:>+8.1f}%{marcas[linha['situacao']]}")
+    so_na_base = sorted(set(base['resultados']) - set(novo['resultados']))
+    if so_na_base:
+        print(f"\nMedidas da base que não foram rodadas agora: {', '.join(so_na_base)}")
+    regressoes = sum(1 for linha in linhas if linha['situacao'] == 'regressao')
+    print(f"\n{regressoes} regressão(ões) acima de {TOLERANCIA_REGRESSAO * 100:.0f}% em {len(linhas)} medidas.")
+    return regressoes
+
+# --- 6. PRINCIPAL ---
+
+def descrever_ambiente():
+    import librosa
+    ambiente = {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+        'numpy': np.__version__,
+        'librosa': librosa.__version__,
+        'soundfile': sf.__version__,
+    }
+    try:
+        import tensorflow as tf
+        ambiente['tensorflow'] = tf.__version__
+    except ImportError:
+        pass
+    return ambiente
+
+def rodar(etapas, repeticoes, caminho_keras, caminho_tflite, pasta_bot=PASTA_BOT):
+    audios = gerar_audios()
+    resultados = {}
+
+    def registrar(novos):
+        for medida, resumo in novos.items():
+            extra = f", {resumo['vezes_tempo_real']:.0f}x tempo real" if 'vezes_tempo_real' in resumo else ''
+            print(f"  {medida:<48} mediana {resumo['mediana_ms']:9.3f} ms, p99 {resumo['p99_ms']:9.3f} ms, "
+                  f"{resumo['itens_por_s']:9.1f}/s{extra}")
+        resultados.update(novos)
+
+    if 'carregamento' in etapas:
+        print("--- Carregamento (decodificação + reamostragem) ---")
+        registrar(etapa_carregamento(audios, repeticoes))
+    pcm = _pcm(audios)
+    if 'pitch' in etapas:
+        print("--- Pitch ---")
+        registrar(etapa_pitch(pcm, repeticoes))
+    if 'normalizacao' in etapas:
+        print("--- Normalização do contorno ---")
+        registrar(etapa_normalizacao(pcm, repeticoes))
+
+    preditor_tflite = None
+    if {'tflite', 'ponta_a_ponta'} & set(etapas):
+        from preditor import PreditorTFLite
+        if caminho_tflite:
+            preditor_tflite = PreditorTFLite(caminho_tflite, tamanho_max_lote=max(TAMANHOS_LOTE))
+        else:
+            preditor_tflite = PreditorTFLite(conteudo=converter_tflite(caminho_keras),
+                                             tamanho_max_lote=max(TAMANHOS_LOTE))
+    if 'keras' in etapas:
+        from preditor import PreditorKeras
+        print("--- Modelo Keras (predict_on_batch) ---")
+        registrar(etapa_modelo('keras', PreditorKeras(caminho_keras), repeticoes))
+    if 'tflite' in etapas:
+        print("--- Modelo TFLite (invoke) ---")
+        registrar(etapa_modelo('tflite', preditor_tflite, repeticoes))
+    if 'ponta_a_ponta' in etapas:
+        print("--- Ponta a ponta (bytes -> previsão TFLite, 1 processo) ---")
+        registrar(etapa_ponta_a_ponta(audios, preditor_tflite, repeticoes))
+    if 'bot' in etapas:
+        print("--- handle_audio do bot (config.ini do Bot_Telegram) ---")
+        registrar(etapa_bot(audios, repeticoes, pasta_bot))
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do caminho áudio -> previsão.")
+    parser.add_argument('--etapas', default=','.join(ETAPAS),
+                        help=f"Etapas separadas por vírgula (padrão: todas). Opções: {','.join(ETAPAS)}")
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+    parser.add_argument('--modelo', default=MODELO_KERAS, help="Modelo .keras (também é convertido para o TFLite)")
+    parser.add_argument('--tflite', default=None, help="Usar este .tflite em vez de converter o --modelo")
+    parser.add_argument('--bot', default=PASTA_BOT, help="Pasta do bot (com o config.ini) para a etapa 'bot'")
+    parser.add_argument('--saida', default=ARQUIVO_RESULTADO)
+    parser.add_argument('--base', default=None, help="Resultado anterior para apontar regressões")
+    parser.add_argument('--resultado', default=None,
+                        help="Não roda nada: compara este resultado já salvo com o --base")
+    args = parser.parse_args()
+
+    if args.resultado:
+        if not args.base:
+            parser.error("--resultado precisa de --base.")
+        with open(args.resultado, encoding='utf-8') as f:
+            novo = json.load(f)
+    else:
+        etapas = [e.strip() for e in args.etapas.split(',') if e.strip()]
+        desconhecidas = set(etapas) - set(ETAPAS)
+        if desconhecidas:
+            parser.error(f"Etapas desconhecidas: {sorted(desconhecidas)}")
+        novo = {
+            'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'ambiente': descrever_ambiente(),
+            'config': {'etapas': etapas, 'repeticoes': args.repeticoes, 'duracoes_s': DURACOES_S,
+                       'tamanhos_lote': TAMANHOS_LOTE, 'semente': SEMENTE,
+                       'modelo': args.tflite or os.path.basename(args.modelo)},
+            'resultados': rodar(etapas, args.repeticoes, args.modelo, args.tflite, args.bot),
+        }
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(novo, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado salvo em '{args.saida}'.")
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        if imprimir_comparacao(comparar(base, novo), base, novo):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Conv1D, MaxPooling1D, Dropout, Flatten, Dense
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from armazem_features import ArmazemFeatures, dividir_treino_teste
+from preditor import PreditorTFLite
+
+from training_models import ler_config, ARQUIVO_CONFIG
+
+# Compressão do classificador depois do training_models.py:
+#   1. Destilação: um modelo "aluno" bem menor aprende a imitar as
+#      probabilidades do modelo "professor" (o v3), além dos rótulos verdadeiros.
+#   2. Poda por magnitude (opcional): zera os menores pesos do aluno e faz um
+#      ajuste fino mantendo-os zerados.
+# No fim, compara professor, aluno e aluno podado: parâmetros, tamanho,
+# latência em CPU (TFLite, como no bot) e acurácia no conjunto de teste.
+
+# --- CONFIGURAÇÃO ---
+MODELO_PROFESSOR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'models', 'modelo_classificador_94_07_v3.keras')
+MODELO_SAIDA = 'modelo_classificador_aluno.keras'
+ARQUIVO_RELATORIO = 'relatorio_compressao.json'
+
+# Arquitetura do aluno: mesma ideia do v3, com bem menos filtros e neurônios.
+FILTROS_ALUNO = (16, 32)
+KERNEL_ALUNO = 5
+DENSE_ALUNO = 16
+DROPOUT_ALUNO = 0.2
+
+# Destilação
+TEMPERATURA = 4.0 # Suaviza as probabilidades do professor (mostra as "quase certas")
+ALPHA = 0.3       # Peso dos rótulos verdadeiros; (1 - ALPHA) vai para o professor
+EPOCAS = 60
+LEARNING_RATE = 0.001
+BATCH_SIZE = 64
+PACIENCIA = 8
+
+# Poda por magnitude: fração dos pesos de cada camada Conv1D/Dense que vira zero.
+# 0 desliga. Os zeros não deixam o modelo mais rápido no CPU, mas o arquivo
+# comprime muito melhor (veja a coluna gzip do relatório).
+ESPARSIDADE = 0.5
+EPOCAS_AJUSTE_PODA = 10
+
+# Metas: latência de 1 amostra abaixo disso e queda de acurácia abaixo disso (pontos).
+META_LATENCIA_MS = 1.0
+META_QUEDA_PONTOS = 1.0
+AMOSTRAS_LATENCIA = 300
+
+def carregar_dados(p):
+    """Treino e teste do armazém, com a mesma divisão do training_models.py."""
+    armazem = ArmazemFeatures(p['armazem'])
+    indices_treino, indices_teste = dividir_treino_teste(armazem.rotulos(), test_size=p['test_size'],
+                                                         random_state=p['semente'])
+    X_train, y_train = armazem.lote(np.sort(indices_treino))
+    X_test, y_test = armazem.lote(np.sort(indices_teste))
+    return X_train[..., np.newaxis], y_train - 1, X_test[..., np.newaxis], y_test - 1
+
+def construir_aluno(tamanho_vetor=100, num_classes=4):
+    """O aluno devolve logits (sem softmax): a destilação precisa deles para aplicar a temperatura."""
+    camadas = [tf.keras.Input(shape=(tamanho_vetor, 1))]
+    for num_filtros in FILTROS_ALUNO:
+        camadas += [Conv1D(num_filtros, KERNEL_ALUNO, activation='relu'), MaxPooling1D(2), Dropout(DROPOUT_ALUNO)]
+    camadas += [Flatten(), Dense(DENSE_ALUNO, activation='relu'), Dense(num_classes)]
+    return tf.keras.Sequential(camadas)
+
+def criar_perda_destilacao(num_classes, temperatura=TEMPERATURA, alpha=ALPHA):
+    """
+    Perda para alvos no formato [rótulo one-hot | probabilidades do professor]:
+    alpha * CE(rótulo) + (1 - alpha) * T² * KL(professor_T || aluno_T).
+    """
+    def perda(alvos, logits):
+        rotulos, prob_professor = alvos[:, :num_classes], alvos[:, num_classes:]
+        perda_rotulos = tf.keras.losses.categorical_crossentropy(rotulos, logits, from_logits=True)
+        # O professor só expõe o softmax; log(p) são os logits dele a menos de uma constante
+        suave_professor = tf.nn.softmax(tf.math.log(prob_professor + 1e-8) / temperatura)
+        log_suave_aluno = tf.nn.log_softmax(logits / temperatura)
+        perda_professor = tf.reduce_sum(
+            suave_professor * (tf.math.log(suave_professor + 1e-8) - log_suave_aluno), axis=-1)
+        return alpha * perda_rotulos + (1 - alpha) * temperatura ** 2 * perda_professor
+    return perda
+
+def criar_acuracia(num_classes):
+    def acuracia(alvos, logits):
+        return tf.cast(tf.equal(tf.argmax(alvos[:, :num_classes], axis=1), tf.argmax(logits, axis=1)), tf.float32)
+    return acuracia
+
+def treinar(aluno, X_train, alvos_train, X_test, alvos_test, epocas, callbacks=()):
+    num_classes = alvos_train.shape[1] // 2
+    aluno.compile(optimizer=tf.keras.optimizers.Adam(LEARNING_RATE),
+                  loss=criar_perda_destilacao(num_classes), metrics=[criar_acuracia(num_classes)])
+    early_stopping = tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=PACIENCIA,
+                                                      restore_best_weights=True)
+    aluno.fit(X_train, alvos_train, batch_size=BATCH_SIZE, epochs=epocas,
+              validation_data=(X_test, alvos_test), callbacks=[early_stopping, *callbacks], verbose=2)
+
+class MascaraPoda(tf.keras.callbacks.Callback):
+    """Zera os menores pesos (em módulo) de cada kernel e os mantém zerados durante o ajuste fino."""
+
+    def __init__(self, esparsidade):
+        super().__init__()
+        self.esparsidade = esparsidade
+        self.mascaras = {}
+
+    def calcular(self, model):
+        for camada in model.layers:
+            if isinstance(camada, (Conv1D, Dense)):
+                pesos = camada.kernel.numpy()
+                limite = np.quantile(np.abs(pesos), self.esparsidade)
+                self.mascaras[camada.name] = (camada, (np.abs(pesos) > limite).astype(np.float32))
+        self.aplicar()
+
+    def aplicar(self):
+        for camada, mascara in self.mascaras.values():
+            camada.kernel.assign(camada.kernel.numpy() * mascara)
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.aplicar()
+
+    def on_train_end(self, logs=None):
+        self.aplicar()
+
+def para_producao(aluno):
+    """Aluno com softmax no fim: mesma entrada/saída do v3, então o bot o usa sem mudanças."""
+    # As camadas são reaproveitadas num modelo novo: o aluno compilado com a perda de
+    # destilação não entraria no arquivo salvo (o bot não conseguiria carregá-lo)
+    model = tf.keras.Sequential([tf.keras.Input(shape=aluno.input_shape[1:]), *aluno.layers,
+                                 tf.keras.layers.Softmax()])
+    model.compile(loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+def medir(nome, model, X_test, y_test):
+    """Parâmetros, tamanhos, latência TFLite (1 amostra e lote de 32) e acurácia de um modelo."""
+    conversor = tf.lite.TFLiteConverter.from_keras_model(model)
+    conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+    modelo_tflite = conversor.convert()
+    preditor = PreditorTFLite(conteudo=modelo_tflite, tamanho_max_lote=32, num_threads=1)
+
+    def latencia(tamanho_lote):
+        lote = X_test[:tamanho_lote]
+        preditor.prever(lote) # Aquecimento
+        inicio = time.perf_counter()
+        for _ in range(AMOSTRAS_LATENCIA):
+            preditor.prever(lote)
+        return (time.perf_counter() - inicio) * 1000 / AMOSTRAS_LATENCIA
+
+    pesos = [w.numpy() for w in model.weights]
+    acuracia = np.mean(np.argmax(preditor.prever(X_test), axis=1) == y_test)
+    return {
+        'modelo': nome,
+        'parametros': int(sum(w.size for w in pesos)),
+        'parametros_nao_nulos': int(sum(np.count_nonzero(w) for w in pesos)),
+        'tflite_kb': len(modelo_tflite) / 1024,
+        'tflite_gzip_kb': len(gzip.compress(modelo_tflite)) / 1024,
+        'latencia_1_ms': latencia(1),
+        'latencia_lote32_ms': latencia(32),
+        'acuracia': float(acuracia * 100),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Destila (e opcionalmente poda) o classificador de tons.")
+    parser.add_argument('--professor', default=MODELO_PROFESSOR, help="Modelo .keras de referência")
+    parser.add_argument('--saida', default=MODELO_SAIDA, help="Arquivo .keras do aluno")
+    parser.add_argument('--config', default=ARQUIVO_CONFIG, help="Config do treino (armazém, divisão, semente)")
+    parser.add_argument('--esparsidade', type=float, default=ESPARSIDADE, help="Fração de pesos zerados (0 desliga)")
+    args = parser.parse_args()
+
+    p = ler_config(args.config)
+    tf.keras.utils.set_random_seed(p['semente'])
+
+    print(f"Carregando o professor '{args.professor}' e os dados de '{p['armazem']}'...")
+    professor = tf.keras.models.load_model(args.professor)
+    X_train, y_train, X_test, y_test = carregar_dados(p)
+    num_classes = professor.output_shape[-1]
+
+    # Alvos = [rótulo one-hot | probabilidades do professor], calculados uma vez só
+    def alvos(X, y):
+        prob = professor.predict(X, batch_size=1024, verbose=0)
+        return np.concatenate([np.eye(num_classes, dtype=np.float32)[y], prob], axis=1)
+    alvos_train, alvos_test = alvos(X_train, y_train), alvos(X_test, y_test)
+
+    print(f"\n--- Destilação (T={TEMPERATURA}, alpha={ALPHA}) ---")
+    aluno = construir_aluno(X_train.shape[1], num_classes)
+    aluno.summary()
+    treinar(aluno, X_train, alvos_train, X_test, alvos_test, EPOCAS)
+    modelos = [('professor', professor), ('aluno', para_producao(aluno))]
+
+    if args.esparsidade > 0:
+        print(f"\n--- Poda por magnitude ({args.esparsidade * 100:.0f}% dos pesos) + ajuste fino ---")
+        aluno_podado = construir_aluno(X_train.shape[1], num_classes)
+        aluno_podado.set_weights(aluno.get_weights())
+        mascara = MascaraPoda(args.esparsidade)
+        mascara.calcular(aluno_podado)
+        treinar(aluno_podado, X_train, alvos_train, X_test, alvos_test, EPOCAS_AJUSTE_PODA, [mascara])
+        modelos.append(('aluno_podado', para_producao(aluno_podado)))
+
+    print("\n--- Medindo (TFLite com quantização dinâmica, 1 thread) ---")
+    relatorio = [medir(nome, model, X_test, y_test) for nome, model in modelos]
+    acuracia_professor = relatorio[0]['acuracia']
+    print(f"{'modelo':<14}{'params':>10}{'não nulos':>11}{'tflite KB':>11}{'gzip KB':>9}"
+          f"{'1 amostra ms':>14}{'lote 32 ms':>12}{'acurácia':>10}")
+    for r in relatorio:
+        r['queda_pontos'] = acuracia_professor - r['acuracia']
+        r['dentro_da_meta'] = r['latencia_1_ms'] < META_LATENCIA_MS and r['queda_pontos'] < META_QUEDA_PONTOS
+        print(f"{r['modelo']:<14}{r['parametros']:>10}{r['parametros_nao_nulos']:>11}{r['tflite_kb']:>11.1f}"
+              f"{r['tflite_gzip_kb']:>9.1f}{r['latencia_1_ms']:>14.3f}{r['latencia_lote32_ms']:>12.3f}"
+              f"{r['acuracia']:>9.2f}%")
+
+    # Salva o melhor aluno dentro da meta (o podado só se não perder para o aluno cheio)
+    candidatos = [(r, m) for r, (_, m) in zip(relatorio, modelos) if r['modelo'] != 'professor']
+    dentro = [c for c in candidatos if c[0]['dentro_da_meta']]
+    escolhido, modelo_escolhido = max(dentro or candidatos, key=lambda c: (c[0]['acuracia'], -c[0]['tflite_gzip_kb']))
+    modelo_escolhido.save(args.saida)
+    with open(ARQUIVO_RELATORIO, 'w', encoding='utf-8') as f:
+        json.dump({'professor': args.professor, 'escolhido': escolhido['modelo'], 'modelos': relatorio}, f, indent=2)
+
+    if dentro:
+        print(f"\n✅ '{escolhido['modelo']}' dentro da meta (<{META_LATENCIA_MS} ms, queda <{META_QUEDA_PONTOS} ponto).")
+    else:
+        print(f"\nAVISO: nenhum aluno ficou dentro da meta; salvando o mais preciso ('{escolhido['modelo']}').")
+    print(f"Modelo salvo em '{args.saida}' e relatório em '{ARQUIVO_RELATORIO}'.")
+    print(f"Converta com: python conversorTfLite.py --modelo {args.saida}")
+
+if __name__ == '__main__':
+    main()
@@ -1,110 +1,239 @@
-import librosa
-import numpy as np
-import matplotlib.pyplot as plt
-import os
-import pandas as pd
-from tqdm import tqdm # Para ter uma barra de progresso bonita!
-
-
-df = pd.read_csv('C:/ID_tones/mapa_dataset_aumentado_v1.csv')
-
-def extrair_contorno_pitch(caminho_arquivo, fmin=80, fmax=450):
-    """
-    Carrega um arquivo de áudio, extrai o contorno de pitch (F0) e o limpa.
-
-    Args:
-        caminho_arquivo (str): O caminho para o arquivo de áudio (.wav, .mp3, etc.).
-        fmin (int): Frequência mínima para a busca do pitch (em Hz).
-        fmax (int): Frequência máxima para a busca do pitch (em Hz).
-
-    Returns:
-        np.ndarray: Um array NumPy contendo o contorno de pitch limpo.
-    """
-    # 1. Carregar o arquivo de áudio
-    # Usamos uma taxa de amostragem (sr) fixa para consistência entre os arquivos.
-    # 16000 Hz é comum para processamento de fala.
-    y, sr = librosa.load(caminho_arquivo, sr=16000)
-
-    # 2. Extrair o pitch usando o algoritmo pYIN
-    # pYIN é robusto e nos dá não apenas o F0, mas também a probabilidade de ser um som "vozeado"
-    f0, voiced_flag, voiced_probs = librosa.pyin(y,
-                                                 fmin=fmin,
-                                                 fmax=fmax,
-                                                 sr=sr)
-
-    # 3. Lidar com valores "NaN" (Not a Number)
-    # O F0 terá 'NaN' em partes silenciosas ou não-vozeadas (como o som de 's').
-    # Para o modelo de ML, precisamos de um vetor contínuo.
-    # Uma estratégia simples é a interpolação: preencher os valores ausentes.
-    
-    # Encontrar os índices onde f0 não é NaN
-    indices_validos = np.where(~np.isnan(f0))[0]
-    
-    # Se não houver nenhum pitch detectado, retorna um array de zeros
-    if len(indices_validos) < 2: # Precisa de pelo menos 2 pontos para interpolar
-        return np.zeros(100) # Retorna um vetor de tamanho fixo
-
-    # Criar os pontos para interpolação
-    f0_validos = f0[indices_validos]
-    indices_todos = np.arange(len(f0))
-
-    # Interpolar para preencher os NaNs
-    f0_interpolado = np.interp(indices_todos, indices_validos, f0_validos)
-
-    return f0_interpolado
-
-def visualizar_pitch(caminho_arquivo):
-    """
-    Extrai e visualiza o contorno de pitch de um arquivo de áudio.
-    """
-    # Supondo que você tenha um arquivo chamado 'ma1.wav' (1º tom)
-    # ou 'ma2.wav' (2º tom), etc.
-    contorno_pitch = extrair_contorno_pitch(caminho_arquivo)
-
-    plt.figure(figsize=(12, 4))
-    plt.plot(contorno_pitch, label='Contorno de Pitch (F0)', color='red')
-    plt.title(f'Pitch para o arquivo: {caminho_arquivo}')
-    plt.xlabel('Tempo (em frames)')
-    plt.ylabel('Frequência (Hz)')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
-
-# --- Exemplo de Uso ---
-# Crie um arquivo de áudio de teste ou use um do dataset Tone Perfect
-# Por exemplo, se você tem um arquivo 'minha_gravacao.wav'
-# visualize_pitch('caminho/para/sua/gravacao.wav')
-
-# Se você não tiver um arquivo, esta função não será executada.
-# Substitua 'seu_arquivo_de_audio.wav' pelo caminho real.
-
-
-def extrair_e_normalizar_pitch(caminho_arquivo, tamanho_fixo=100):
-    """
-    Extrai o pitch e o redimensiona para um tamanho fixo para o modelo de ML.
-    """
-    contorno_pitch = extrair_contorno_pitch(caminho_arquivo)
-
-    # Redimensionar o contorno para um tamanho fixo usando interpolação
-    # Isso estica ou comprime a curva de pitch para que caiba no tamanho desejado
-    x_original = np.linspace(0, 1, len(contorno_pitch))
-    x_novo = np.linspace(0, 1, tamanho_fixo)
-    
-    vetor_de_feature = np.interp(x_novo, x_original, contorno_pitch)
-    
-    return vetor_de_feature
-
-# a tqdm mostra uma barra de progresso enquanto o loop executa
-df['feature_vector'] = [extrair_e_normalizar_pitch(caminho) for caminho in tqdm(df['caminho_arquivo'])]
-
-print("Extração de features concluída!")
-
-# X são todos os vetores de pitch empilhados
-X = np.array(df['feature_vector'].tolist())
-
-# y são as etiquetas de tom
-y = df['tom'].values
-
-np.save('features_combinado_v2_X.npy', X)
-np.save('labels_combinado_v2_y.npy', y)
-print("Features e labels salvos em arquivos .npy!")
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+import sys
+import signal
+import hashlib
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm # Para ter uma barra de progresso bonita!
+
+# O processador de áudio é o mesmo do bot: fica na raiz do repositório.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import processador_audio
+from processador_audio import extrair_contorno_pitch, extrair_e_normalizar_lote
+from armazem_features import ArmazemFeatures, EscritorArmazem
+
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_MAPA = 'C:/ID_tones/mapa_dataset_aumentado_v1.csv'
+
+# Armazém de features (veja armazem_features.py): cada shard terminado vira um
+# chunk dele. Se o processo cair ou for interrompido com Ctrl+C, basta rodar
+# de novo: os shards prontos são reaproveitados.
+ARMAZEM_FEATURES = 'armazem_features_combinado_v2'
+TAMANHO_SHARD = 200 # Arquivos por shard
+
+# Também exporta os .npy antigos (para scripts que ainda os usam, como o conversorTfLite.py)
+EXPORTAR_NPY = True
+ARQUIVO_SAIDA_X = 'features_combinado_v2_X.npy'
+ARQUIVO_SAIDA_Y = 'labels_combinado_v2_y.npy'
+
+NUM_PROCESSOS = os.cpu_count() or 1
+TAMANHO_FIXO = 100
+
+# Backend de pitch: 'pyin' (referência, mais lento) ou 'yin' (vetorizado, muito mais rápido).
+# Rode o benchmark_pitch.py para comparar os dois no seu dataset.
+BACKEND_PITCH = 'pyin'
+
+# Cache de contornos: áudios que não mudaram não passam pelo pYIN de novo.
+# Deixe DIRETORIO_CACHE vazio ('') para desligar.
+DIRETORIO_CACHE = 'cache_contornos'
+TAMANHO_MAX_CACHE_MB = 1024
+
+# Corpus PCM (veja corpus_pcm.py): os áudios que estão nele já vêm em 16 kHz,
+# sem decodificar nem reamostrar. Monte com:
+#     python corpus_pcm.py construir corpus_pcm_16k <mapa.csv>
+# Deixe vazio ('') para desligar. Sem corpus na pasta, os áudios são lidos normalmente.
+DIRETORIO_CORPUS = 'corpus_pcm_16k'
+
+def visualizar_pitch(caminho_arquivo):
+    """
+    Extrai e visualiza o contorno de pitch de um arquivo de áudio.
+    """
+    # Supondo que você tenha um arquivo chamado 'ma1.wav' (1º tom)
+    # ou 'ma2.wav' (2º tom), etc.
+    contorno_pitch = extrair_contorno_pitch(caminho_arquivo)
+
+    plt.figure(figsize=(12, 4))
+    plt.plot(contorno_pitch, label='Contorno de Pitch (F0)', color='red')
+    plt.title(f'Pitch para o arquivo: {caminho_arquivo}')
+    plt.xlabel('Tempo (em frames)')
+    plt.ylabel('Frequência (Hz)')
+    plt.legend()
+    plt.grid(True)
+    plt.show()
+
+# --- Exemplo de Uso ---
+# Crie um arquivo de áudio de teste ou use um do dataset Tone Perfect
+# Por exemplo, se você tem um arquivo 'minha_gravacao.wav'
+# visualize_pitch('caminho/para/sua/gravacao.wav')
+
+# Se você não tiver um arquivo, esta função não será executada.
+# Substitua 'seu_arquivo_de_audio.wav' pelo caminho real.
+
+
+# --- MOTOR DE EXTRAÇÃO PARALELO ---
+
+def _iniciar_processo():
+    """
+    Prepara um processo filho: escolhe o backend de pitch, liga o cache de
+    contornos e o corpus PCM e ignora o Ctrl+C (quem decide o que fazer é o processo principal).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    processador_audio.configurar_backend(BACKEND_PITCH)
+    processador_audio.configurar_cache(DIRETORIO_CACHE, TAMANHO_MAX_CACHE_MB)
+    processador_audio.configurar_corpus(DIRETORIO_CORPUS)
+
+def processar_shard(caminhos, tamanho_fixo=TAMANHO_FIXO):
+    """
+    Extrai as features de um shard inteiro (roda dentro de um processo do pool).
+
+    Um arquivo com problema não derruba o shard: ele vira um vetor de zeros,
+    como já acontece no processador_audio.py do bot. Os contornos do shard
+    são normalizados juntos (veja extrair_e_normalizar_lote).
+
+    Returns:
+        tuple: Matriz (len(caminhos), tamanho_fixo) com os vetores de feature e
+        os contadores (acertos, falhas) do cache de contornos neste shard.
+    """
+    cache = processador_audio.obter_cache()
+    acertos_antes, falhas_antes = (cache.acertos, cache.falhas) if cache else (0, 0)
+
+    X = extrair_e_normalizar_lote(caminhos, tamanho_fixo)
+
+    if cache is None:
+        return X, (0, 0)
+    return X, (cache.acertos - acertos_antes, cache.falhas - falhas_antes)
+
+def _assinatura_shard(caminhos):
+    """Hash da lista de arquivos do shard, para detectar se o mapa mudou desde o último run."""
+    return hashlib.sha1('\n'.join(caminhos).encode('utf-8')).hexdigest()
+
+def _nome_shard(indice):
+    return f"shard_{indice:05d}"
+
+def _indice_shard(nome):
+    """Índice de um chunk 'shard_NNNNN' (-1 se o nome não segue o padrão)."""
+    sufixo = nome[len('shard_'):]
+    return int(sufixo) if sufixo.isdigit() else -1
+
+def _locutores(df):
+    """
+    Locutor de cada linha: a coluna 'locutor' do mapa, se existir; senão, o
+    segundo pedaço do nome do arquivo (ex.: 'zhong4_FV1_MP3.mp3' -> 'FV1').
+    """
+    if 'locutor' in df.columns:
+        return df['locutor'].fillna('').astype(str).tolist()
+    locutores = []
+    for caminho in df['caminho_arquivo']:
+        partes = os.path.basename(str(caminho)).rsplit('.', 1)[0].split('_')
+        locutores.append(partes[1] if len(partes) > 1 else '')
+    return locutores
+
+def extrair_features_paralelo(df, num_processos=NUM_PROCESSOS, tamanho_shard=TAMANHO_SHARD):
+    """
+    Extrai as features de todos os arquivos do mapa usando um pool de processos.
+
+    Cada shard terminado é gravado como um chunk no ARMAZEM_FEATURES. Se a
+    execução for interrompida, os shards já prontos são pulados na próxima vez.
+
+    Returns:
+        bool: True se todos os shards ficaram prontos, False se foi interrompido.
+    """
+    caminhos = df['caminho_arquivo'].astype(str).tolist()
+    rotulos = df['tom'].values
+    pinyins = df['pinyin'].fillna('').astype(str).tolist() if 'pinyin' in df.columns else None
+    locutores = _locutores(df)
+
+    escritor = EscritorArmazem(ARMAZEM_FEATURES)
+    fatias = [slice(i, i + tamanho_shard) for i in range(0, len(caminhos), tamanho_shard)]
+    pendentes = []
+    for i, fatia in enumerate(fatias):
+        info = escritor.info_chunk(_nome_shard(i))
+        if info is None or info.get('assinatura') != _assinatura_shard(caminhos[fatia]):
+            pendentes.append(i)
+    print(f"{len(fatias)} shards no total, {len(fatias) - len(pendentes)} já prontos, "
+          f"{len(pendentes)} a processar com {num_processos} processos.")
+
+    if pendentes:
+        acertos, falhas = 0, 0
+        executor = ProcessPoolExecutor(max_workers=num_processos, initializer=_iniciar_processo)
+        try:
+            futuros = {executor.submit(processar_shard, caminhos[fatias[i]]): i for i in pendentes}
+            for futuro in tqdm(as_completed(futuros), total=len(futuros), desc="Extraindo shards"):
+                i = futuros[futuro]
+                fatia = fatias[i]
+                X_shard, (acertos_shard, falhas_shard) = futuro.result()
+                escritor.adicionar_chunk(
+                    _nome_shard(i), X_shard, rotulos[fatia],
+                    pinyin=pinyins[fatia] if pinyins is not None else None,
+                    locutor=locutores[fatia], caminhos=caminhos[fatia],
+                    assinatura=_assinatura_shard(caminhos[fatia]),
+                )
+                acertos += acertos_shard
+                falhas += falhas_shard
+        except KeyboardInterrupt:
+            print("\nInterrompido! Os shards já terminados foram salvos. Rode novamente para continuar.")
+            executor.shutdown(wait=False, cancel_futures=True)
+            return False
+        executor.shutdown()
+        if DIRETORIO_CACHE:
+            print(f"Cache de contornos: {acertos} acertos, {falhas} falhas "
+                  f"({falhas} áudios passaram pelo pYIN).")
+
+    # Shards de um run anterior além do fim do mapa atual (o mapa encolheu ou
+    # o TAMANHO_SHARD aumentou): se ficassem, seriam lidos junto com os novos.
+    sobras = [nome for nome in escritor.nomes_chunks()
+              if nome.startswith('shard_') and _indice_shard(nome) >= len(fatias)]
+    for nome in sobras:
+        escritor.remover_chunk(nome)
+    if sobras:
+        print(f"{len(sobras)} shards antigos removidos do armazém.")
+    return True
+
+def informar_corpus(caminhos, diretorio):
+    """Mostra quantos áudios do mapa serão lidos do corpus PCM (os demais são decodificados)."""
+    if not diretorio:
+        return
+    corpus = processador_audio.configurar_corpus(diretorio)
+    if corpus is None:
+        print(f"Corpus PCM '{diretorio}' não encontrado: os áudios serão decodificados normalmente.")
+        return
+    no_corpus = sum(1 for caminho in caminhos if str(caminho) in corpus)
+    print(f"Corpus PCM '{diretorio}': {no_corpus} de {len(caminhos)} áudios do mapa estão nele.")
+
+def exportar_npy(armazem, arquivo_x, arquivo_y):
+    """Grava o armazém nos .npy antigos, chunk por chunk (sem montar tudo na memória)."""
+    X = np.lib.format.open_memmap(arquivo_x, mode='w+', dtype=np.float32,
+                                  shape=(len(armazem), armazem.tamanho_vetor))
+    inicio = 0
+    for contornos, _ in armazem.iterar_lotes(tamanho_lote=100000):
+        X[inicio:inicio + len(contornos)] = contornos
+        inicio += len(contornos)
+    X.flush()
+    del X
+    np.save(arquivo_y, armazem.rotulos())
+
+def main():
+    df = pd.read_csv(ARQUIVO_MAPA)
+    print(f"Carregadas {len(df)} amostras de '{ARQUIVO_MAPA}'.")
+    informar_corpus(df['caminho_arquivo'], DIRETORIO_CORPUS)
+
+    if not extrair_features_paralelo(df):
+        return
+
+    print("Extração de features concluída!")
+    armazem = ArmazemFeatures(ARMAZEM_FEATURES)
+    print(f"Armazém '{ARMAZEM_FEATURES}' com {len(armazem)} amostras em {len(armazem.nomes_chunks)} chunks.")
+    if len(armazem) != len(df):
+        print(f"Erro: o armazém tem {len(armazem)} amostras, mas o mapa tem {len(df)}. "
+              f"Há chunks que não vieram deste mapa em '{ARMAZEM_FEATURES}'; os .npy não foram exportados.")
+        return
+
+    if EXPORTAR_NPY:
+        exportar_npy(armazem, ARQUIVO_SAIDA_X, ARQUIVO_SAIDA_Y)
+        print("Features e labels salvos em arquivos .npy!")
+
+if __name__ == '__main__':
+    main()
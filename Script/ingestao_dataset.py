@@ -0,0 +1,224 @@
+"""
+Ingestão de áudios para o dataset (substitui o trocar_tipo.py e o criar_mapa_dataset.py).
+
+Procura áudios em todas as subpastas das pastas de entrada, converte cada um
+para WAV 16 kHz mono (a taxa do projeto) em vários processos e atualiza o mapa
+do dataset (CSV com caminho_arquivo, pinyin, tom e locutor).
+
+Gravar direto em WAV 16 kHz evita perder qualidade em um MP3 intermediário e
+tira a decodificação de MP3 e a reamostragem de todo librosa.load posterior.
+
+O mapa também guarda o tamanho e a data de modificação de cada arquivo de
+origem: rodando de novo, só os arquivos novos ou alterados são convertidos
+(e os que sumiram das pastas de entrada saem do mapa).
+
+Formatos que o libsndfile não lê (m4a, aac...) são decodificados pelo
+librosa/audioread, que precisa do ffmpeg instalado.
+
+Uso:
+    python ingestao_dataset.py
+    python ingestao_dataset.py --entrada C:/gravacoes C:/outras --saida C:/ID_tones/DATASET_WAV16K
+"""
+import os
+import re
+import sys
+import signal
+import argparse
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processador_audio import TAXA_AMOSTRAGEM, carregar_audio
+
+# --- 1. CONFIGURAÇÃO ---
+PASTAS_ENTRADA = ['C:/ID_tones/DATASET_V3', 'C:/Users/JesonWen/Downloads/DB_MISSING']
+PASTA_SAIDA = 'C:/ID_tones/DATASET_WAV16K'
+ARQUIVO_MAPA = 'mapa_do_dataset_v3.csv' # O mapa "pessoal" que o juntar_dataset.py espera
+EXTENSOES = ('.wav', '.mp3', '.m4a', '.flac', '.ogg', '.opus', '.aac')
+NUM_PROCESSOS = os.cpu_count() or 1
+SALVAR_A_CADA = 500 # Conversões entre cada gravação do mapa (para não perder tudo se o processo cair)
+
+# Só estes tons viram amostras (o classificador tem 4 classes; o tom neutro, 5, fica de fora)
+TONS_VALIDOS = (1, 2, 3, 4)
+
+# Nome do arquivo: pinyin + tom, e opcionalmente o locutor depois de um separador.
+# Ex.: 'zhong4_FV1_MP3.mp3' -> ('zhong', 4, 'FV1'); 'ma3.m4a' -> ('ma', 3, None);
+# 'lü4 (2).wav' -> ('lü', 4, None). O locutor precisa começar com uma letra,
+# para que números de take ('ma3_2') não sejam confundidos com locutores.
+PADRAO_NOME = re.compile(r"^(?P<pinyin>[a-zü:]+?)(?P<tom>[1-5])(?:[_\-\s.]+(?P<locutor>[a-z][a-z0-9]*))?",
+                         re.IGNORECASE)
+
+COLUNAS_MAPA = ['caminho_arquivo', 'pinyin', 'tom', 'locutor',
+                'origem', 'tamanho_origem', 'mtime_origem_ns', 'duracao_s']
+
+# --- 2. VARREDURA E NOMES ---
+
+def interpretar_nome(caminho, raiz):
+    """
+    Extrai pinyin, tom e locutor do nome do arquivo.
+
+    Sem locutor no nome, usa o nome da pasta onde o arquivo está (se não for a
+    própria pasta de entrada): gravações costumam ficar em uma pasta por pessoa.
+
+    Returns:
+        dict | None: {'pinyin', 'tom', 'locutor'}, ou None se o nome não seguir o padrão.
+    """
+    nome = os.path.splitext(os.path.basename(caminho))[0].strip()
+    encontrado = PADRAO_NOME.match(nome)
+    if encontrado is None:
+        return None
+    locutor = encontrado.group('locutor')
+    if locutor is None:
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        locutor = os.path.basename(pasta) if os.path.normcase(pasta) != os.path.normcase(os.path.abspath(raiz)) else ''
+    return {'pinyin': encontrado.group('pinyin').lower(), 'tom': int(encontrado.group('tom')), 'locutor': locutor}
+
+def varrer_entradas(pastas, extensoes=EXTENSOES):
+    """Gera (raiz, caminho) de cada arquivo de áudio dentro das pastas (recursivamente), em ordem."""
+    for raiz in pastas:
+        if not os.path.isdir(raiz):
+            print(f"AVISO: A pasta de entrada não foi encontrada: {raiz}")
+            continue
+        for pasta, subpastas, arquivos in os.walk(raiz):
+            subpastas.sort()
+            for nome in sorted(arquivos):
+                if nome.lower().endswith(extensoes):
+                    yield raiz, os.path.join(pasta, nome)
+
+def caminho_destino(caminho, raiz, pasta_saida):
+    """Mesma estrutura de subpastas da entrada, sob uma pasta com o nome da raiz, com extensão .wav."""
+    relativo = os.path.splitext(os.path.relpath(caminho, raiz))[0] + '.wav'
+    return os.path.join(pasta_saida, os.path.basename(os.path.normpath(raiz)), relativo)
+
+# --- 3. CONVERSÃO (roda nos processos do pool) ---
+
+def _iniciar_processo():
+    """Os processos filhos ignoram o Ctrl+C; quem decide o que fazer é o processo principal."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def converter_arquivo(origem, destino, sr=TAXA_AMOSTRAGEM):
+    """
+    Converte `origem` para WAV PCM 16 bits mono na taxa `sr`. O arquivo é
+    escrito com outro nome e renomeado no fim, então um destino existente
+    está sempre completo.
+
+    Returns:
+        float: Duração em segundos.
+    """
+    y, sr = carregar_audio(origem, sr)
+    if len(y) == 0:
+        raise ValueError("áudio vazio")
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = destino + '.tmp'
+    sf.write(temporario, np.clip(y, -1.0, 1.0), sr, format='WAV', subtype='PCM_16')
+    os.replace(temporario, destino)
+    return len(y) / sr
+
+# --- 4. MAPA ---
+
+def carregar_mapa(caminho):
+    if not os.path.exists(caminho):
+        return pd.DataFrame(columns=COLUNAS_MAPA)
+    df = pd.read_csv(caminho, keep_default_na=False)
+    if 'origem' not in df.columns:
+        print(f"AVISO: '{caminho}' não foi criado por este script; todos os arquivos serão convertidos de novo.")
+        return pd.DataFrame(columns=COLUNAS_MAPA)
+    return df
+
+def salvar_mapa(linhas, caminho):
+    df = pd.DataFrame(sorted(linhas.values(), key=lambda linha: linha['caminho_arquivo']), columns=COLUNAS_MAPA)
+    temporario = caminho + '.tmp'
+    df.to_csv(temporario, index=False)
+    os.replace(temporario, caminho)
+    return df
+
+def _em_dia(linha, estado, destino):
+    return (linha is not None
+            and int(linha['tamanho_origem']) == estado.st_size
+            and int(linha['mtime_origem_ns']) == estado.st_mtime_ns
+            and linha['caminho_arquivo'] == destino
+            and os.path.exists(destino))
+
+# --- 5. PRINCIPAL ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte áudios para WAV 16 kHz e atualiza o mapa do dataset.")
+    parser.add_argument('--entrada', nargs='+', default=PASTAS_ENTRADA, help="Pastas com os áudios originais")
+    parser.add_argument('--saida', default=PASTA_SAIDA, help="Pasta dos WAVs convertidos")
+    parser.add_argument('--mapa', default=ARQUIVO_MAPA)
+    parser.add_argument('--processos', type=int, default=NUM_PROCESSOS)
+    parser.add_argument('--forcar', action='store_true', help="Converte tudo de novo, mesmo o que está em dia")
+    args = parser.parse_args()
+
+    print("--- Ingestão do dataset ---")
+    anteriores = {linha['origem']: linha for linha in carregar_mapa(args.mapa).to_dict('records')}
+
+    linhas, tarefas, destinos = {}, [], {}
+    ignorados = {'nome': 0, 'tom': 0, 'duplicado': 0}
+    for raiz, origem in varrer_entradas(args.entrada):
+        info = interpretar_nome(origem, raiz)
+        if info is None:
+            ignorados['nome'] += 1
+            continue
+        if info['tom'] not in TONS_VALIDOS:
+            ignorados['tom'] += 1
+            continue
+        destino = caminho_destino(origem, raiz, args.saida)
+        if destino in destinos:
+            # Ex.: 'ma1.mp3' e 'ma1.m4a' na mesma pasta virariam o mesmo 'ma1.wav'
+            print(f"AVISO: '{origem}' e '{destinos[destino]}' gerariam o mesmo arquivo. Mantendo o primeiro.")
+            ignorados['duplicado'] += 1
+            continue
+        destinos[destino] = origem
+
+        estado = os.stat(origem)
+        linha = {'caminho_arquivo': destino, **info, 'origem': origem,
+                 'tamanho_origem': estado.st_size, 'mtime_origem_ns': estado.st_mtime_ns}
+        anterior = anteriores.get(origem)
+        if not args.forcar and _em_dia(anterior, estado, destino):
+            linhas[origem] = {**linha, 'duracao_s': anterior['duracao_s']}
+        else:
+            tarefas.append(linha)
+
+    removidos = len(set(anteriores) - set(destinos.values()))
+    print(f"{len(destinos)} áudios encontrados: {len(linhas)} já em dia, {len(tarefas)} a converter "
+          f"com {args.processos} processos.")
+    if removidos:
+        print(f"{removidos} arquivos do mapa anterior não existem mais nas entradas e saem do mapa.")
+    if any(ignorados.values()):
+        print(f"Ignorados: {ignorados['nome']} com nome fora do padrão, {ignorados['tom']} com tom fora de "
+              f"{TONS_VALIDOS}, {ignorados['duplicado']} duplicados.")
+
+    falhas = 0
+    if tarefas:
+        executor = ProcessPoolExecutor(max_workers=args.processos, initializer=_iniciar_processo)
+        try:
+            futuros = {executor.submit(converter_arquivo, t['origem'], t['caminho_arquivo']): t for t in tarefas}
+            for concluidos, futuro in enumerate(tqdm(as_completed(futuros), total=len(futuros),
+                                                     desc="Convertendo"), start=1):
+                tarefa = futuros[futuro]
+                try:
+                    linhas[tarefa['origem']] = {**tarefa, 'duracao_s': round(futuro.result(), 3)}
+                except Exception as e:
+                    falhas += 1
+                    print(f"\nErro ao converter o arquivo {tarefa['origem']}: {e or type(e).__name__}")
+                if concluidos % SALVAR_A_CADA == 0:
+                    salvar_mapa(linhas, args.mapa)
+        except KeyboardInterrupt:
+            print("\nInterrompido! O mapa foi salvo com o que já foi convertido; rode novamente para continuar.")
+            executor.shutdown(wait=False, cancel_futures=True)
+            salvar_mapa(linhas, args.mapa)
+            return
+        executor.shutdown()
+
+    df = salvar_mapa(linhas, args.mapa)
+    print(f"\n--- ✅ Sucesso! ---")
+    print(f"{len(tarefas) - falhas} convertidos agora, {falhas} falhas.")
+    print(f"Mapa salvo como '{args.mapa}' com {len(df)} amostras:")
+    print(df['tom'].value_counts().sort_index().to_string())
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,170 @@
-import numpy as np
-import tensorflow as tf
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import confusion_matrix, classification_report
-
-# --- Carregar o modelo e os dados de teste ---
-print("Carregando modelo e dados de teste...")
-model = tf.keras.models.load_model('modelo_classificador_v3_94_07.keras')
-X_test = np.load('features_combinado_v2_X.npy') # Vamos usar todos os dados para ter uma visão geral
-y_test = np.load('labels_combinado_v2_y.npy')
-
-# Ajustar os dados da mesma forma que no treino
-y_true = y_test - 1
-X_test = np.expand_dims(X_test, axis=-1)
-
-# --- Fazer previsões ---
-print("Fazendo previsões nos dados de teste...")
-y_pred_probs = model.predict(X_test)
-y_pred = np.argmax(y_pred_probs, axis=1)
-
-# --- Gerar a Matriz de Confusão ---
-print("Gerando Matriz de Confusão...")
-cm = confusion_matrix(y_true, y_pred)
-tons = ['Tom 1', 'Tom 2', 'Tom 3', 'Tom 4']
-
-plt.figure(figsize=(8, 6))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=tons, yticklabels=tons)
-plt.title('Matriz de Confusão')
-plt.ylabel('Tom Verdadeiro')
-plt.xlabel('Tom Previsto')
-plt.show()
-
-# --- Relatório de Classificação ---
-print("\n--- Relatório de Classificação ---")
-print(classification_report(y_true, y_pred, target_names=tons))
\ No newline at end of file
+import os
+import sys
+import json
+import time
+import argparse
+import configparser
+import numpy as np
+import matplotlib
+matplotlib.use('Agg') # Sem janela: roda em servidor/job noturno
+import matplotlib.pyplot as plt
+import seaborn as sns
+from sklearn.metrics import confusion_matrix, precision_recall_fscore_support
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from armazem_features import ArmazemFeatures, dividir_treino_teste
+from preditor import carregar_preditor
+
+# --- CONFIGURAÇÃO ---
+# Modelos avaliados quando nenhum é passado na linha de comando (.keras ou .tflite).
+# O padrão é o modelo v3 (94,07%) da pasta models/ do repositório.
+MODELOS = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'models', 'modelo_classificador_94_07_v3.keras')]
+ARMAZEM_FEATURES = 'armazem_features_combinado_v2'
+PASTA_SAIDA = 'avaliacao'
+# A divisão treino/teste (TestSize e Seed) vem do mesmo config do treino
+ARQUIVO_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config_treino.ini')
+TAMANHO_LOTE = 256
+AMOSTRAS_LATENCIA = 100 # Previsões de 1 amostra para medir a latência
+TONS = ['Tom 1', 'Tom 2', 'Tom 3', 'Tom 4']
+
+def ler_divisao(caminho=ARQUIVO_CONFIG):
+    """(test_size, semente) da divisão usada pelo training_models.py, lidos do config_treino.ini."""
+    config = configparser.ConfigParser()
+    if not config.read(caminho, encoding='utf-8'):
+        print(f"AVISO: '{caminho}' não encontrado. Usando a divisão padrão (20%, semente 42).")
+    return (config.getfloat('Data', 'TestSize', fallback=0.2),
+            config.getint('Pipeline', 'Seed', fallback=42))
+
+def avaliar(preditores, armazem, indices, tamanho_lote=TAMANHO_LOTE):
+    """
+    Uma única passada pelos dados: cada lote lido do armazém é previsto por
+    todos os modelos antes de ler o próximo.
+
+    Returns:
+        tuple: (y_true, {nome: y_pred}, {nome: segundos gastos prevendo}).
+    """
+    y_true = []
+    y_pred = {nome: [] for nome in preditores}
+    tempos = {nome: 0.0 for nome in preditores}
+    for contornos, rotulos in armazem.iterar_lotes(tamanho_lote, indices):
+        y_true.append(rotulos - 1)
+        for nome, preditor in preditores.items():
+            inicio = time.perf_counter()
+            probabilidades = preditor.prever(contornos)
+            tempos[nome] += time.perf_counter() - inicio
+            y_pred[nome].append(np.argmax(probabilidades, axis=1))
+    y_true = np.concatenate(y_true)
+    return y_true, {nome: np.concatenate(p) for nome, p in y_pred.items()}, tempos
+
+def medir_latencia(preditor, contornos, num_amostras=AMOSTRAS_LATENCIA):
+    """Latências (ms) de previsões de 1 amostra, como o bot faz com cada áudio."""
+    preditor.prever(contornos[:1]) # Aquecimento
+    latencias = []
+    for i in range(min(num_amostras, len(contornos))):
+        inicio = time.perf_counter()
+        preditor.prever(contornos[i:i + 1])
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return latencias
+
+def calcular_metricas(y_true, y_pred, segundos, latencias):
+    classes = list(range(len(TONS)))
+    precisao, revocacao, f1, suporte = precision_recall_fscore_support(
+        y_true, y_pred, labels=classes, zero_division=0)
+    return {
+        'amostras': int(len(y_true)),
+        'acuracia': float(np.mean(y_true == y_pred)),
+        'por_classe': {
+            TONS[c]: {'precisao': float(precisao[c]), 'revocacao': float(revocacao[c]),
+                      'f1': float(f1[c]), 'suporte': int(suporte[c])}
+            for c in classes
+        },
+        'matriz_confusao': confusion_matrix(y_true, y_pred, labels=classes).tolist(),
+        'amostras_por_segundo': float(len(y_true) / segundos) if segundos > 0 else None,
+        'latencia_ms': {
+            'p50': float(np.percentile(latencias, 50)),
+            'p99': float(np.percentile(latencias, 99)),
+            'media': float(np.mean(latencias)),
+        } if len(latencias) else None,
+    }
+
+def _formatar(valor, formato):
+    """Número formatado, ou 'n/a' se a medida não existe (None)."""
+    return 'n/a' if valor is None else format(valor, formato)
+
+def salvar_matriz(cm, titulo, caminho):
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(np.array(cm), annot=True, fmt='d', cmap='Blues', xticklabels=TONS, yticklabels=TONS)
+    plt.title(titulo)
+    plt.ylabel('Tom Verdadeiro')
+    plt.xlabel('Tom Previsto')
+    plt.tight_layout()
+    plt.savefig(caminho)
+    plt.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Avalia um ou mais modelos no conjunto de teste.")
+    parser.add_argument('modelos', nargs='*', default=MODELOS, help="Arquivos .keras/.tflite")
+    parser.add_argument('--armazem', default=ARMAZEM_FEATURES, help="Pasta do armazém de features")
+    parser.add_argument('--saida', default=PASTA_SAIDA, help="Pasta para o JSON e as imagens")
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Tamanho do lote")
+    parser.add_argument('--config', default=ARQUIVO_CONFIG, help="Config do treino (TestSize e Seed da divisão)")
+    parser.add_argument('--todos', action='store_true',
+                        help="Avalia todas as amostras, não só a parte de teste da divisão do treino")
+    args = parser.parse_args()
+
+    print("Carregando modelos e dados de teste...")
+    armazem = ArmazemFeatures(args.armazem)
+    if len(armazem) == 0:
+        print(f"ERRO: Nenhuma amostra para avaliar no armazém '{args.armazem}'.")
+        sys.exit(1)
+    if args.todos:
+        indices = np.arange(len(armazem))
+    else:
+        # Mesma divisão do training_models.py: só a parte que o modelo não viu
+        test_size, semente = ler_divisao(args.config)
+        try:
+            _, indices = dividir_treino_teste(armazem.rotulos(), test_size=test_size, random_state=semente)
+        except ValueError as e: # Poucas amostras para uma divisão estratificada
+            print(f"ERRO: Não foi possível separar o conjunto de teste de '{args.armazem}': {e}")
+            print("Use --todos para avaliar todas as amostras.")
+            sys.exit(1)
+    preditores = {}
+    for caminho in args.modelos:
+        preditor = carregar_preditor(caminho, tamanho_max_lote=args.lote)
+        preditores[os.path.basename(caminho)] = preditor
+        print(f"  {preditor.descrever().splitlines()[0]}")
+
+    print(f"Fazendo previsões em {len(indices)} amostras (lotes de {args.lote})...")
+    y_true, y_pred, tempos = avaliar(preditores, armazem, indices, args.lote)
+    contornos_latencia, _ = armazem.lote(indices[:AMOSTRAS_LATENCIA])
+
+    os.makedirs(args.saida, exist_ok=True)
+    resultados = {}
+    for nome, preditor in preditores.items():
+        latencias = medir_latencia(preditor, contornos_latencia)
+        metricas = calcular_metricas(y_true, y_pred[nome], tempos[nome], latencias)
+        resultados[nome] = metricas
+
+        caminho_png = os.path.join(args.saida, f"matriz_confusao_{nome}.png")
+        salvar_matriz(metricas['matriz_confusao'], f"Matriz de Confusão - {nome}", caminho_png)
+
+        print(f"\n--- {nome} ---")
+        print(f"Acurácia: {metricas['acuracia'] * 100:.2f}%")
+        for tom, m in metricas['por_classe'].items():
+            print(f"  {tom}: precisão {m['precisao']:.3f}, revocação {m['revocacao']:.3f}, "
+                  f"f1 {m['f1']:.3f} ({m['suporte']} amostras)")
+        latencia = metricas['latencia_ms'] or {}
+        print(f"Vazão: {_formatar(metricas['amostras_por_segundo'], '.0f')} amostras/s | "
+              f"latência p50 {_formatar(latencia.get('p50'), '.3f')} ms, "
+              f"p99 {_formatar(latencia.get('p99'), '.3f')} ms")
+        print(f"Matriz de confusão salva em '{caminho_png}'")
+
+    caminho_json = os.path.join(args.saida, 'avaliacao.json')
+    with open(caminho_json, 'w', encoding='utf-8') as f:
+        json.dump({'armazem': args.armazem, 'todos': args.todos, 'modelos': resultados},
+                  f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em '{caminho_json}'")
+
+if __name__ == '__main__':
+    main()
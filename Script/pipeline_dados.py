@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from armazem_features import ArmazemFeatures, dividir_treino_teste
+
+from aumentacao_contornos import criar_aumentacao
+
+# Pipeline tf.data do treino, lendo do armazém de features:
+#
+#   índices (ordenados) -> blocos de ReadBlock -> leitura do armazém em paralelo
+#   -> cache -> embaralha -> lotes -> aumentação em paralelo -> prefetch
+#
+# A leitura em ordem crescente é sequencial no disco; o embaralhamento é feito
+# depois, no buffer. Com o cache, só a 1ª época lê o armazém.
+
+def _valor_paralelo(texto):
+    """'auto' -> tf.data.AUTOTUNE; número -> int."""
+    texto = str(texto).strip().lower()
+    return tf.data.AUTOTUNE if texto in ('auto', '') else int(texto)
+
+def ler_config_pipeline(config):
+    """Lê as seções [Data], [Pipeline] e [Augmentation] de um ConfigParser para um dict."""
+    return {
+        'armazem': config.get('Data', 'FeatureStore', fallback='armazem_features_combinado_v2'),
+        'test_size': config.getfloat('Data', 'TestSize', fallback=0.2),
+        'batch_size': config.getint('Pipeline', 'BatchSize', fallback=32),
+        'shuffle_buffer': config.getint('Pipeline', 'ShuffleBuffer', fallback=0),
+        'cache': config.get('Pipeline', 'Cache', fallback='memory').strip(),
+        'bloco_leitura': config.getint('Pipeline', 'ReadBlock', fallback=1024),
+        'chamadas_paralelas': _valor_paralelo(config.get('Pipeline', 'ParallelCalls', fallback='auto')),
+        'prefetch': _valor_paralelo(config.get('Pipeline', 'Prefetch', fallback='auto')),
+        'semente': config.getint('Pipeline', 'Seed', fallback=42),
+        'deterministico': config.getboolean('Pipeline', 'Deterministic', fallback=False),
+        'aumentacao': config.getboolean('Augmentation', 'Enabled', fallback=False),
+        'semitons_max': config.getfloat('Augmentation', 'SemitonesMax', fallback=1.0),
+        'warp_max': config.getfloat('Augmentation', 'TimeWarpMax', fallback=0.1),
+        'ruido': config.getfloat('Augmentation', 'JitterRelative', fallback=0.01),
+    }
+
+def configurar_determinismo(semente, deterministico):
+    """Fixa as sementes (Python, NumPy e TF) e, se pedido, liga as operações determinísticas."""
+    tf.keras.utils.set_random_seed(semente)
+    if deterministico:
+        tf.config.experimental.enable_op_determinism()
+
+def _ler_amostras(armazem, indices, p, cache=''):
+    """Dataset de amostras (contorno (100, 1), rótulo 0..3) lidas do armazém."""
+    indices = np.sort(np.asarray(indices, dtype=np.int64))
+
+    def ler_bloco(bloco):
+        contornos, rotulos = armazem.lote(bloco)
+        return contornos[..., np.newaxis], rotulos - 1
+
+    def ler_bloco_tf(bloco):
+        contornos, rotulos = tf.numpy_function(ler_bloco, [bloco], (tf.float32, tf.int64))
+        contornos.set_shape([None, armazem.tamanho_vetor, 1])
+        rotulos.set_shape([None])
+        return contornos, rotulos
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(indices)
+        .batch(p['bloco_leitura'])
+        .map(ler_bloco_tf, num_parallel_calls=p['chamadas_paralelas'])
+        .unbatch()
+    )
+    if cache.lower() == 'memory':
+        dataset = dataset.cache()
+    elif cache and cache.lower() != 'none':
+        dataset = dataset.cache(cache)
+    return dataset
+
+def _opcoes(p):
+    opcoes = tf.data.Options()
+    opcoes.deterministic = p['deterministico']
+    return opcoes
+
+def _dataset_treino(armazem, indices_treino, p, cache):
+    """Amostras de treino embaralhadas, em lotes e (se ativada) aumentadas."""
+    buffer = p['shuffle_buffer'] if p['shuffle_buffer'] > 0 else len(indices_treino)
+    dataset_treino = (
+        _ler_amostras(armazem, indices_treino, p, cache)
+        .shuffle(buffer, seed=p['semente'], reshuffle_each_iteration=True)
+        .batch(p['batch_size'])
+    )
+    if p['aumentacao']:
+        aumentar_lote = criar_aumentacao(p['semitons_max'], p['warp_max'], p['ruido'])
+        dataset_treino = dataset_treino.map(aumentar_lote, num_parallel_calls=p['chamadas_paralelas'])
+    return dataset_treino.prefetch(p['prefetch']).with_options(_opcoes(p))
+
+def criar_datasets(p):
+    """
+    Monta os datasets de treino e de teste a partir do armazém.
+
+    Args:
+        p (dict): Parâmetros de `ler_config_pipeline`.
+
+    Returns:
+        tuple: (dataset_treino, dataset_teste, num_treino, num_teste).
+    """
+    armazem = ArmazemFeatures(p['armazem'])
+    # Só os índices são divididos (estratificada; com Seed = 42, a mesma divisão de sempre)
+    indices_treino, indices_teste = dividir_treino_teste(armazem.rotulos(), test_size=p['test_size'],
+                                                         random_state=p['semente'])
+
+    cache_treino = p['cache']
+    if cache_treino.lower() not in ('memory', 'none', ''):
+        cache_treino += '_treino' # Cada dataset precisa do seu arquivo de cache
+    dataset_treino = _dataset_treino(armazem, indices_treino, p, cache_treino)
+
+    cache_teste = p['cache']
+    if cache_teste.lower() not in ('memory', 'none', ''):
+        cache_teste += '_teste'
+    dataset_teste = (
+        _ler_amostras(armazem, indices_teste, p, cache_teste)
+        .batch(p['batch_size'])
+        .prefetch(p['prefetch'])
+        .with_options(_opcoes(p))
+    )
+    return dataset_treino, dataset_teste, len(indices_treino), len(indices_teste)
+
+def medir_pipeline(p, num_lotes=200):
+    """
+    Lotes/s que o pipeline de treino (leitura, embaralhamento e aumentação)
+    entrega sozinho, sem o modelo. Se for bem maior que os passos/s do
+    treino, a entrada de dados não é o gargalo.
+
+    Usa uma cópia do pipeline sem o cache: é o ritmo da 1ª época, e parar a
+    leitura no meio não deixa um cache pela metade para o treino.
+    """
+    armazem = ArmazemFeatures(p['armazem'])
+    indices_treino, _ = dividir_treino_teste(armazem.rotulos(), test_size=p['test_size'], random_state=p['semente'])
+    iterador = iter(_dataset_treino(armazem, indices_treino, p, cache='none').take(num_lotes + 1))
+    next(iterador) # Aquecimento (abre o armazém, enche o buffer de embaralhamento e o prefetch)
+    lotes = 0
+    inicio = time.perf_counter()
+    for _ in iterador:
+        lotes += 1
+    duracao = time.perf_counter() - inicio
+    return lotes / duracao if duracao > 0 else 0.0
+
+class PassosPorSegundo(tf.keras.callbacks.Callback):
+    """Mostra, ao fim de cada época, os passos/s e amostras/s do treino."""
+
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._inicio = self._fim = time.perf_counter()
+        self._passos = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._passos += 1
+        self._fim = time.perf_counter() # Sem contar a validação, que roda depois do último passo
+
+    def on_epoch_end(self, epoch, logs=None):
+        duracao = self._fim - self._inicio
+        if duracao <= 0 or not self._passos:
+            return
+        passos_s = self._passos / duracao
+        print(f"\n[Época {epoch + 1}] {passos_s:.1f} passos/s, ~{passos_s * self.batch_size:.0f} amostras/s")
+        if logs is not None:
+            logs['passos_por_segundo'] = passos_s
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --- CONFIGURAÇÃO ---
+# Valores testados para cada hiperparâmetro. As combinações são sorteadas
+# (sem repetição) até NUM_TENTATIVAS.
+ESPACO_BUSCA = {
+    'filtros': [(32, 64), (64, 128), (16, 32)],
+    'kernel_size': [3, 5, 7],
+    'dropout': [0.2, 0.3, 0.4],
+    'dense': [32, 64, 128],
+    'learning_rate': [0.0001, 0.0003, 0.001],
+    'batch_size': [32, 64],
+}
+NUM_TENTATIVAS = 24
+SEMENTE = 42
+
+# Tentativas rodando ao mesmo tempo, e threads do TensorFlow para cada uma.
+# Processos x threads não deve passar do número de núcleos.
+NUM_PROCESSOS = max(1, (os.cpu_count() or 1) // 2)
+THREADS_POR_TENTATIVA = 2
+
+# Poda pela mediana: a partir da época EPOCAS_AQUECIMENTO, uma tentativa cuja
+# val_loss estiver pior que a mediana das outras na mesma época é interrompida.
+# Só começa a podar quando pelo menos MIN_TENTATIVAS_PODA já passaram por aquela época.
+EPOCAS_AQUECIMENTO = 5
+MIN_TENTATIVAS_PODA = 4
+
+PASTA_SAIDA = 'sweep'
+AMOSTRAS_LATENCIA = 200
+
+# --- ESTADO DE CADA PROCESSO ---
+# Cada processo carrega o conjunto de dados uma única vez (no initializer) e
+# o reaproveita em todas as tentativas que rodar.
+_dados = None
+_historico = None
+_trava = None
+
+def _iniciar_processo(caminho_config, historico, trava):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(THREADS_POR_TENTATIVA)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    from training_models import ler_config
+    from armazem_features import ArmazemFeatures, dividir_treino_teste
+
+    global _dados, _historico, _trava
+    _historico, _trava = historico, trava
+    p = ler_config(caminho_config)
+    armazem = ArmazemFeatures(p['armazem'])
+    indices_treino, indices_teste = dividir_treino_teste(armazem.rotulos(), test_size=p['test_size'],
+                                                         random_state=p['semente'])
+    X_train, y_train = armazem.lote(np.sort(indices_treino))
+    X_test, y_test = armazem.lote(np.sort(indices_teste))
+    _dados = {
+        'config': p,
+        'X_train': X_train[..., np.newaxis], 'y_train': y_train - 1,
+        'X_test': X_test[..., np.newaxis], 'y_test': y_test - 1,
+    }
+
+def _criar_callback_poda(id_tentativa):
+    import tensorflow as tf
+
+    class PodaPelaMediana(tf.keras.callbacks.Callback):
+        """Publica a val_loss de cada época e para o treino se ela estiver acima da mediana."""
+        podada = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            val_loss = float(logs['val_loss'])
+            with _trava:
+                perdas = _historico.get(id_tentativa, []) + [val_loss]
+                _historico[id_tentativa] = perdas
+                outras = [h[epoch] for t, h in _historico.items() if t != id_tentativa and len(h) > epoch]
+            if epoch + 1 >= EPOCAS_AQUECIMENTO and len(outras) >= MIN_TENTATIVAS_PODA:
+                if val_loss > np.median(outras):
+                    self.podada = True
+                    self.model.stop_training = True
+
+    return PodaPelaMediana()
+
+def rodar_tentativa(id_tentativa, parametros):
+    """
+    Treina um modelo com `parametros` nos dados já carregados do processo.
+
+    Returns:
+        dict: parâmetros, métricas, tamanho e latência (ou o motivo da poda).
+    """
+    import tensorflow as tf
+    from training_models import construir_modelo
+    from aumentacao_contornos import criar_aumentacao
+    from conversorTfLite import medir_latencia
+    from preditor import PreditorTFLite
+
+    p = _dados['config']
+    tf.keras.utils.set_random_seed(p['semente'] + id_tentativa)
+    dataset_treino = (
+        tf.data.Dataset.from_tensor_slices((_dados['X_train'], _dados['y_train']))
+        .shuffle(len(_dados['y_train']), seed=p['semente'], reshuffle_each_iteration=True)
+        .batch(parametros['batch_size'])
+    )
+    if p['aumentacao']:
+        aumentar_lote = criar_aumentacao(p['semitons_max'], p['warp_max'], p['ruido'])
+        dataset_treino = dataset_treino.map(aumentar_lote, num_parallel_calls=tf.data.AUTOTUNE)
+    dataset_treino = dataset_treino.prefetch(tf.data.AUTOTUNE)
+    dataset_teste = (tf.data.Dataset.from_tensor_slices((_dados['X_test'], _dados['y_test']))
+                     .batch(256).prefetch(tf.data.AUTOTUNE))
+
+    model = construir_modelo(filtros=parametros['filtros'], kernel_size=parametros['kernel_size'],
+                             dropout=parametros['dropout'], dense=parametros['dense'],
+                             learning_rate=parametros['learning_rate'],
+                             tamanho_vetor=_dados['X_train'].shape[1])
+    poda = _criar_callback_poda(id_tentativa)
+    early_stopping = tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=p['paciencia'],
+                                                      restore_best_weights=True)
+    inicio = time.perf_counter()
+    history = model.fit(dataset_treino, epochs=p['epocas'], validation_data=dataset_teste,
+                        callbacks=[early_stopping, poda], verbose=0)
+    resultado = {
+        'tentativa': id_tentativa,
+        **{k: (list(v) if isinstance(v, tuple) else v) for k, v in parametros.items()},
+        'epocas': len(history.history['val_loss']),
+        'melhor_val_loss': float(min(history.history['val_loss'])),
+        'podada': poda.podada,
+        'parametros_modelo': int(model.count_params()),
+        'tempo_treino_s': time.perf_counter() - inicio,
+    }
+    if poda.podada:
+        return resultado
+
+    _, acuracia = model.evaluate(dataset_teste, verbose=0)
+    caminho_modelo = os.path.join(PASTA_SAIDA, f"tentativa_{id_tentativa:03d}.keras")
+    model.save(caminho_modelo)
+
+    # Latência como no bot com o backend TFLite (quantização dinâmica, 1 amostra por vez)
+    conversor = tf.lite.TFLiteConverter.from_keras_model(model)
+    conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+    modelo_tflite = conversor.convert()
+    preditor = PreditorTFLite(conteudo=modelo_tflite, num_threads=1)
+    resultado.update({
+        'acuracia': float(acuracia),
+        'modelo': caminho_modelo,
+        'tamanho_keras_kb': os.path.getsize(caminho_modelo) / 1024,
+        'tamanho_tflite_kb': len(modelo_tflite) / 1024,
+        'latencia_tflite_ms': medir_latencia(preditor, _dados['X_test'][..., 0], AMOSTRAS_LATENCIA),
+    })
+    return resultado
+
+def sortear_tentativas(espaco=ESPACO_BUSCA, num_tentativas=NUM_TENTATIVAS, semente=SEMENTE):
+    nomes = list(espaco)
+    combinacoes = list(itertools.product(*(espaco[n] for n in nomes)))
+    rng = np.random.default_rng(semente)
+    escolhidas = rng.permutation(len(combinacoes))[:num_tentativas]
+    return [dict(zip(nomes, combinacoes[i])) for i in escolhidas]
+
+def marcar_fronteira(df):
+    """Tentativas que nenhuma outra supera em acurácia E latência ao mesmo tempo."""
+    completas = df[~df['podada']].sort_values('latencia_tflite_ms')
+    fronteira, melhor_acuracia = set(), -1.0
+    for i, linha in completas.iterrows():
+        if linha['acuracia'] > melhor_acuracia:
+            fronteira.add(i)
+            melhor_acuracia = linha['acuracia']
+    df['fronteira'] = df.index.isin(fronteira)
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros do classificador de tons.")
+    parser.add_argument('--config', default=None, help="Config do treino (padrão: config_treino.ini)")
+    parser.add_argument('--tentativas', type=int, default=NUM_TENTATIVAS)
+    parser.add_argument('--processos', type=int, default=NUM_PROCESSOS)
+    args = parser.parse_args()
+
+    from training_models import ARQUIVO_CONFIG
+    caminho_config = args.config or ARQUIVO_CONFIG
+    os.makedirs(PASTA_SAIDA, exist_ok=True)
+    tentativas = sortear_tentativas(num_tentativas=args.tentativas)
+    print(f"--- Sweep: {len(tentativas)} tentativas, {args.processos} em paralelo "
+          f"({THREADS_POR_TENTATIVA} threads cada) ---")
+
+    resultados = []
+    with Manager() as gerenciador:
+        historico, trava = gerenciador.dict(), gerenciador.Lock()
+        executor = ProcessPoolExecutor(max_workers=args.processos, initializer=_iniciar_processo,
+                                       initargs=(caminho_config, historico, trava))
+        try:
+            futuros = {executor.submit(rodar_tentativa, i, t): i for i, t in enumerate(tentativas)}
+            for futuro in as_completed(futuros):
+                try:
+                    r = futuro.result()
+                except Exception as e:
+                    print(f"Tentativa {futuros[futuro]} falhou: {e}")
+                    continue
+                resultados.append(r)
+                if r['podada']:
+                    print(f"[{len(resultados)}/{len(tentativas)}] Tentativa {r['tentativa']} podada "
+                          f"na época {r['epocas']} (val_loss {r['melhor_val_loss']:.4f})")
+                else:
+                    print(f"[{len(resultados)}/{len(tentativas)}] Tentativa {r['tentativa']}: "
+                          f"acurácia {r['acuracia'] * 100:.2f}%, {r['parametros_modelo']} parâmetros, "
+                          f"{r['latencia_tflite_ms']:.3f} ms")
+        except KeyboardInterrupt:
+            print("\nInterrompido! Salvando o placar das tentativas terminadas.")
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            executor.shutdown()
+
+    if not resultados:
+        print("Nenhuma tentativa terminou.")
+        return
+    df = pd.DataFrame(resultados)
+    for coluna in ('acuracia', 'latencia_tflite_ms', 'tamanho_tflite_kb', 'tamanho_keras_kb', 'modelo'):
+        if coluna not in df:
+            df[coluna] = np.nan
+    df = marcar_fronteira(df).sort_values(['podada', 'acuracia'], ascending=[True, False])
+    df.to_csv(os.path.join(PASTA_SAIDA, 'placar.csv'), index=False)
+    with open(os.path.join(PASTA_SAIDA, 'placar.json'), 'w', encoding='utf-8') as f:
+        json.dump(json.loads(df.to_json(orient='records')), f, indent=2)
+
+    colunas = ['tentativa', 'acuracia', 'latencia_tflite_ms', 'tamanho_tflite_kb', 'parametros_modelo',
+               'filtros', 'kernel_size', 'dropout', 'dense', 'learning_rate', 'batch_size', 'fronteira']
+    print("\n--- Placar (melhor acurácia primeiro; 'fronteira' = melhor troca acurácia/latência) ---")
+    print(df[~df['podada']][colunas].to_string(index=False))
+    print(f"\n{int(df['podada'].sum())} tentativas podadas. Placar salvo em '{PASTA_SAIDA}/placar.csv'.")
+
+if __name__ == '__main__':
+    main()
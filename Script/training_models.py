@@ -1,114 +1,146 @@
-import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv1D, MaxPooling1D, Dropout, Flatten, Dense
-from tensorflow.keras.callbacks import EarlyStopping
-from tensorflow.keras.layers import LSTM, BatchNormalization
-from sklearn.model_selection import train_test_split
-import matplotlib.pyplot as plt
-
-print(f"TensorFlow Version: {tf.__version__}")
-
-# --- 2. Carregamento dos Dados ---
-print("\nCarregando features e labels pré-processados...")
-X = np.load('features_combinado_v2_X.npy')
-y = np.load('labels_combinado_v2_y.npy')
-print(f"Dados carregados. Formato de X: {X.shape}, Formato de y: {y.shape}")
-
-# --- 3. Preparação dos Dados para o Treinamento ---
-print("\nPreparando dados para o treinamento...")
-y = y - 1
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-X_train = np.expand_dims(X_train, axis=-1)
-X_test = np.expand_dims(X_test, axis=-1)
-print(f"Dados de treino (X_train): {X_train.shape}")
-print(f"Dados de teste (X_test): {X_test.shape}")
-
-# --- 4. Construção da Arquitetura do Modelo (1D-CNN) ---
-print("\nConstruindo um modelo 1D-CNN mais simples e regularizado...")
-
-
-# MUDANÇA 1: Arquitetura do Modelo Simplificada
-model = Sequential([
-    # Mantemos os filtros (64), eles parecem adequados
-    Conv1D(filters=64, kernel_size=5, activation='relu', input_shape=(100, 1)),
-    MaxPooling1D(pool_size=2),
-    # MUDANÇA: Aumentamos o Dropout um pouco para combater o overfitting
-    Dropout(0.3), # Ou tente 0.4 se 0.35 ainda for pouco
-
-    # Mantemos os filtros (128)
-    Conv1D(filters=128, kernel_size=5, activation='relu'),
-    MaxPooling1D(pool_size=2),
-    # MUDANÇA: Aumentamos o Dropout um pouco para combater o overfitting
-    Dropout(0.3), # Ou tente 0.4 se 0.35 ainda for pouco
-
-    Flatten(),
-    Dense(64, activation='relu'),
-    Dense(4, activation='softmax')
-])
-
-# MUDANÇA 3: EarlyStopping com mais paciência
-early_stopping = EarlyStopping(
-    monitor='val_loss',
-    patience=7,  # Um pouco mais de paciência para o modelo se estabilizar
-    restore_best_weights=True
-)
-
-# --- 5. Compilação do Modelo ---
-from tensorflow.keras.optimizers import Adam
-
-
-model.compile(
-    # MUDANÇA: Use um otimizador Adam com uma taxa de aprendizado menor
-    optimizer=Adam(learning_rate=0.0001), # O padrão é 0.001
-    loss='sparse_categorical_crossentropy',
-    metrics=['accuracy']
-)
-
-# --- 6. Treinamento do Modelo ---
-print("\nIniciando o treinamento do modelo...")
-# MUDANÇA 4: Mais épocas, deixando o EarlyStopping trabalhar
-history = model.fit(
-    X_train, 
-    y_train, 
-    epochs=50,  # Aumente para 50. Não se preocupe, ele não vai rodar tudo.
-    batch_size=32, # Mude para 32, um valor mais padrão e estável
-    validation_data=(X_test, y_test),
-    callbacks=[early_stopping] # Mantenha o EarlyStopping, ele é seu melhor amigo
-)
-
-# --- 7. Avaliação do Modelo ---
-print("\n--- Avaliação Final do Modelo ---")
-loss, accuracy = model.evaluate(X_test, y_test)
-print(f"Acurácia no conjunto de teste: {accuracy * 100:.2f}%")
-print(f"Loss no conjunto de teste: {loss:.4f}")
-
-# --- 8. Salvando o Modelo Treinado ---
-MODEL_SAVE_PATH = 'modelo_classificador_v3.keras' # Novo nome para o modelo
-print(f"\nSalvando o modelo treinado em '{MODEL_SAVE_PATH}'...")
-model.save(MODEL_SAVE_PATH)
-print("Modelo salvo com sucesso!")
-
-# --- 9. (Bônus) Visualização do Histórico de Treinamento ---
-def plotar_historico(history):
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
-    ax1.plot(history.history['accuracy'], label='Acurácia de Treino')
-    ax1.plot(history.history['val_accuracy'], label='Acurácia de Validação')
-    ax1.set_title('Acurácia do Modelo')
-    ax1.set_ylabel('Acurácia')
-    ax1.set_xlabel('Época')
-    ax1.legend(loc='lower right')
-    ax1.grid(True)
-    ax2.plot(history.history['loss'], label='Perda de Treino')
-    ax2.plot(history.history['val_loss'], label='Perda de Validação')
-    ax2.set_title('Perda (Loss) do Modelo')
-    ax2.set_ylabel('Perda')
-    ax2.set_xlabel('Época')
-    ax2.legend(loc='upper right')
-    ax2.grid(True)
-    plt.show()
-
-print("\nGerando gráficos do treinamento...")
-plotar_historico(history)
\ No newline at end of file
+import os
+import argparse
+import configparser
+import tensorflow as tf
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Conv1D, MaxPooling1D, Dropout, Flatten, Dense
+from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.layers import LSTM, BatchNormalization
+from tensorflow.keras.optimizers import Adam
+import matplotlib.pyplot as plt
+
+from pipeline_dados import (ler_config_pipeline, configurar_determinismo, criar_datasets,
+                            medir_pipeline, PassosPorSegundo)
+
+# Parâmetros do treino (tamanho do lote, pipeline de dados, aumentação, épocas...)
+# ficam no config_treino.ini, ao lado deste script.
+ARQUIVO_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config_treino.ini')
+
+def ler_config(caminho=ARQUIVO_CONFIG):
+    """Lê o config_treino.ini: parâmetros do pipeline mais os da seção [Training]."""
+    config = configparser.ConfigParser()
+    if not config.read(caminho, encoding='utf-8'):
+        print(f"AVISO: '{caminho}' não encontrado. Usando os valores padrão.")
+    parametros = ler_config_pipeline(config)
+    parametros.update({
+        'epocas': config.getint('Training', 'Epochs', fallback=50),
+        'learning_rate': config.getfloat('Training', 'LearningRate', fallback=0.0001),
+        'paciencia': config.getint('Training', 'Patience', fallback=7),
+        'modelo_saida': config.get('Training', 'ModelSavePath', fallback='modelo_classificador_v3.keras'),
+    })
+    return parametros
+
+# --- Construção da Arquitetura do Modelo (1D-CNN) ---
+def construir_modelo(filtros=(64, 128), kernel_size=5, dropout=0.3, dense=64,
+                     learning_rate=0.0001, tamanho_vetor=100, num_classes=4):
+    """
+    O 1D-CNN simples e regularizado de sempre, já compilado.
+    Os valores padrão são os do modelo v3.
+    """
+    # MUDANÇA 1: Arquitetura do Modelo Simplificada
+    camadas = [tf.keras.Input(shape=(tamanho_vetor, 1))]
+    for num_filtros in filtros:
+        # 64 e depois 128 filtros, eles parecem adequados
+        camadas += [
+            Conv1D(filters=num_filtros, kernel_size=kernel_size, activation='relu'),
+            MaxPooling1D(pool_size=2),
+            # MUDANÇA: Aumentamos o Dropout um pouco para combater o overfitting
+            Dropout(dropout), # Ou tente 0.4 se 0.35 ainda for pouco
+        ]
+    camadas += [
+        Flatten(),
+        Dense(dense, activation='relu'),
+        Dense(num_classes, activation='softmax'),
+    ]
+    model = Sequential(camadas)
+
+    # --- Compilação do Modelo ---
+    model.compile(
+        # MUDANÇA: Use um otimizador Adam com uma taxa de aprendizado menor
+        optimizer=Adam(learning_rate=learning_rate), # O padrão é 0.001
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    return model
+
+# --- (Bônus) Visualização do Histórico de Treinamento ---
+def plotar_historico(history):
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
+    ax1.plot(history.history['accuracy'], label='Acurácia de Treino')
+    ax1.plot(history.history['val_accuracy'], label='Acurácia de Validação')
+    ax1.set_title('Acurácia do Modelo')
+    ax1.set_ylabel('Acurácia')
+    ax1.set_xlabel('Época')
+    ax1.legend(loc='lower right')
+    ax1.grid(True)
+    ax2.plot(history.history['loss'], label='Perda de Treino')
+    ax2.plot(history.history['val_loss'], label='Perda de Validação')
+    ax2.set_title('Perda (Loss) do Modelo')
+    ax2.set_ylabel('Perda')
+    ax2.set_xlabel('Época')
+    ax2.legend(loc='upper right')
+    ax2.grid(True)
+    plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina o classificador de tons.")
+    parser.add_argument('--config', default=ARQUIVO_CONFIG, help="Arquivo de configuração do treino")
+    parser.add_argument('--sem-graficos', action='store_true', help="Não mostra os gráficos no final")
+    args = parser.parse_args()
+
+    print(f"TensorFlow Version: {tf.__version__}")
+    p = ler_config(args.config)
+    configurar_determinismo(p['semente'], p['deterministico'])
+
+    # --- 1. Dados ---
+    # Lidos do armazém sob demanda pelo tf.data (veja pipeline_dados.py)
+    print(f"\nMontando o pipeline de dados a partir de '{p['armazem']}'...")
+    dataset_treino, dataset_teste, num_treino, num_teste = criar_datasets(p)
+    print(f"Amostras de treino: {num_treino} | Amostras de teste: {num_teste}")
+    print(f"Lote: {p['batch_size']} | Cache: {p['cache']} | Determinístico: {p['deterministico']}")
+    if p['aumentacao']:
+        print("Aumentação nos contornos ativada: "
+              f"±{p['semitons_max']} semitons, ±{p['warp_max'] * 100:.0f}% de tempo, "
+              f"{p['ruido'] * 100:.0f}% de jitter.")
+    print(f"Pipeline de treino sozinho (sem cache, como na 1ª época): {medir_pipeline(p):.1f} lotes/s "
+          f"(compare com os passos/s do treino)")
+
+    # --- 2. Modelo ---
+    print("\nConstruindo um modelo 1D-CNN mais simples e regularizado...")
+    model = construir_modelo(learning_rate=p['learning_rate'])
+    model.summary()
+
+    # MUDANÇA 3: EarlyStopping com mais paciência
+    early_stopping = EarlyStopping(
+        monitor='val_loss',
+        patience=p['paciencia'],  # Um pouco mais de paciência para o modelo se estabilizar
+        restore_best_weights=True
+    )
+
+    # --- 3. Treinamento do Modelo ---
+    print("\nIniciando o treinamento do modelo...")
+    # MUDANÇA 4: Mais épocas, deixando o EarlyStopping trabalhar
+    history = model.fit(
+        dataset_treino, # Já embaralhado, em lotes e (se ativada) aumentado
+        epochs=p['epocas'],  # Não se preocupe, ele não vai rodar tudo.
+        validation_data=dataset_teste,
+        callbacks=[early_stopping, PassosPorSegundo(p['batch_size'])] # O EarlyStopping é seu melhor amigo
+    )
+
+    # --- 4. Avaliação do Modelo ---
+    print("\n--- Avaliação Final do Modelo ---")
+    loss, accuracy = model.evaluate(dataset_teste)
+    print(f"Acurácia no conjunto de teste: {accuracy * 100:.2f}%")
+    print(f"Loss no conjunto de teste: {loss:.4f}")
+
+    # --- 5. Salvando o Modelo Treinado ---
+    print(f"\nSalvando o modelo treinado em '{p['modelo_saida']}'...")
+    model.save(p['modelo_saida'])
+    print("Modelo salvo com sucesso!")
+
+    if not args.sem_graficos:
+        print("\nGerando gráficos do treinamento...")
+        plotar_historico(history)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import json
+import os
+import shutil
+import sys
+import numpy as np
+
+# Armazém de features em chunks, só de acréscimo (append-only).
+#
+# Cada chunk é uma pasta com um .npy por coluna:
+#   contornos.npy  float32 (N, 100)  -> vetores de pitch
+#   rotulos.npy    int8    (N,)      -> tom (1 a 4, como no mapa .csv)
+#   pinyin.npy, locutor.npy, caminho.npy  -> texto (unicode de tamanho fixo)
+# e o arquivo indice.json lista os chunks. Os leitores abrem os .npy com
+# mmap_mode='r': nada é carregado na RAM até ser usado, e fatias de um chunk
+# são views sem cópia. Assim o dataset pode crescer sem precisar caber na memória.
+
+VERSAO_ARMAZEM = 1
+ARQUIVO_INDICE = 'indice.json'
+
+def _carregar_indice(diretorio):
+    caminho = os.path.join(diretorio, ARQUIVO_INDICE)
+    if not os.path.exists(caminho):
+        return {'versao': VERSAO_ARMAZEM, 'tamanho_vetor': None, 'chunks': {}}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _salvar_indice(diretorio, indice):
+    caminho = os.path.join(diretorio, ARQUIVO_INDICE)
+    caminho_tmp = caminho + '.tmp'
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, indent=1)
+    os.replace(caminho_tmp, caminho)
+
+class EscritorArmazem:
+    """
+    Acrescenta chunks a um armazém (criando a pasta se preciso).
+
+    Cada chunk tem um nome; os leitores percorrem os chunks em ordem alfabética
+    de nome. Um chunk com o mesmo nome de um existente o substitui (útil quando
+    o mapa de entrada muda e um shard precisa ser refeito).
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self._indice = _carregar_indice(diretorio)
+
+    def info_chunk(self, nome):
+        """Metadados de um chunk (ou None se ele não existir)."""
+        return self._indice['chunks'].get(nome)
+
+    def nomes_chunks(self):
+        return sorted(self._indice['chunks'])
+
+    def remover_chunk(self, nome):
+        """
+        Tira um chunk do armazém. O índice é gravado antes de apagar a pasta:
+        se o processo cair no meio, sobra só uma pasta que ninguém lê.
+        """
+        if self._indice['chunks'].pop(nome, None) is None:
+            return
+        _salvar_indice(self.diretorio, self._indice)
+        shutil.rmtree(os.path.join(self.diretorio, nome), ignore_errors=True)
+
+    def adicionar_chunk(self, nome, contornos, rotulos, pinyin=None, locutor=None, caminhos=None, **metadados):
+        """
+        Grava um chunk novo de forma atômica (pasta temporária + rename + índice).
+
+        Args:
+            nome (str): Nome do chunk (define a ordem de leitura).
+            contornos (array): (N, tamanho_vetor), convertido para float32.
+            rotulos (array): (N,) com o tom de cada amostra.
+            pinyin, locutor, caminhos (list | None): Colunas de texto (vazias se None).
+            **metadados: Guardados no índice junto com o chunk (ex.: assinatura).
+        """
+        contornos = np.asarray(contornos, dtype=np.float32)
+        n = len(contornos)
+        if self._indice['tamanho_vetor'] is None:
+            self._indice['tamanho_vetor'] = int(contornos.shape[1]) if contornos.ndim == 2 else 0
+        elif n and contornos.shape[1] != self._indice['tamanho_vetor']:
+            raise ValueError(f"Chunk com vetores de {contornos.shape[1]} pontos; o armazém usa "
+                             f"{self._indice['tamanho_vetor']}.")
+
+        colunas = {
+            'contornos': contornos,
+            'rotulos': np.asarray(rotulos, dtype=np.int8),
+            'pinyin': np.asarray(pinyin if pinyin is not None else [''] * n, dtype=str),
+            'locutor': np.asarray(locutor if locutor is not None else [''] * n, dtype=str),
+            'caminho': np.asarray(caminhos if caminhos is not None else [''] * n, dtype=str),
+        }
+        for coluna, valores in colunas.items():
+            if len(valores) != n:
+                raise ValueError(f"A coluna '{coluna}' tem {len(valores)} linhas; esperado {n}.")
+
+        pasta_final = os.path.join(self.diretorio, nome)
+        pasta_tmp = pasta_final + '.tmp'
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
+        os.makedirs(pasta_tmp)
+        for coluna, valores in colunas.items():
+            np.save(os.path.join(pasta_tmp, f"{coluna}.npy"), valores)
+
+        shutil.rmtree(pasta_final, ignore_errors=True)
+        os.replace(pasta_tmp, pasta_final)
+        self._indice['chunks'][nome] = {'linhas': n, **metadados}
+        _salvar_indice(self.diretorio, self._indice)
+
+class ArmazemFeatures:
+    """
+    Leitura de um armazém de features com memory-map.
+
+    Os índices globais seguem a ordem dos chunks (alfabética) e, dentro de cada
+    chunk, a ordem em que as linhas foram gravadas.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        indice = _carregar_indice(diretorio)
+        if not indice['chunks']:
+            raise FileNotFoundError(f"Nenhum chunk encontrado no armazém '{diretorio}'.")
+        self.tamanho_vetor = indice['tamanho_vetor']
+        self.nomes_chunks = sorted(indice['chunks'])
+        linhas = [indice['chunks'][nome]['linhas'] for nome in self.nomes_chunks]
+        self._inicios = np.concatenate([[0], np.cumsum(linhas)]).astype(np.int64)
+        self._abertos = {}
+
+    def __len__(self):
+        return int(self._inicios[-1])
+
+    def _coluna_chunk(self, i, coluna):
+        chave = (i, coluna)
+        if chave not in self._abertos:
+            caminho = os.path.join(self.diretorio, self.nomes_chunks[i], f"{coluna}.npy")
+            self._abertos[chave] = np.load(caminho, mmap_mode='r')
+        return self._abertos[chave]
+
+    def contornos_chunk(self, i):
+        """View memory-mapped (sem cópia) dos contornos do chunk `i`."""
+        return self._coluna_chunk(i, 'contornos')
+
+    def coluna(self, nome):
+        """Coluna inteira concatenada (rótulos ou texto; pequenas perto dos contornos)."""
+        partes = [self._coluna_chunk(i, nome) for i in range(len(self.nomes_chunks))]
+        return np.concatenate(partes) if partes else np.zeros(0)
+
+    def rotulos(self):
+        """Tom de cada amostra (1 a 4), como estava no mapa .csv."""
+        return self.coluna('rotulos').astype(np.int64)
+
+    def lote(self, indices):
+        """
+        Busca as linhas `indices` (índices globais) e devolve (contornos, rótulos).
+        Só as linhas pedidas são copiadas para a memória.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        contornos = np.empty((len(indices), self.tamanho_vetor), dtype=np.float32)
+        rotulos = np.empty(len(indices), dtype=np.int64)
+        chunk_de_cada = np.searchsorted(self._inicios, indices, side='right') - 1
+        for i in np.unique(chunk_de_cada):
+            posicoes = np.nonzero(chunk_de_cada == i)[0]
+            locais = indices[posicoes] - self._inicios[i]
+            ordem = np.argsort(locais) # Leitura em ordem crescente: melhor para o disco
+            contornos[posicoes[ordem]] = self.contornos_chunk(i)[locais[ordem]]
+            rotulos[posicoes[ordem]] = self._coluna_chunk(i, 'rotulos')[locais[ordem]]
+        return contornos, rotulos
+
+    def iterar_lotes(self, tamanho_lote=1024, indices=None, embaralhar=False, semente=None):
+        """
+        Percorre o armazém em lotes de (contornos, rótulos), com memória limitada
+        ao tamanho do lote.
+
+        Sem `indices` e sem embaralhar, os lotes são fatias dos chunks (views sem cópia).
+        """
+        if indices is None and not embaralhar:
+            for i in range(len(self.nomes_chunks)):
+                contornos, rotulos = self.contornos_chunk(i), self._coluna_chunk(i, 'rotulos')
+                for inicio in range(0, len(contornos), tamanho_lote):
+                    yield (contornos[inicio:inicio + tamanho_lote],
+                           rotulos[inicio:inicio + tamanho_lote].astype(np.int64))
+            return
+
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if embaralhar:
+            indices = np.random.default_rng(semente).permutation(indices)
+        for inicio in range(0, len(indices), tamanho_lote):
+            yield self.lote(indices[inicio:inicio + tamanho_lote])
+
+def dividir_treino_teste(rotulos, test_size=0.2, random_state=42):
+    """
+    Divisão treino/teste estratificada, devolvendo só os índices (o armazém não é copiado).
+    Usa os mesmos parâmetros de sempre do training_models.py.
+    """
+    from sklearn.model_selection import train_test_split
+    indices = np.arange(len(rotulos))
+    return train_test_split(indices, test_size=test_size, random_state=random_state, stratify=rotulos)
+
+def importar_npy(arquivo_x, arquivo_y, diretorio, linhas_por_chunk=100000):
+    """Converte um par antigo features_*_X.npy / labels_*_y.npy em um armazém."""
+    X = np.load(arquivo_x, mmap_mode='r')
+    y = np.load(arquivo_y)
+    escritor = EscritorArmazem(diretorio)
+    for n, inicio in enumerate(range(0, len(X), linhas_por_chunk)):
+        fim = inicio + linhas_por_chunk
+        escritor.adicionar_chunk(f"importado_{n:05d}", X[inicio:fim], y[inicio:fim])
+    print(f"{len(X)} amostras importadas de '{arquivo_x}' para '{diretorio}'.")
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == 'importar':
+        importar_npy(sys.argv[2], sys.argv[3], sys.argv[4])
+    else:
+        print("Uso: python armazem_features.py importar <features_X.npy> <labels_y.npy> <pasta_do_armazem>")
@@ -1,5 +1,11 @@
 import tensorflow as tf
+import numpy as np
+import argparse
+import time
 import os
+import sys
+
+from preditor import PreditorKeras, PreditorTFLite
 
 # --- Configuração ---
 # Coloque aqui o nome do seu melhor modelo Keras.
@@ -10,22 +16,113 @@ KERAS_MODEL_FILENAME = 'modelo_classificador_tons_otimizado.keras'
 # Nome do arquivo de saída para o modelo convertido.
 TFLITE_MODEL_FILENAME = 'model.tflite'
 
-def convert_model():
+# Tipo de quantização:
+#   'dinamica' -> só os pesos em 8 bits (o que este script sempre fez).
+#   'int8'     -> pesos E ativações em int8, calibrados com dados reais.
+#                 É o menor e mais rápido para servidores só com CPU, mas
+#                 precisa das features abaixo (use --modo int8).
+QUANTIZATION_MODE = 'dinamica'
+
+# Features usadas para calibrar a quantização int8 e para validar o modelo convertido.
+# A divisão treino/teste é a mesma do training_models.py (20%, random_state=42, estratificada):
+# calibramos com o treino e validamos com o teste.
+FEATURES_X_FILENAME = 'features_combinado_v2_X.npy'
+LABELS_Y_FILENAME = 'labels_combinado_v2_y.npy'
+CALIBRATION_SAMPLES = 500
+
+# Se a acurácia do modelo convertido cair mais que isso (em pontos percentuais)
+# em relação ao modelo Keras, o arquivo NÃO é salvo.
+MAX_ACCURACY_DROP = 1.0
+
+# Quantas previsões de 1 amostra usar para medir a latência.
+LATENCY_SAMPLES = 200
+
+def carregar_dados_validacao():
+    """Carrega as features e devolve (X_treino, X_teste, y_teste), ou None se não existirem."""
+    if not (os.path.exists(FEATURES_X_FILENAME) and os.path.exists(LABELS_Y_FILENAME)):
+        return None
+    from sklearn.model_selection import train_test_split
+    X = np.load(FEATURES_X_FILENAME).astype(np.float32)
+    y = np.load(LABELS_Y_FILENAME) - 1
+    X_train, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return X_train, X_test, y_test
+
+def criar_dataset_representativo(X_train, num_amostras=CALIBRATION_SAMPLES, semente=42):
+    """Gerador de amostras de calibração (uma por vez, no formato (1, 100, 1)) para o conversor."""
+    rng = np.random.default_rng(semente)
+    indices = rng.choice(len(X_train), size=min(num_amostras, len(X_train)), replace=False)
+
+    def gerador():
+        for i in indices:
+            yield [X_train[i][np.newaxis, :, np.newaxis]]
+    return gerador
+
+def medir_latencia(preditor, X, num_amostras=LATENCY_SAMPLES):
+    """Latência média (ms) de uma previsão de 1 amostra."""
+    num_amostras = min(num_amostras, len(X))
+    preditor.prever(X[:1]) # Aquecimento
+    inicio = time.perf_counter()
+    for i in range(num_amostras):
+        preditor.prever(X[i:i + 1])
+    return (time.perf_counter() - inicio) * 1000 / num_amostras
+
+def validar_conversao(preditor_keras, preditor_tflite, X_test, y_test):
+    """
+    Compara o modelo convertido com o modelo Keras no conjunto de teste.
+
+    Returns:
+        dict: acurácias, diferença (em pontos), concordância por classe e latências.
+    """
+    pred_keras = np.argmax(preditor_keras.prever(X_test), axis=1)
+    pred_tflite = np.argmax(preditor_tflite.prever(X_test), axis=1)
+
+    acuracia_keras = np.mean(pred_keras == y_test) * 100
+    acuracia_tflite = np.mean(pred_tflite == y_test) * 100
+    concordancia_por_classe = {
+        int(classe): float(np.mean(pred_tflite[y_test == classe] == pred_keras[y_test == classe]) * 100)
+        for classe in np.unique(y_test)
+    }
+    return {
+        'acuracia_keras': acuracia_keras,
+        'acuracia_tflite': acuracia_tflite,
+        'queda': acuracia_keras - acuracia_tflite,
+        'concordancia_total': float(np.mean(pred_tflite == pred_keras) * 100),
+        'concordancia_por_classe': concordancia_por_classe,
+        'latencia_keras_ms': medir_latencia(preditor_keras, X_test),
+        'latencia_tflite_ms': medir_latencia(preditor_tflite, X_test),
+    }
+
+def convert_model(keras_path=KERAS_MODEL_FILENAME, tflite_path=TFLITE_MODEL_FILENAME,
+                  mode=QUANTIZATION_MODE, max_drop=MAX_ACCURACY_DROP):
     """
     Carrega um modelo Keras e o converte para o formato TensorFlow Lite.
+
+    Returns:
+        bool: True se o arquivo .tflite foi salvo; False se a conversão falhou
+        ou se a validação recusou o modelo convertido.
     """
     print("--- Iniciando a conversão do modelo para TensorFlow Lite ---")
+    print(f"Modo de quantização: '{mode}'")
 
     # 1. Verificação do arquivo de entrada
-    if not os.path.exists(KERAS_MODEL_FILENAME):
-        print(f"ERRO: O arquivo do modelo '{KERAS_MODEL_FILENAME}' não foi encontrado.")
+    if not os.path.exists(keras_path):
+        print(f"ERRO: O arquivo do modelo '{keras_path}' não foi encontrado.")
         print("Por favor, certifique-se de que o nome do arquivo está correto e ele está na mesma pasta que este script.")
-        return
+        return False
+
+    dados = carregar_dados_validacao()
+    if dados is None:
+        print(f"AVISO: '{FEATURES_X_FILENAME}' / '{LABELS_Y_FILENAME}' não encontrados.")
+        if mode == 'int8':
+            print("ERRO: A quantização int8 precisa dessas features para calibrar o modelo.")
+            return False
+        print("O modelo será convertido sem validação.")
 
     try:
         # 2. Carregar o modelo Keras
-        print(f"Carregando o modelo Keras de '{KERAS_MODEL_FILENAME}'...")
-        model = tf.keras.models.load_model(KERAS_MODEL_FILENAME)
+        print(f"Carregando o modelo Keras de '{keras_path}'...")
+        preditor_keras = PreditorKeras(keras_path)
+        model = preditor_keras.model
         print("Modelo carregado com sucesso.")
         model.summary()
 
@@ -35,24 +132,68 @@ def convert_model():
 
         # 4. Otimizar o modelo (opcional, mas recomendado para mobile)
         converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if mode == 'int8':
+            # Quantização inteira completa: o conversor observa as ativações em
+            # amostras reais para escolher a escala de cada tensor.
+            X_train = dados[0]
+            converter.representative_dataset = criar_dataset_representativo(X_train)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+            print(f"Calibrando com {min(CALIBRATION_SAMPLES, len(X_train))} amostras do conjunto de treino.")
+        elif mode != 'dinamica':
+            print(f"ERRO: Modo de quantização desconhecido: '{mode}'. Use 'dinamica' ou 'int8'.")
+            return False
 
         # 5. Converter o modelo
         print("Convertendo o modelo... Isso pode levar um momento.")
         tflite_model = converter.convert()
         print("Conversão concluída!")
 
-        # 6. Salvar o modelo TFLite em um arquivo
-        print(f"Salvando o modelo convertido como '{TFLITE_MODEL_FILENAME}'...")
-        with open(TFLITE_MODEL_FILENAME, 'wb') as f:
+        # 6. Validar o modelo convertido contra o modelo Keras
+        if dados is not None:
+            _, X_test, y_test = dados
+            print(f"\nValidando no conjunto de teste ({len(X_test)} amostras)...")
+            preditor_tflite = PreditorTFLite(conteudo=tflite_model)
+            r = validar_conversao(preditor_keras, preditor_tflite, X_test, y_test)
+            print(f"Acurácia Keras:  {r['acuracia_keras']:.2f}%")
+            print(f"Acurácia TFLite: {r['acuracia_tflite']:.2f}% (queda de {r['queda']:.2f} pontos)")
+            print(f"Concordância com o Keras: {r['concordancia_total']:.2f}%")
+            for classe, concordancia in r['concordancia_por_classe'].items():
+                print(f"  Tom {classe + 1}: {concordancia:.2f}%")
+            print(f"Latência por previsão: Keras {r['latencia_keras_ms']:.3f} ms, "
+                  f"TFLite {r['latencia_tflite_ms']:.3f} ms")
+
+            if r['queda'] > max_drop:
+                print(f"\nERRO: A acurácia caiu {r['queda']:.2f} pontos (limite: {max_drop:.2f}).")
+                print(f"O arquivo '{tflite_path}' NÃO foi salvo.")
+                if mode == 'int8':
+                    print("Tente o modo 'dinamica' ou mais amostras de calibração.")
+                return False
+
+        # 7. Salvar o modelo TFLite em um arquivo
+        print(f"\nSalvando o modelo convertido como '{tflite_path}'...")
+        with open(tflite_path, 'wb') as f:
             f.write(tflite_model)
 
         print("\n--- Processo finalizado com sucesso! ---")
-        print(f"Seu modelo está pronto para ser usado em aplicativos móveis: '{TFLITE_MODEL_FILENAME}'")
+        print(f"Seu modelo está pronto para ser usado em aplicativos móveis: '{tflite_path}'")
         print(f"O tamanho do arquivo final é de aproximadamente {len(tflite_model) / 1024:.2f} KB.")
+        return True
 
     except Exception as e:
         print(f"\nOcorreu um erro durante o processo: {e}")
         print("Verifique se o TensorFlow está instalado corretamente ('pip install tensorflow') e se o arquivo do modelo não está corrompido.")
+        return False
 
 if __name__ == '__main__':
-    convert_model()
+    parser = argparse.ArgumentParser(description="Converte o modelo Keras para TensorFlow Lite.")
+    parser.add_argument('--modelo', default=KERAS_MODEL_FILENAME, help="Arquivo .keras de entrada")
+    parser.add_argument('--saida', default=TFLITE_MODEL_FILENAME, help="Arquivo .tflite de saída")
+    parser.add_argument('--modo', default=QUANTIZATION_MODE, choices=['dinamica', 'int8'],
+                        help="Tipo de quantização")
+    parser.add_argument('--queda-maxima', type=float, default=MAX_ACCURACY_DROP,
+                        help="Queda máxima de acurácia aceita, em pontos percentuais")
+    args = parser.parse_args()
+    if not convert_model(args.modelo, args.saida, args.modo, args.queda_maxima):
+        sys.exit(1)
@@ -0,0 +1,243 @@
+import json
+import os
+import signal
+import sys
+import numpy as np
+
+# Corpus de áudio já decodificado e reamostrado para 16 kHz mono.
+#
+# Todo script que lê o dataset (aumentar_dataset.py, extraindo_feauture.py...)
+# decodifica o MP3/WAV e reamostra de 44,1/48 kHz para 16 kHz a cada
+# librosa.load. O corpus faz isso uma única vez: as amostras de todos os
+# clipes ficam em um só arquivo binário (audio.pcm), um atrás do outro, e o
+# indice.json guarda onde cada clipe começa e quantas amostras tem.
+#
+# O audio.pcm é aberto com np.memmap: ler um clipe é só uma fatia do arquivo,
+# sem cópia, e o sistema operacional compartilha as páginas entre todos os
+# processos de um pool. Isso vale para o tipo padrão, float32; o int16 é o modo
+# econômico (metade do espaço), mas cada leitura copia e converte o clipe. O arquivo só cresce no fim, e
+# o índice é gravado depois dos dados, então uma construção interrompida
+# nunca deixa o índice apontando para amostras que não existem.
+
+VERSAO_CORPUS = 1
+ARQUIVO_INDICE = 'indice.json'
+ARQUIVO_AUDIO = 'audio.pcm'
+TIPOS_AMOSTRA = ('float32', 'int16') # float32 é lido sem cópia; int16 ocupa metade do espaço
+
+def chave_caminho(caminho):
+    """Chave de um arquivo no índice: o caminho absoluto normalizado (igual para 'a/b.wav' e './a/b.wav')."""
+    return os.path.normcase(os.path.abspath(os.fspath(caminho)))
+
+def _carregar_indice(diretorio):
+    caminho = os.path.join(diretorio, ARQUIVO_INDICE)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _salvar_indice(diretorio, indice):
+    caminho = os.path.join(diretorio, ARQUIVO_INDICE)
+    caminho_tmp = caminho + '.tmp'
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        json.dump(indice, f)
+    os.replace(caminho_tmp, caminho)
+
+class CorpusPCM:
+    """
+    Leitor do corpus. `obter(caminho)` devolve as amostras float32 do clipe ou
+    None se o arquivo não está no corpus (ou mudou depois que o corpus foi montado).
+    Num corpus float32 é uma view somente-leitura do memmap; num int16, uma cópia convertida.
+
+    O índice e o memmap são abertos na primeira leitura, então o objeto pode ser
+    criado antes de um fork sem problema.
+    """
+
+    def __init__(self, diretorio, verificar_origem=True):
+        self.diretorio = diretorio
+        # Confere tamanho e data de modificação do arquivo original (um os.stat por leitura)
+        self.verificar_origem = verificar_origem
+        self.acertos = 0
+        self.falhas = 0
+        self._indice = None
+        self._amostras = None
+
+    def _abrir(self):
+        if self._indice is None:
+            indice = _carregar_indice(self.diretorio)
+            if indice is None:
+                raise FileNotFoundError(f"Corpus PCM não encontrado em '{self.diretorio}'.")
+            self._indice = indice
+            total = indice['total_amostras']
+            self._amostras = (np.memmap(os.path.join(self.diretorio, ARQUIVO_AUDIO), dtype=indice['tipo'],
+                                        mode='r', shape=(total,)) if total else np.zeros(0, dtype=indice['tipo']))
+        return self._indice
+
+    @property
+    def taxa_amostragem(self):
+        return self._abrir()['sr']
+
+    def __len__(self):
+        return len(self._abrir()['clipes'])
+
+    def __contains__(self, caminho):
+        return chave_caminho(caminho) in self._abrir()['clipes']
+
+    def obter(self, caminho):
+        entrada = self._abrir()['clipes'].get(chave_caminho(caminho))
+        if entrada is not None and self.verificar_origem:
+            try:
+                estado = os.stat(caminho)
+                if (estado.st_size, estado.st_mtime_ns) != (entrada[2], entrada[3]):
+                    entrada = None # O original mudou: o chamador decodifica de novo
+            except OSError:
+                pass # Original apagado/inacessível: o corpus ainda tem o áudio
+        if entrada is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        inicio, tamanho = entrada[0], entrada[1]
+        trecho = self._amostras[inicio:inicio + tamanho]
+        if trecho.dtype == np.int16:
+            y = trecho.astype(np.float32)
+            y *= 1 / 32768 # Mesma escala que o soundfile usa para PCM de 16 bits
+            return y
+        return np.asarray(trecho) # View somente-leitura do memmap
+
+    def estatisticas(self):
+        indice = self._abrir()
+        return {
+            'clipes': len(indice['clipes']),
+            'horas': indice['total_amostras'] / indice['sr'] / 3600,
+            'tamanho_mb': indice['total_amostras'] * np.dtype(indice['tipo']).itemsize / 1e6,
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+        }
+
+# --- CONSTRUÇÃO ---
+
+def _iniciar_processo():
+    """
+    Os processos filhos ignoram o Ctrl+C (quem decide o que fazer é o processo
+    principal) e sempre decodificam o original, mesmo que o processo pai já
+    estivesse lendo de um corpus.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import processador_audio
+    processador_audio.configurar_corpus('')
+
+def _decodificar(caminho, sr, tipo):
+    from processador_audio import carregar_audio
+    estado = os.stat(caminho)
+    y, _ = carregar_audio(caminho, sr)
+    y = np.clip(np.asarray(y, dtype=np.float32), -1.0, 1.0)
+    if tipo == 'int16':
+        y = np.clip(np.round(y * 32768), -32768, 32767).astype(np.int16)
+    return y, estado.st_size, estado.st_mtime_ns
+
+def construir_corpus(caminhos, diretorio, sr=16000, tipo=None, num_processos=None, salvar_a_cada=500):
+    """
+    Decodifica e acrescenta ao corpus os arquivos de `caminhos` que ainda não
+    estão nele (ou que mudaram desde a última vez), usando um pool de processos.
+
+    `tipo` é o das amostras no disco: 'float32' (lido sem cópia) ou 'int16'
+    (metade do espaço, copiado a cada leitura). None = o tipo do corpus que já
+    existe na pasta, ou float32 para um corpus novo.
+
+    Um clipe refeito é acrescentado no fim e o índice passa a apontar para a
+    versão nova; o espaço da antiga só é recuperado com uma reconstrução
+    (apague a pasta e rode de novo).
+
+    Returns:
+        dict: Quantos clipes foram 'adicionados', estavam 'em_dia' e deram 'erro'.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from tqdm import tqdm
+
+    indice = _carregar_indice(diretorio)
+    if tipo is None:
+        tipo = indice['tipo'] if indice is not None else 'float32'
+    if tipo not in TIPOS_AMOSTRA:
+        raise ValueError(f"Tipo de amostra desconhecido: '{tipo}'. Opções: {TIPOS_AMOSTRA}")
+    os.makedirs(diretorio, exist_ok=True)
+    indice = indice or {'versao': VERSAO_CORPUS, 'sr': sr, 'tipo': tipo, 'total_amostras': 0, 'clipes': {}}
+    if indice['sr'] != sr or indice['tipo'] != tipo:
+        raise ValueError(f"O corpus em '{diretorio}' é {indice['sr']} Hz/{indice['tipo']}; "
+                         f"apague a pasta para montar um em {sr} Hz/{tipo}.")
+
+    pendentes = []
+    em_dia = 0
+    for caminho in dict.fromkeys(map(str, caminhos)): # Sem repetidos, na ordem do mapa
+        entrada = indice['clipes'].get(chave_caminho(caminho))
+        try:
+            estado = os.stat(caminho)
+        except OSError as e:
+            print(f"AVISO: Não foi possível ler {caminho}: {e}")
+            continue
+        if entrada is not None and (estado.st_size, estado.st_mtime_ns) == (entrada[2], entrada[3]):
+            em_dia += 1
+        else:
+            pendentes.append(caminho)
+    print(f"Corpus '{diretorio}': {em_dia} clipes em dia, {len(pendentes)} a decodificar.")
+
+    resultado = {'adicionados': 0, 'em_dia': em_dia, 'erro': 0}
+    if not pendentes:
+        return resultado
+
+    caminho_audio = os.path.join(diretorio, ARQUIVO_AUDIO)
+    with open(caminho_audio, 'ab') as arquivo:
+        # Descarta amostras de uma construção interrompida que não chegaram ao índice
+        arquivo.truncate(indice['total_amostras'] * np.dtype(tipo).itemsize)
+        executor = ProcessPoolExecutor(max_workers=num_processos, initializer=_iniciar_processo)
+        try:
+            # map() devolve na ordem de `pendentes`: o arquivo fica na mesma ordem do mapa
+            resultados = executor.map(_decodificar_seguro, pendentes, [sr] * len(pendentes),
+                                      [tipo] * len(pendentes), chunksize=8)
+            for n, (caminho, saida) in enumerate(tqdm(zip(pendentes, resultados), total=len(pendentes),
+                                                      desc="Montando corpus"), start=1):
+                if isinstance(saida, str):
+                    print(f"\nErro ao decodificar {caminho}: {saida}")
+                    resultado['erro'] += 1
+                    continue
+                y, tamanho_origem, mtime_origem = saida
+                arquivo.write(y.tobytes())
+                indice['clipes'][chave_caminho(caminho)] = [indice['total_amostras'], len(y),
+                                                            tamanho_origem, mtime_origem]
+                indice['total_amostras'] += len(y)
+                resultado['adicionados'] += 1
+                if n % salvar_a_cada == 0:
+                    arquivo.flush()
+                    _salvar_indice(diretorio, indice)
+        except KeyboardInterrupt:
+            print("\nInterrompido! O que já foi decodificado fica no corpus; rode novamente para continuar.")
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            executor.shutdown()
+        finally:
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+            _salvar_indice(diretorio, indice)
+    return resultado
+
+def _decodificar_seguro(caminho, sr, tipo):
+    """_decodificar, mas devolvendo a mensagem de erro em vez de derrubar o map()."""
+    try:
+        return _decodificar(caminho, sr, tipo)
+    except Exception as e:
+        return str(e) or type(e).__name__
+
+if __name__ == '__main__':
+    argumentos = sys.argv[1:]
+    tipo = None
+    if '--int16' in argumentos: # Modo econômico: metade do espaço, mas cada leitura copia o clipe
+        argumentos.remove('--int16')
+        tipo = 'int16'
+    if len(argumentos) >= 3 and argumentos[0] == 'construir':
+        import pandas as pd
+        caminhos = []
+        for mapa in argumentos[2:]:
+            caminhos += pd.read_csv(mapa)['caminho_arquivo'].astype(str).tolist()
+        print(construir_corpus(caminhos, argumentos[1], tipo=tipo))
+        print(CorpusPCM(argumentos[1]).estatisticas())
+    else:
+        print("Uso: python corpus_pcm.py construir [--int16] <pasta_do_corpus> <mapa.csv> [<outro_mapa.csv> ...]")
+        print("     Amostras em float32 (lidas sem cópia); --int16 ocupa metade do espaço e copia a cada leitura.")
@@ -1,38 +1,509 @@
-import librosa
+import io
+import os
+import functools
+import tempfile
+import time
 import numpy as np
+import soundfile as sf
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cache_contornos import CacheContornos
+from corpus_pcm import ARQUIVO_INDICE as ARQUIVO_INDICE_CORPUS, CorpusPCM
+
+TAXA_AMOSTRAGEM = 16000
+
+# O librosa é importado só dentro das funções que o usam: importá-lo leva
+# segundos (numba, scipy...), e o processo principal do bot nunca precisa dele.
+
+# Cache de contornos compartilhado. Fica desligado até alguém chamar configurar_cache().
+_cache = None
+
+def configurar_cache(diretorio, tamanho_max_mb=500):
+    """
+    Liga o cache em disco dos vetores de feature (ou desliga, se `diretorio` for vazio).
+    Deve ser chamado em cada processo que usa este módulo.
+    """
+    global _cache
+    _cache = CacheContornos(diretorio, tamanho_max_mb) if diretorio else None
+    return _cache
+
+def obter_cache():
+    """Retorna o cache configurado neste processo (ou None)."""
+    return _cache
+
+# Corpus de áudio já em 16 kHz (veja corpus_pcm.py). Desligado até alguém chamar configurar_corpus().
+_corpus = None
+
+def configurar_corpus(diretorio, verificar_origem=True):
+    """
+    Faz o carregar_audio procurar os arquivos primeiro no corpus PCM em
+    `diretorio`. Fica desligado se `diretorio` for vazio ou ainda não tiver um
+    corpus montado. Deve ser chamado em cada processo.
+    """
+    global _corpus
+    existe = bool(diretorio) and os.path.exists(os.path.join(diretorio, ARQUIVO_INDICE_CORPUS))
+    _corpus = CorpusPCM(diretorio, verificar_origem) if existe else None
+    return _corpus
+
+def obter_corpus():
+    """Retorna o corpus configurado neste processo (ou None)."""
+    return _corpus
+
+# Pasta para o caso raro em que um áudio em memória precisa virar arquivo
+# (formatos que o libsndfile não lê, como m4a). None = pasta temporária do sistema.
+_pasta_temporaria = None
+
+def configurar_pasta_temporaria(pasta):
+    global _pasta_temporaria
+    _pasta_temporaria = pasta or None
+
+# --- CARREGAMENTO DO ÁUDIO ---
+
+def _descrever_fonte(fonte):
+    """Nome curto da fonte de áudio para as mensagens de erro."""
+    if isinstance(fonte, np.ndarray):
+        return f"<array de {len(fonte)} amostras>"
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        return f"<{len(fonte)} bytes em memória>"
+    return str(fonte)
+
+def decodificar_bytes(dados, sr=TAXA_AMOSTRAGEM):
+    """
+    Decodifica um arquivo de áudio que está em memória (ex.: nota de voz OGG/Opus
+    do Telegram) direto para um array float32 mono na taxa `sr`, sem passar pelo disco.
+
+    Se o libsndfile não conhecer o formato, cai no caminho antigo:
+    grava um arquivo temporário e usa o librosa.load.
+    """
+    try:
+        y, sr_original = sf.read(io.BytesIO(dados), dtype='float32', always_2d=True)
+    except RuntimeError: # sf.LibsndfileError: formato desconhecido
+        return _decodificar_via_arquivo(dados, sr)
+    y = y.mean(axis=1) if y.shape[1] > 1 else y[:, 0] # Mono, como o librosa.load
+    if sr_original != sr:
+        import librosa
+        y = librosa.resample(y, orig_sr=sr_original, target_sr=sr)
+    return y, sr
+
+def _decodificar_via_arquivo(dados, sr):
+    arquivo = tempfile.NamedTemporaryFile(suffix='.audio', dir=_pasta_temporaria, delete=False)
+    try:
+        with arquivo:
+            arquivo.write(dados)
+        import librosa
+        return librosa.load(arquivo.name, sr=sr)
+    finally:
+        os.remove(arquivo.name)
+
+def carregar_audio(fonte, sr=TAXA_AMOSTRAGEM):
+    """
+    Carrega o áudio de `fonte` como float32 mono na taxa `sr`.
+
+    Args:
+        fonte: Caminho do arquivo, bytes do arquivo codificado (em memória) ou
+            um array NumPy que já está na taxa `sr`.
+
+    Se um corpus PCM estiver configurado (configurar_corpus), um caminho que
+    está nele é lido de lá, sem decodificar nem reamostrar.
+    """
+    if isinstance(fonte, np.ndarray):
+        return fonte.astype(np.float32, copy=False), sr
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        return decodificar_bytes(bytes(fonte), sr)
+    if _corpus is not None and _corpus.taxa_amostragem == sr:
+        y = _corpus.obter(fonte)
+        if y is not None:
+            return y, sr
+    import librosa
+    return librosa.load(fonte, sr=sr)
+
+def _hash_fonte(fonte):
+    """Hash do conteúdo da fonte para o cache (o mesmo para um arquivo e para os seus bytes)."""
+    if isinstance(fonte, np.ndarray):
+        return 'pcm-' + CacheContornos.hash_conteudo(np.ascontiguousarray(fonte, dtype=np.float32).tobytes())
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        return CacheContornos.hash_conteudo(bytes(fonte))
+    return CacheContornos.hash_arquivo(fonte)
+
+# --- BACKENDS DE ESTIMAÇÃO DE PITCH ---
+# Cada backend recebe (y, sr, fmin, fmax) e devolve o F0 por frame, com NaN
+# nos frames não-vozeados. Todos usam a mesma grade de frames do pYIN
+# (hop de 512 amostras, frames centralizados), então os contornos têm o mesmo tamanho.
+
+def pitch_pyin(y, sr, fmin, fmax):
+    """Backend de referência: pYIN do librosa (mais robusto, mas lento por causa do Viterbi)."""
+    import librosa
+    f0, voiced_flag, voiced_probs = librosa.pyin(y, fmin=fmin, fmax=fmax, sr=sr)
+    return f0
+
+def pitch_yin_vetorizado(y, sr, fmin, fmax, frame_length=1024, hop_length=512,
+                         limiar=0.15, limiar_rms_relativo=0.05):
+    """
+    Backend rápido: YIN calculado para todos os frames de uma vez, só com NumPy.
+
+    A função diferença de todos os frames sai de uma única FFT em lote
+    (autocorrelação), seguida da diferença média normalizada cumulativa,
+    da busca do primeiro mínimo abaixo de `limiar` e de um refinamento parabólico.
+    Frames com energia abaixo de `limiar_rms_relativo` × o maior RMS do áudio
+    são marcados como não-vozeados.
+    """
+    # 1. Frames (sem cópia) na mesma grade do pYIN: 1 + len(y) // hop_length frames
+    y_pad = np.pad(np.asarray(y, dtype=np.float64), frame_length // 2)
+    quadros = sliding_window_view(y_pad, frame_length)[::hop_length]
+    f0, rms = yin_quadros(quadros, sr, fmin, fmax, limiar)
+
+    # 2. Frames silenciosos não são vozeados
+    vozeado = rms >= limiar_rms_relativo * (rms.max() if len(rms) else 0)
+    return np.where(vozeado, f0, np.nan)
+
+def yin_quadros(quadros, sr, fmin, fmax, limiar=0.15):
+    """
+    Núcleo do YIN vetorizado para uma matriz de frames (num_frames, frame_length).
+    Não depende de nada fora dos frames recebidos, então também serve para
+    processar um áudio em pedaços (veja reconhecimento_continuo.py).
+
+    Returns:
+        tuple: (F0 por frame, com NaN onde não há pitch; RMS de cada frame).
+    """
+    frame_length = quadros.shape[1]
+    tau_min = max(2, int(np.floor(sr / fmax)))
+    tau_max = int(np.ceil(sr / fmin))
+    janela = frame_length - tau_max - 2 # Tamanho da janela de integração do YIN
+    if janela <= tau_max:
+        raise ValueError("frame_length pequeno demais para o fmin escolhido.")
+
+    # 1. Autocorrelação de todos os frames com uma FFT em lote
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + janela)))
+    espectro = np.fft.rfft(quadros, n_fft, axis=1)
+    espectro_janela = np.fft.rfft(quadros[:, :janela], n_fft, axis=1)
+    autocorr = np.fft.irfft(espectro * np.conj(espectro_janela), n_fft, axis=1)[:, :tau_max + 2]
+
+    # 2. Energia de cada janela deslocada, via soma cumulativa
+    soma_quadrados = np.concatenate(
+        [np.zeros((len(quadros), 1)), np.cumsum(quadros ** 2, axis=1)], axis=1)
+    taus = np.arange(tau_max + 2)
+    energia = soma_quadrados[:, taus + janela] - soma_quadrados[:, taus]
+
+    # 3. Função diferença e diferença média normalizada cumulativa (CMND)
+    diferenca = np.maximum(energia[:, :1] + energia - 2 * autocorr, 0)
+    diferenca[:, 0] = 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cmnd = diferenca[:, 1:] * taus[1:] / np.cumsum(diferenca[:, 1:], axis=1)
+    cmnd = np.concatenate([np.ones((len(quadros), 1)), np.nan_to_num(cmnd, nan=1.0)], axis=1)
+
+    # 4. Primeiro mínimo local abaixo do limiar, dentro de [tau_min, tau_max]
+    trecho = cmnd[:, tau_min:tau_max + 1]
+    candidatos = ((trecho < limiar)
+                  & (trecho <= cmnd[:, tau_min - 1:tau_max])
+                  & (trecho <= cmnd[:, tau_min + 1:tau_max + 2]))
+    tem_pitch = candidatos.any(axis=1)
+    tau = tau_min + np.argmax(candidatos, axis=1)
+
+    # 5. Refinamento parabólico em volta do mínimo
+    linhas = np.arange(len(quadros))
+    anterior, centro, seguinte = cmnd[linhas, tau - 1], cmnd[linhas, tau], cmnd[linhas, tau + 1]
+    denominador = anterior - 2 * centro + seguinte
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deslocamento = np.where(np.abs(denominador) > 1e-12,
+                                0.5 * (anterior - seguinte) / denominador, 0.0)
+    tau_refinado = tau + np.clip(deslocamento, -1, 1)
+
+    rms = np.sqrt(energia[:, 0] / janela)
+    return np.where(tem_pitch, sr / tau_refinado, np.nan), rms
+
+BACKENDS_PITCH = {
+    'pyin': pitch_pyin,
+    'yin': pitch_yin_vetorizado,
+}
+_backend_padrao = 'pyin'
+
+def registrar_backend(nome, funcao):
+    """Registra um novo backend de pitch: `funcao(y, sr, fmin, fmax)` -> F0 com NaN nos frames mudos."""
+    BACKENDS_PITCH[nome] = funcao
+
+def configurar_backend(nome):
+    """Escolhe o backend usado quando nenhum é passado explicitamente ('pyin' ou 'yin')."""
+    global _backend_padrao
+    if nome not in BACKENDS_PITCH:
+        raise ValueError(f"Backend de pitch desconhecido: '{nome}'. Opções: {sorted(BACKENDS_PITCH)}")
+    _backend_padrao = nome
+
+def estimar_f0(y, sr, fmin=80, fmax=450, backend=None):
+    """Estima o F0 por frame de `y` com o backend escolhido (NaN nos frames não-vozeados)."""
+    return BACKENDS_PITCH[backend or _backend_padrao](y, sr, fmin, fmax)
+
+def inicializar_processo(backend='pyin', diretorio_cache='', tamanho_max_cache_mb=500, pasta_temporaria=None,
+                         aquecer=False, diretorio_corpus=''):
+    """
+    `initializer` para pools de processos: cada processo filho precisa escolher
+    o backend e ligar o cache (e o corpus PCM) por conta própria.
+
+    Com `aquecer`, o processo já importa o librosa e roda uma extração de
+    teste (veja aquecer_processo) antes de receber o primeiro áudio de verdade.
+    """
+    configurar_backend(backend)
+    configurar_cache(diretorio_cache, tamanho_max_cache_mb)
+    configurar_pasta_temporaria(pasta_temporaria)
+    configurar_corpus(diretorio_corpus)
+    if aquecer:
+        aquecer_processo()
+
+def aquecer_processo(sr=TAXA_AMOSTRAGEM):
+    """
+    Roda uma extração completa em um tom sintético de 0,5 s (sem passar pelo
+    cache): importa o librosa e compila as funções numba do pYIN, que custam
+    alguns segundos na primeira chamada.
+
+    Returns:
+        float: Segundos gastos.
+    """
+    inicio = time.perf_counter()
+    t = np.arange(sr // 2) / sr
+    tom = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    normalizar_contornos_lote([_calcular_f0(tom, 80, 450, sr)])
+    import librosa # O backend 'yin' não usa o librosa, mas a reamostragem e o fallback usam
+    return time.perf_counter() - inicio
+
+def processo_pronto():
+    """Tarefa vazia: esperar por ela garante que um processo do pool já subiu (e aqueceu)."""
+    return os.getpid()
+
+def _marcar(tempos, etapa, inicio):
+    """Soma o tempo desde `inicio` à etapa (se alguém pediu os tempos)."""
+    if tempos is not None:
+        tempos[etapa] = tempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+def _calcular_f0(fonte, fmin, fmax, sr, backend=None, tempos=None):
+    """Decodifica a fonte e estima o F0 bruto (com NaNs). Deixa as exceções subirem."""
+    inicio = time.perf_counter()
+    y, sr = carregar_audio(fonte, sr)
+    _marcar(tempos, 'decodificacao', inicio)
+    if len(y) == 0:
+        print("Aviso: Arquivo de áudio vazio ou não pôde ser lido.")
+        return np.zeros(0) # Sem frames: vira um vetor nulo na normalização
+
+    inicio = time.perf_counter()
+    f0 = estimar_f0(y, sr, fmin, fmax, backend)
+    _marcar(tempos, 'pitch', inicio)
+    return f0
+
+def _calcular_contorno(fonte, fmin, fmax, sr, backend=None, tempos=None):
+    """Calcula o contorno limpo. Diferente de extrair_contorno_pitch, deixa as exceções subirem."""
+    f0 = _calcular_f0(fonte, fmin, fmax, sr, backend, tempos)
+    inicio = time.perf_counter()
+    contorno = limpar_contorno(f0)
+    _marcar(tempos, 'interpolacao', inicio)
+    return contorno
+
+def limpar_contorno(f0):
+    """Preenche os NaNs do F0 por interpolação (ou retorna zeros se houver menos de 2 frames vozeados)."""
+    indices_validos = np.where(~np.isnan(f0))[0]
+
+    if len(indices_validos) < 2:
+        return np.zeros(100)
+
+    f0_validos = f0[indices_validos]
+    indices_todos = np.arange(len(f0))
+    f0_interpolado = np.interp(indices_todos, indices_validos, f0_validos)
+    return f0_interpolado
+
+def normalizar_contorno(contorno_pitch, tamanho_fixo=100):
+    """Estica ou comprime o contorno para `tamanho_fixo` pontos."""
+    x_original = np.linspace(0, 1, len(contorno_pitch))
+    x_novo = np.linspace(0, 1, tamanho_fixo)
+    return np.interp(x_novo, x_original, contorno_pitch)
+
+@functools.lru_cache(maxsize=256)
+def _grade(tamanho):
+    """np.linspace(0, 1, tamanho), criado uma vez por tamanho e só lido depois."""
+    grade = np.linspace(0, 1, tamanho)
+    grade.flags.writeable = False
+    return grade
+
+def normalizar_contornos_lote(contornos_f0, tamanho_fixo=100):
+    """
+    Faz o mesmo que normalizar_contorno(limpar_contorno(f0), tamanho_fixo) para
+    vários F0 brutos de uma vez, com operações vetorizadas em vez de dois
+    np.interp por áudio.
+
+    Todos os F0 são concatenados em um único array: os NaNs são preenchidos
+    com o frame vozeado anterior e o seguinte do mesmo áudio (constante nas
+    pontas, como o np.interp), e o redimensionamento lê os dois vizinhos de
+    cada ponto da grade de saída em uma matriz (N, tamanho_fixo).
+
+    Args:
+        contornos_f0: Lista de arrays de F0 (tamanhos quaisquer, NaN nos frames não-vozeados).
+
+    Returns:
+        np.ndarray: Matriz (N, tamanho_fixo) float32. Áudios com menos de 2
+        frames vozeados ficam com a linha zerada.
+    """
+    num_contornos = len(contornos_f0)
+    saida = np.zeros((num_contornos, tamanho_fixo), dtype=np.float32)
+    if num_contornos == 0:
+        return saida
+    tamanhos = np.array([len(f0) for f0 in contornos_f0], dtype=np.int64)
+    if tamanhos.sum() == 0:
+        return saida
+    f0 = np.concatenate([np.asarray(c, dtype=np.float64).ravel() for c in contornos_f0])
+    inicios = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+    vozeado = ~np.isnan(f0)
+    vozeados_acumulados = np.concatenate([[0], np.cumsum(vozeado)])
+    validos = (vozeados_acumulados[inicios + tamanhos] - vozeados_acumulados[inicios]) >= 2
+    if not validos.any():
+        return saida
+    if num_contornos == 1:
+        # Um contorno só (o caso do bot): dois np.interp saem mais baratos que montar os índices do lote
+        indices_validos = np.flatnonzero(vozeado)
+        preenchido = np.interp(np.arange(len(f0)), indices_validos, f0[indices_validos])
+        saida[0] = np.interp(_grade(tamanho_fixo), _grade(len(f0)), preenchido)
+        return saida
+
+    # 1. Preenchimento dos NaNs: vizinhos vozeados de cada frame, sem sair do próprio áudio
+    total = len(f0)
+    posicoes = np.arange(total)
+    anterior = np.maximum.accumulate(np.where(vozeado, posicoes, -1))
+    seguinte = np.minimum.accumulate(np.where(vozeado, posicoes, total)[::-1])[::-1]
+    inicio_do_frame = np.repeat(inicios, tamanhos)
+    fim_do_frame = inicio_do_frame + np.repeat(tamanhos, tamanhos)
+    sem_anterior = anterior < inicio_do_frame
+    sem_seguinte = seguinte >= fim_do_frame
+    anterior = np.where(sem_anterior, seguinte, anterior) # Antes do 1º vozeado: repete o 1º
+    seguinte = np.where(sem_seguinte, anterior, seguinte) # Depois do último: repete o último
+    # Áudios sem nenhum frame vozeado ficam com índices inválidos, mas a linha deles não é usada
+    anterior = np.clip(anterior, 0, total - 1)
+    seguinte = np.clip(seguinte, 0, total - 1)
+    f0_vozeado = np.where(vozeado, f0, 0.0)
+    distancia = seguinte - anterior
+    peso = np.where(distancia > 0, (posicoes - anterior) / np.maximum(distancia, 1), 0.0)
+    preenchido = f0_vozeado[anterior] + (f0_vozeado[seguinte] - f0_vozeado[anterior]) * peso
+
+    # 2. Redimensionamento para tamanho_fixo pontos (só as linhas válidas, que têm >= 2 frames)
+    tamanhos_validos = tamanhos[validos][:, np.newaxis]
+    posicao = _grade(tamanho_fixo)[np.newaxis, :] * (tamanhos_validos - 1)
+    esquerda = np.minimum(posicao.astype(np.int64), tamanhos_validos - 2)
+    fracao = posicao - esquerda
+    indices = inicios[validos][:, np.newaxis] + esquerda
+    saida[validos] = preenchido[indices] * (1 - fracao) + preenchido[indices + 1] * fracao
+    return saida
 
 # Copiado diretamente do seu script extraindofeauture.py
-def extrair_contorno_pitch(caminho_arquivo, fmin=80, fmax=450):
+def extrair_contorno_pitch(caminho_arquivo, fmin=80, fmax=450, backend=None):
     """
     Carrega um arquivo de áudio, extrai o contorno de pitch (F0) e o limpa.
+
+    `caminho_arquivo` também pode ser os bytes do arquivo ou um array já em 16 kHz
+    (veja carregar_audio).
     """
     try:
-        y, sr = librosa.load(caminho_arquivo, sr=16000)
-        if len(y) == 0:
-            print("Aviso: Arquivo de áudio vazio ou não pôde ser lido.")
-            return np.zeros(100) # Retorna um vetor nulo se o áudio estiver vazio
-            
-        f0, voiced_flag, voiced_probs = librosa.pyin(y, fmin=fmin, fmax=fmax, sr=sr)
-        indices_validos = np.where(~np.isnan(f0))[0]
-        
-        if len(indices_validos) < 2:
-            return np.zeros(100)
-
-        f0_validos = f0[indices_validos]
-        indices_todos = np.arange(len(f0))
-        f0_interpolado = np.interp(indices_todos, indices_validos, f0_validos)
-        return f0_interpolado
+        return _calcular_contorno(caminho_arquivo, fmin, fmax, TAXA_AMOSTRAGEM, backend)
     except Exception as e:
-        print(f"Erro ao processar o áudio {caminho_arquivo}: {e}")
+        print(f"Erro ao processar o áudio {_descrever_fonte(caminho_arquivo)}: {e}")
         return np.zeros(100)
 
+def _consultar_cache(fonte, tamanho_fixo, fmin, fmax, backend, tempos=None):
+    """
+    Procura o vetor de `fonte` no cache configurado.
+
+    Returns:
+        tuple: (chave para guardar o resultado depois ou None, vetor em cache ou None).
+    """
+    if _cache is None:
+        return None, None
+    inicio = time.perf_counter()
+    try:
+        hash_audio = _hash_fonte(fonte)
+        chave = _cache.chave(hash_audio, sr=TAXA_AMOSTRAGEM, fmin=fmin, fmax=fmax,
+                             tamanho_fixo=tamanho_fixo, backend=backend)
+        vetor_em_cache = _cache.obter(chave)
+    except OSError:
+        return None, None # Arquivo ilegível: o erro aparece depois, na extração
+    _marcar(tempos, 'cache', inicio)
+    if tempos is not None:
+        tempos['resultado_cache'] = 'falha' if vetor_em_cache is None else 'acerto'
+    return chave, vetor_em_cache
+
+def _guardar_no_cache(chave, vetor):
+    if chave is None:
+        return
+    try:
+        _cache.guardar(chave, vetor)
+    except OSError as e:
+        print(f"Aviso: Não foi possível gravar no cache de contornos: {e}")
+
 # Copiado diretamente do seu script extraindofeauture.py
-def extrair_e_normalizar_pitch(caminho_arquivo, tamanho_fixo=100):
+def extrair_e_normalizar_pitch(caminho_arquivo, tamanho_fixo=100, fmin=80, fmax=450, backend=None, tempos=None):
     """
     Extrai o pitch e o redimensiona para um tamanho fixo para o modelo de ML.
+
+    Aceita as mesmas fontes que extrair_contorno_pitch (caminho, bytes ou array).
+    Se o cache estiver configurado, o resultado é buscado/guardado nele usando
+    o hash do conteúdo do arquivo, então o mesmo áudio nunca passa pelo pYIN duas vezes.
+
+    Se `tempos` for um dict, recebe os segundos de cada etapa ('cache',
+    'decodificacao', 'pitch', 'interpolacao'), o resultado do cache em
+    'resultado_cache' ('acerto', 'falha' ou 'desligado') e 'erro' = True se a extração falhou.
     """
-    contorno_pitch = extrair_contorno_pitch(caminho_arquivo)
-    x_original = np.linspace(0, 1, len(contorno_pitch))
-    x_novo = np.linspace(0, 1, tamanho_fixo)
-    vetor_de_feature = np.interp(x_novo, x_original, contorno_pitch)
-    return vetor_de_feature
\ No newline at end of file
+    backend = backend or _backend_padrao
+    if tempos is not None:
+        tempos['resultado_cache'] = 'desligado'
+    chave, vetor_em_cache = _consultar_cache(caminho_arquivo, tamanho_fixo, fmin, fmax, backend, tempos)
+    if vetor_em_cache is not None:
+        return vetor_em_cache
+
+    try:
+        f0 = _calcular_f0(caminho_arquivo, fmin, fmax, TAXA_AMOSTRAGEM, backend, tempos)
+    except Exception as e:
+        print(f"Erro ao processar o áudio {_descrever_fonte(caminho_arquivo)}: {e}")
+        if tempos is not None:
+            tempos['erro'] = True
+        # Falhas não vão para o cache: podem ser passageiras (ex.: ffmpeg ausente)
+        return np.zeros(tamanho_fixo, dtype=np.float32)
+
+    inicio = time.perf_counter()
+    vetor_de_feature = normalizar_contornos_lote([f0], tamanho_fixo)[0]
+    _marcar(tempos, 'interpolacao', inicio)
+    _guardar_no_cache(chave, vetor_de_feature)
+    return vetor_de_feature
+
+def extrair_e_normalizar_lote(fontes, tamanho_fixo=100, fmin=80, fmax=450, backend=None):
+    """
+    Versão em lote de extrair_e_normalizar_pitch: o pitch de cada fonte que
+    não está no cache é estimado um por um, mas a limpeza e o redimensionamento
+    de todos são feitos juntos por normalizar_contornos_lote.
+
+    Returns:
+        np.ndarray: Matriz (len(fontes), tamanho_fixo) float32. Uma fonte com
+        erro vira uma linha de zeros (e não vai para o cache).
+    """
+    backend = backend or _backend_padrao
+    saida = np.zeros((len(fontes), tamanho_fixo), dtype=np.float32)
+    linhas, contornos, chaves = [], [], []
+    for i, fonte in enumerate(fontes):
+        chave, vetor_em_cache = _consultar_cache(fonte, tamanho_fixo, fmin, fmax, backend)
+        if vetor_em_cache is not None:
+            saida[i] = vetor_em_cache
+            continue
+        try:
+            contornos.append(_calcular_f0(fonte, fmin, fmax, TAXA_AMOSTRAGEM, backend))
+        except Exception as e:
+            print(f"Erro ao processar o áudio {_descrever_fonte(fonte)}: {e}")
+            continue
+        linhas.append(i)
+        chaves.append(chave)
+
+    if linhas:
+        vetores = normalizar_contornos_lote(contornos, tamanho_fixo)
+        saida[linhas] = vetores
+        for chave, vetor in zip(chaves, vetores):
+            _guardar_no_cache(chave, vetor)
+    return saida
+
+def extrair_com_tempos(fonte, tamanho_fixo=100, fmin=80, fmax=450, backend=None):
+    """
+    Igual a extrair_e_normalizar_pitch, mas devolve (vetor, tempos): útil em
+    pools de processos, onde o dict de tempos precisa voltar junto com o resultado.
+    """
+    tempos = {}
+    vetor = extrair_e_normalizar_pitch(fonte, tamanho_fixo, fmin, fmax, backend, tempos)
+    return vetor, tempos